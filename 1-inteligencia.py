@@ -1,13 +1,41 @@
-from openai import OpenAI
+from agentes.cliente import obter_cliente, obter_cliente_async
+from agentes.streaming import (
+    Transmissao,
+    TransmissaoAsync,
+    transmitir,
+    transmitir_async,
+)
 
 
 def basic_intelligence(prompt: str) -> str:
-    client = OpenAI()
+    client = obter_cliente()
     response = client.responses.create(model="gpt-4o-mini", input=prompt)
     return response.output_text
 
 
+def basic_intelligence_stream(prompt: str) -> Transmissao:
+    # Mesma chamada, mas o texto chega em trechos enquanto é gerado
+    return transmitir(prompt, model="gpt-4o-mini")
+
+
+async def basic_intelligence_async(prompt: str) -> str:
+    # Cliente AsyncOpenAI compartilhado do event loop atual
+    client = obter_cliente_async()
+    response = await client.responses.create(model="gpt-4o-mini", input=prompt)
+    return response.output_text
+
+
+def basic_intelligence_stream_async(prompt: str) -> TransmissaoAsync:
+    return transmitir_async(prompt, model="gpt-4o-mini")
+
+
 if __name__ == "__main__":
     result = basic_intelligence(prompt="O que é inteligência artificial?")
     print("Basic Output:")
     print(result)
+
+    print("\nStreaming Output:")
+    transmissao = basic_intelligence_stream(prompt="O que é inteligência artificial?")
+    for trecho in transmissao:
+        print(trecho, end="", flush=True)
+    print(f"\n\nPrimeiro token em {transmissao.tempo_primeiro_token or 0:.2f}s")
@@ -1,9 +1,29 @@
-from openai import OpenAI
+import threading
+from typing import Optional
 
-client = OpenAI()
+from agentes.cliente import obter_cliente
+from agentes.memoria import MemoriaConversa, resumir_com_llm
+
+_memoria: Optional[MemoriaConversa] = None
+_lock_memoria = threading.Lock()
+
+
+def obter_memoria() -> MemoriaConversa:
+    """Memória compartilhada pelas sessões, criada no primeiro uso"""
+    global _memoria
+    with _lock_memoria:
+        if _memoria is None:
+            # Memória com orçamento: turnos antigos saem da janela e viram resumo
+            _memoria = MemoriaConversa(
+                prompt_sistema="Você é um assistente bem-humorado.",
+                orcamento_tokens=2000,
+                resumidor=resumir_com_llm,
+            )
+        return _memoria
 
 
 def perguntar_sem_memoria():
+    client = obter_cliente()
     response = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
@@ -14,6 +34,7 @@ def perguntar_sem_memoria():
 
 
 def perguntar_continuacao_sem_memoria():
+    client = obter_cliente()
     response = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
@@ -24,6 +45,7 @@ def perguntar_continuacao_sem_memoria():
 
 
 def perguntar_continuacao_com_memoria(resposta: str):
+    client = obter_cliente()
     response = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
@@ -35,6 +57,19 @@ def perguntar_continuacao_com_memoria(resposta: str):
     return response.choices[0].message.content
 
 
+def perguntar_com_memoria(sessao_id: str, pergunta: str) -> str:
+    # Turnos seguintes são encadeados no servidor via previous_response_id,
+    # enviando só a nova pergunta em vez de todo o histórico
+    return obter_memoria().responder(sessao_id, pergunta, model="gpt-4o-mini")
+
+
+async def perguntar_com_memoria_async(sessao_id: str, pergunta: str) -> str:
+    # Mesma memória: sessões podem alternar entre o caminho síncrono e o assíncrono
+    return await obter_memoria().responder_async(
+        sessao_id, pergunta, model="gpt-4o-mini"
+    )
+
+
 if __name__ == "__main__":
     # Primeiro: Pedir uma piada
     resposta_piada = perguntar_sem_memoria()
@@ -47,3 +82,8 @@ if __name__ == "__main__":
     # Terceiro: Fazer pergunta de acompanhamento com memória (IA se lembrará)
     resposta_com_memoria = perguntar_continuacao_com_memoria(resposta_piada)
     print(resposta_com_memoria)
+
+    # Quarto: Mesmo fluxo, mas o histórico é guardado e montado pela memória
+    print()
+    print(perguntar_com_memoria("sessao-1", "Me conte uma piada sobre programação"), "\n")
+    print(perguntar_com_memoria("sessao-1", "Qual foi minha pergunta anterior?"))
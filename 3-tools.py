@@ -1,82 +1,42 @@
-import json
-import requests
-from openai import OpenAI
+from agentes.agente import executar_agente, executar_agente_async
+from agentes.cotacoes import obter_provedor
+from agentes.ferramentas import RegistroFerramentas
 
+# Registro de ferramentas: o esquema JSON é derivado das type hints
+ferramentas = RegistroFerramentas()
 
+
+@ferramentas.ferramenta
 def obter_cotacao_acao(simbolo: str) -> str:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    response = requests.get(
-        f"https://query1.finance.yahoo.com/v8/finance/chart/{simbolo}",
-        headers=headers,
-    )
-    data = response.json()
-    resultado = data["chart"]["result"][0]
-    meta = resultado["meta"]
-    preco = meta["regularMarketPrice"]
-    nome = meta.get("longName", simbolo)
-    return f"{nome} ({simbolo}): ${preco:.2f}"
+    """Obtém cotação atual de uma ação da bolsa de valores."""
+    # Sessão compartilhada, timeout e cache curto por símbolo ficam no provedor
+    cotacao = obter_provedor().historico(simbolo)
+    return f"{cotacao.nome} ({simbolo}): ${cotacao.preco:.2f}"
 
 
 def inteligencia_com_ferramentas(prompt: str) -> str:
-    client = OpenAI()
-
-    ferramentas = [
-        {
-            "type": "function",
-            "name": "obter_cotacao_acao",
-            "description": "Obtém cotação atual de uma ação da bolsa de valores.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "simbolo": {"type": "string"},
-                },
-                "required": ["simbolo"],
-                "additionalProperties": False,
-            },
-            "strict": True,
-        }
-    ]
-
-    mensagens = [{"role": "user", "content": prompt}]
-
-    # Passo 1: Chamar modelo com ferramentas
-    response = client.responses.create(
+    # O loop chama o modelo, executa em paralelo as ferramentas pedidas e
+    # repete até obter a resposta final (no máximo 3 rodadas de ferramentas)
+    resultado = executar_agente(
+        prompt,
+        ferramentas,
         model="gpt-4o-mini",
-        input=mensagens,
-        tools=ferramentas,
+        max_rodadas=3,
+        timeout_ferramentas=10.0,
     )
+    return resultado.texto
 
-    # Passo 2: Verificar e executar chamadas de função
-    for tool_call in response.output:
-        if tool_call.type == "function_call":
-            nome = tool_call.name
-            argumentos = json.loads(tool_call.arguments)
-
-            if nome == "obter_cotacao_acao":
-                resultado = obter_cotacao_acao(**argumentos)
-            else:
-                raise ValueError(f"Função desconhecida: {nome}")
 
-            # Adiciona chamada e resultado no histórico
-            mensagens.append(tool_call)
-            mensagens.append(
-                {
-                    "type": "function_call_output",
-                    "call_id": tool_call.call_id,
-                    "output": str(resultado),
-                }
-            )
-
-    # Passo 3: Obter resposta final
-    resposta_final = client.responses.create(
+async def inteligencia_com_ferramentas_async(prompt: str) -> str:
+    # Mesmo loop sem bloquear o event loop; a ferramenta síncrona roda no executor
+    resultado = await executar_agente_async(
+        prompt,
+        ferramentas,
         model="gpt-4o-mini",
-        input=mensagens,
-        tools=ferramentas,
+        max_rodadas=3,
+        timeout_ferramentas=10.0,
     )
-
-    return resposta_final.output_text
+    return resultado.texto
 
 
 if __name__ == "__main__":
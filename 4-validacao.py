@@ -1,4 +1,7 @@
-from openai import OpenAI
+from agentes.cache import parse_cacheado, parse_cacheado_async
+from agentes.esquemas import corpo_com_esquema
+from agentes.lote import ResumoLote, gerar_job_batch, ler_jsonl, processar_lote
+from agentes.prompts import montar_prompt
 from pydantic import BaseModel
 
 
@@ -9,20 +12,49 @@ class ResultadoTarefa(BaseModel):
     data: str | None = None
 
 
-def inteligencia_estruturada(prompt: str) -> ResultadoTarefa:
-    client = OpenAI()
-    response = client.responses.parse(
+def _parametros_tarefa(prompt: str) -> dict:
+    return dict(
         model="gpt-4o-mini",
-        input=[
-            {
-                "role": "system",
-                "content": "Extraia da entrada do usuário uma tarefa, seu status (concluída ou não), prioridade (1 = baixa, 2 = média, 3 = alta) e data associada, se houver.",
-            },
-            {"role": "user", "content": prompt},
-        ],
+        **montar_prompt(
+            instrucoes="Extraia da entrada do usuário uma tarefa, seu status (concluída ou não), prioridade (1 = baixa, 2 = média, 3 = alta) e data associada, se houver.",
+            usuario=prompt,
+        ),
         text_format=ResultadoTarefa,
     )
-    return response.output_parsed
+
+
+def inteligencia_estruturada(prompt: str) -> ResultadoTarefa:
+    return parse_cacheado(**_parametros_tarefa(prompt))
+
+
+async def inteligencia_estruturada_async(prompt: str) -> ResultadoTarefa:
+    return await parse_cacheado_async(**_parametros_tarefa(prompt))
+
+
+def inteligencia_estruturada_em_lote(
+    caminho_entrada: str, caminho_saida: str, max_trabalhadores: int = 16
+) -> ResumoLote:
+    """Cada linha do JSONL de entrada: {"id": ..., "texto": ...}; retoma de onde parou"""
+
+    # Corrotina: os trabalhadores dividem um event loop em vez de um pool de threads
+    async def processar(registro: dict) -> ResultadoTarefa:
+        return await inteligencia_estruturada_async(registro["texto"])
+
+    return processar_lote(
+        ler_jsonl(caminho_entrada),
+        processar,
+        caminho_saida,
+        max_trabalhadores=max_trabalhadores,
+    )
+
+
+def inteligencia_estruturada_job_batch(caminho_entrada: str, caminho_job: str) -> int:
+    """Mesmas requisições do modo em lote, num job JSONL para a Batch API"""
+    return gerar_job_batch(
+        ler_jsonl(caminho_entrada),
+        lambda registro: corpo_com_esquema(**_parametros_tarefa(registro["texto"])),
+        caminho_job,
+    )
 
 
 if __name__ == "__main__":
@@ -1,6 +1,11 @@
-from openai import OpenAI
+import threading
+from agentes.cache import parse_cacheado, parse_cacheado_async
+from agentes.cascata import Cascata, configurar_etapa, obter_cascata
+from agentes.cliente import obter_cliente, obter_cliente_async
+from agentes.lote import ResumoLote, ler_jsonl, processar_lote
+from agentes.roteador import DecisaoRoteamento, ModeloNgramas, PreRoteador, Regra
 from pydantic import BaseModel
-from typing import Literal
+from typing import Literal, Optional
 
 
 class ClassificacaoIntencao(BaseModel):
@@ -9,10 +14,9 @@ class ClassificacaoIntencao(BaseModel):
     raciocinio: str
 
 
-def roteamento_por_intencao(entrada_usuario: str) -> tuple[str, ClassificacaoIntencao]:
-    client = OpenAI()
-    response = client.responses.parse(
-        model="gpt-4o-mini",
+def _parametros_classificacao(entrada_usuario: str, model: str = "gpt-4o-mini") -> dict:
+    return dict(
+        model=model,
         input=[
             {
                 "role": "system",
@@ -26,7 +30,112 @@ def roteamento_por_intencao(entrada_usuario: str) -> tuple[str, ClassificacaoInt
         text_format=ClassificacaoIntencao,
     )
 
-    classificacao = response.output_parsed
+
+_lock = threading.Lock()
+_etapa_configurada = False
+
+
+def _cascata() -> Cascata:
+    """Cascata padrão, com a etapa "intencao" configurada no primeiro uso"""
+    global _etapa_configurada
+    with _lock:
+        if not _etapa_configurada:
+            # ClassificacaoIntencao chama o campo de "confianca"
+            configurar_etapa("intencao", campo_confianca="confianca")
+            _etapa_configurada = True
+    return obter_cascata()
+
+
+def classificar_intencao_llm(entrada_usuario: str) -> ClassificacaoIntencao:
+    return _cascata().executar(
+        "intencao",
+        lambda model: parse_cacheado(
+            **_parametros_classificacao(entrada_usuario, model)
+        ),
+    )
+
+
+async def classificar_intencao_llm_async(
+    entrada_usuario: str,
+) -> ClassificacaoIntencao:
+    return await _cascata().executar_async(
+        "intencao",
+        lambda model: parse_cacheado_async(
+            **_parametros_classificacao(entrada_usuario, model)
+        ),
+    )
+
+
+def _criar_pre_roteador() -> PreRoteador:
+    # Entradas óbvias são classificadas por regras ou pelo modelo local treinado
+    # com as decisões anteriores do LLM; só o restante vai para o LLM
+    return PreRoteador(
+        regras=[
+            Regra(
+                rotulo="reclamacao",
+                padroes=[
+                    r"\bnao estou satisfeit",
+                    r"\b(pessim|horrivel|decepcionad|insatisfeit)",
+                ],
+                confianca=0.9,
+            ),
+            # "Como faço uma reclamação?" é pergunta: só impede a regra de pergunta
+            Regra(rotulo="reclamacao", padroes=[r"\b(reclama|reclamacao|absurdo)"]),
+            Regra(
+                rotulo="solicitacao",
+                padroes=[
+                    r"^(por favor|pfv|preciso que)\b(?!.*\?$)",
+                    r"^(agende|marque|cancele|envie|crie)\b",
+                ],
+                confianca=0.9,
+            ),
+            # "Pode me explicar o que é IA?" é pergunta; sem "?" ainda é ambíguo
+            Regra(
+                rotulo="solicitacao",
+                padroes=[
+                    r"^(poderia|pode)\b(?!.*\?$)",
+                    r"\b(agendar|marcar|cancelar|enviar|criar)\b",
+                ],
+            ),
+            Regra(
+                rotulo="pergunta",
+                padroes=[r"^(o que|qual|quais|quando|onde|como|por que|quem)\b.*\?$"],
+                confianca=0.9,
+            ),
+        ],
+        classificar_llm=classificar_intencao_llm,
+        classificar_llm_async=classificar_intencao_llm_async,
+        campo_rotulo="intencao",
+        campo_confianca="confianca",
+        limiar=0.8,
+        modelo=ModeloNgramas(),
+    )
+
+
+_pre_roteador: Optional[PreRoteador] = None
+
+
+def obter_pre_roteador() -> PreRoteador:
+    """Pré-roteador compartilhado, criado no primeiro uso"""
+    global _pre_roteador
+    with _lock:
+        if _pre_roteador is None:
+            _pre_roteador = _criar_pre_roteador()
+        return _pre_roteador
+
+
+def _classificacao(decisao: DecisaoRoteamento) -> ClassificacaoIntencao:
+    if decisao.resposta_llm is not None:
+        return decisao.resposta_llm
+    return ClassificacaoIntencao(
+        intencao=decisao.rotulo,
+        confianca=decisao.confianca,
+        raciocinio=f"Classificado localmente ({decisao.origem}), sem chamar o LLM.",
+    )
+
+
+def roteamento_por_intencao(entrada_usuario: str) -> tuple[str, ClassificacaoIntencao]:
+    classificacao = _classificacao(obter_pre_roteador().classificar(entrada_usuario))
     intencao = classificacao.intencao
 
     if intencao == "pergunta":
@@ -41,8 +150,46 @@ def roteamento_por_intencao(entrada_usuario: str) -> tuple[str, ClassificacaoInt
     return resultado, classificacao
 
 
+async def roteamento_por_intencao_async(
+    entrada_usuario: str,
+) -> tuple[str, ClassificacaoIntencao]:
+    decisao = await obter_pre_roteador().classificar_async(entrada_usuario)
+    classificacao = _classificacao(decisao)
+    intencao = classificacao.intencao
+
+    if intencao == "pergunta":
+        resultado = await responder_pergunta_async(entrada_usuario)
+    elif intencao == "solicitacao":
+        resultado = processar_solicitacao(entrada_usuario)
+    elif intencao == "reclamacao":
+        resultado = tratar_reclamacao(entrada_usuario)
+    else:
+        resultado = "Não sei como ajudar com isso."
+
+    return resultado, classificacao
+
+
+def roteamento_por_intencao_em_lote(
+    caminho_entrada: str, caminho_saida: str, max_trabalhadores: int = 16
+) -> ResumoLote:
+    """Cada linha do JSONL de entrada: {"id": ..., "texto": ...}; retoma de onde parou"""
+
+    async def processar(registro: dict) -> dict:
+        resultado, classificacao = await roteamento_por_intencao_async(
+            registro["texto"]
+        )
+        return {"resposta": resultado, "classificacao": classificacao}
+
+    return processar_lote(
+        ler_jsonl(caminho_entrada),
+        processar,
+        caminho_saida,
+        max_trabalhadores=max_trabalhadores,
+    )
+
+
 def responder_pergunta(pergunta: str) -> str:
-    client = OpenAI()
+    client = obter_cliente()
     response = client.responses.create(
         model="gpt-4o-mini",
         input=f"Responda a seguinte pergunta da forma mais simples possível em apenas 1 linha: {pergunta}",
@@ -50,6 +197,15 @@ def responder_pergunta(pergunta: str) -> str:
     return response.output_text
 
 
+async def responder_pergunta_async(pergunta: str) -> str:
+    client = obter_cliente_async()
+    response = await client.responses.create(
+        model="gpt-4o-mini",
+        input=f"Responda a seguinte pergunta da forma mais simples possível em apenas 1 linha: {pergunta}",
+    )
+    return response.output_text
+
+
 def processar_solicitacao(solicitacao: str) -> str:
     return f"Processando sua solicitação: {solicitacao}"
 
@@ -73,3 +229,5 @@ if __name__ == "__main__":
         )
         print(f"Raciocínio: {classificacao.raciocinio}")
         print(f"Resposta: {resultado}")
+
+    print(f"\nMétricas do pré-roteador: {obter_pre_roteador().metricas()}")
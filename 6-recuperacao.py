@@ -1,7 +1,13 @@
+import threading
 from typing import Optional
-from openai import OpenAI
+from agentes.cache import parse_cacheado, parse_cacheado_async
+from agentes.extracao_local import extrair_contato
+from agentes.resiliencia import CaminhoResiliente, obter_disjuntor
 from pydantic import BaseModel
 
+MODELO = "gpt-4o-mini"
+PRAZO_SEGUNDOS = 10.0
+
 
 class InfoPessoa(BaseModel):
     nome: str
@@ -9,12 +15,9 @@ class InfoPessoa(BaseModel):
     cidade: Optional[str] = None
 
 
-def inteligencia_resiliente(prompt: str) -> str:
-    client = OpenAI()
-
-    # Obter saída estruturada
-    response = client.responses.parse(
-        model="gpt-4o-mini",
+def _parametros_extracao(prompt: str) -> dict:
+    return dict(
+        model=MODELO,
         input=[
             {
                 "role": "system",
@@ -26,7 +29,55 @@ def inteligencia_resiliente(prompt: str) -> str:
         temperature=0.0,
     )
 
-    dados_pessoa = response.output_parsed.model_dump()
+
+def _extrair_local(prompt: str) -> Optional[tuple[InfoPessoa, float]]:
+    contato = extrair_contato(prompt)
+    if contato is None:
+        return None
+    campos, confianca = contato
+    return InfoPessoa(**campos), confianca
+
+
+def _criar_extracao() -> CaminhoResiliente:
+    # Textos com nome e telefone claros nem chegam ao LLM; com o provedor fora
+    # do ar (disjuntor aberto, prazo esgotado) a extração local é o fallback
+    return CaminhoResiliente(
+        # temperature=0.0, então respostas repetidas vêm do cache
+        chamar_llm=lambda prompt: parse_cacheado(**_parametros_extracao(prompt)),
+        chamar_llm_async=lambda prompt: parse_cacheado_async(
+            **_parametros_extracao(prompt)
+        ),
+        extrair_local=_extrair_local,
+        disjuntor=obter_disjuntor(MODELO),
+        prazo_segundos=PRAZO_SEGUNDOS,
+    )
+
+
+_extracao: Optional[CaminhoResiliente] = None
+_lock_extracao = threading.Lock()
+
+
+def obter_extracao() -> CaminhoResiliente:
+    """Caminho de extração compartilhado, criado (com o disjuntor) no primeiro uso"""
+    global _extracao
+    with _lock_extracao:
+        if _extracao is None:
+            _extracao = _criar_extracao()
+        return _extracao
+
+
+def inteligencia_resiliente(prompt: str) -> str:
+    info_pessoa = obter_extracao().executar(prompt).valor
+    return formatar_contato(info_pessoa)
+
+
+async def inteligencia_resiliente_async(prompt: str) -> str:
+    info_pessoa = (await obter_extracao().executar_async(prompt)).valor
+    return formatar_contato(info_pessoa)
+
+
+def formatar_contato(info_pessoa: InfoPessoa) -> str:
+    dados_pessoa = info_pessoa.model_dump()
 
     try:
         # Tentar acessar o campo cidade e verificar se é válido
@@ -49,3 +100,10 @@ if __name__ == "__main__":
     )
     print("Resultado com Recuperação:")
     print(resultado)
+
+    # Sem padrão claro de nome: este vai para o LLM
+    resultado = inteligencia_resiliente(
+        "Oi, aqui quem fala é a joana, pode me ligar no 21 98888-7777"
+    )
+    print(resultado)
+    print(f"Caminhos: {obter_extracao().metricas()}")
@@ -4,11 +4,15 @@ Este componente implementa fluxos de aprovação e processos human-in-the-loop
 para decisões de risco ou julgamentos complexos.
 """
 
-from openai import OpenAI
+import asyncio
 
+from agentes.cliente import obter_cliente, obter_cliente_async
+from agentes.streaming import transmitir, transmitir_async
 
-def obter_aprovacao_humana(conteudo: str) -> str:
-    print(f"Conteúdo gerado:\n{conteudo}\n")
+
+def obter_aprovacao_humana(conteudo: str, exibir_conteudo: bool = True) -> str:
+    if exibir_conteudo:
+        print(f"Conteúdo gerado:\n{conteudo}\n")
     resposta = input("Aprovar (s), Refazer (r) ou Cancelar (n): ")
 
     if resposta.lower().startswith("s"):
@@ -19,14 +23,39 @@ def obter_aprovacao_humana(conteudo: str) -> str:
         return "cancelado"
 
 
-def inteligencia_com_feedback_humano(prompt: str) -> None:
-    client = OpenAI()
+def gerar_rascunho_em_streaming(prompt: str) -> str:
+    # O revisor acompanha o rascunho enquanto ele é gerado
+    print("Conteúdo gerado:")
+    transmissao = transmitir(prompt, model="gpt-4o-mini")
+    for trecho in transmissao:
+        print(trecho, end="", flush=True)
+    print(f"\n\n(primeiro token em {transmissao.tempo_primeiro_token or 0:.2f}s)\n")
+    return transmissao.texto
+
+
+async def gerar_rascunho_em_streaming_async(prompt: str) -> str:
+    print("Conteúdo gerado:")
+    transmissao = transmitir_async(prompt, model="gpt-4o-mini")
+    async for trecho in transmissao:
+        print(trecho, end="", flush=True)
+    print(f"\n\n(primeiro token em {transmissao.tempo_primeiro_token or 0:.2f}s)\n")
+    return transmissao.texto
+
+
+def inteligencia_com_feedback_humano(prompt: str, streaming: bool = True) -> None:
+    client = obter_cliente()
 
     while True:
-        response = client.responses.create(model="gpt-4o-mini", input=prompt)
-        rascunho_resposta = response.output_text
+        if streaming:
+            # A aprovação começa assim que o último trecho do rascunho chega
+            rascunho_resposta = gerar_rascunho_em_streaming(prompt)
+        else:
+            response = client.responses.create(model="gpt-4o-mini", input=prompt)
+            rascunho_resposta = response.output_text
 
-        decisao = obter_aprovacao_humana(rascunho_resposta)
+        decisao = obter_aprovacao_humana(
+            rascunho_resposta, exibir_conteudo=not streaming
+        )
 
         if decisao == "aprovado":
             print("Resposta final aprovada")
@@ -38,5 +67,33 @@ def inteligencia_com_feedback_humano(prompt: str) -> None:
         print("Gerando nova versão...\n")
 
 
+async def inteligencia_com_feedback_humano_async(
+    prompt: str, streaming: bool = True
+) -> None:
+    client = obter_cliente_async()
+
+    while True:
+        if streaming:
+            rascunho_resposta = await gerar_rascunho_em_streaming_async(prompt)
+        else:
+            response = await client.responses.create(
+                model="gpt-4o-mini", input=prompt
+            )
+            rascunho_resposta = response.output_text
+
+        # `input()` bloqueia: a espera pelo revisor fica numa thread, não no loop
+        decisao = await asyncio.to_thread(
+            obter_aprovacao_humana, rascunho_resposta, not streaming
+        )
+
+        if decisao == "aprovado":
+            print("Resposta final aprovada")
+            break
+        elif decisao == "cancelado":
+            print("Resposta não aprovada")
+            break
+        print("Gerando nova versão...\n")
+
+
 if __name__ == "__main__":
     inteligencia_com_feedback_humano("De forma simples fale o que é machine learning")
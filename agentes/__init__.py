@@ -0,0 +1,7 @@
+"""
+Blocos de apoio compartilhados pelos exemplos de agentes.
+
+Cada submódulo resolve uma preocupação de infraestrutura (cliente HTTP,
+cache, telemetria...) para que os scripts numerados e os workflows
+continuem focados no fundamento que demonstram.
+"""
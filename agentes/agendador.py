@@ -0,0 +1,168 @@
+"""
+Agendador assíncrono de requisições ao LLM.
+
+Disparar milhares de `asyncio.gather` sem limite estoura os limites do
+provedor (requisições e tokens por minuto) e termina em erros 429. O
+agendador limita a concorrência global, respeita baldes de tokens para
+RPM e TPM, refaz chamadas com backoff exponencial com jitter em erros de
+rate limit (e nos outros erros transitórios) e distribui as vagas em
+rodízio entre os chamadores, para que um lote grande não deixe os outros
+chamadores esperando. As chamadas devem usar `agendador.cliente()`, que
+não soma as retentativas do SDK às do agendador.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+
+from agentes.cliente import obter_cliente_async, sem_retentativas
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Erros em que vale tentar de novo; o SDK refaria os mesmos
+_TRANSITORIOS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+class BaldeTokens:
+    """Token bucket: enche `capacidade` unidades a cada minuto, de forma contínua"""
+
+    def __init__(self, capacidade_por_minuto: float):
+        self.capacidade = capacidade_por_minuto
+        self._taxa_por_segundo = capacidade_por_minuto / 60.0
+        self._disponivel = capacidade_por_minuto
+        self._atualizado_em = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _reabastecer(self) -> None:
+        agora = time.monotonic()
+        self._disponivel = min(
+            self.capacidade,
+            self._disponivel + (agora - self._atualizado_em) * self._taxa_por_segundo,
+        )
+        self._atualizado_em = agora
+
+    async def adquirir(self, quantidade: float = 1.0) -> None:
+        # Pedidos maiores que a capacidade esperariam para sempre
+        quantidade = min(quantidade, self.capacidade)
+        async with self._lock:
+            while True:
+                self._reabastecer()
+                if self._disponivel >= quantidade:
+                    self._disponivel -= quantidade
+                    return
+                falta = quantidade - self._disponivel
+                await asyncio.sleep(falta / self._taxa_por_segundo)
+
+
+class _FilaJusta:
+    """Semáforo que libera vagas em rodízio entre chamadores"""
+
+    def __init__(self, vagas: int):
+        self._livres = vagas
+        self._filas: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+
+    async def entrar(self, chamador: str) -> None:
+        if self._livres > 0 and not self._filas:
+            self._livres -= 1
+            return
+        futuro = asyncio.get_running_loop().create_future()
+        self._filas.setdefault(chamador, deque()).append(futuro)
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            # Se a vaga já tinha sido concedida, devolve para o próximo
+            if futuro.done() and not futuro.cancelled():
+                self.sair()
+            raise
+
+    def sair(self) -> None:
+        self._livres += 1
+        while self._livres > 0 and self._filas:
+            chamador, fila = self._filas.popitem(last=False)
+            futuro = fila.popleft()
+            if fila:
+                self._filas[chamador] = fila
+            if not futuro.done():
+                self._livres -= 1
+                futuro.set_result(None)
+
+
+class AgendadorAsync:
+    """Concorrência global + limites RPM/TPM + backoff em 429 + justiça entre chamadores"""
+
+    def __init__(
+        self,
+        max_concorrencia: int = 10,
+        requisicoes_por_minuto: float = 500,
+        tokens_por_minuto: Optional[float] = 200_000,
+        max_tentativas: int = 5,
+        backoff_base_segundos: float = 0.5,
+        backoff_max_segundos: float = 30.0,
+    ):
+        self.max_tentativas = max_tentativas
+        self.backoff_base_segundos = backoff_base_segundos
+        self.backoff_max_segundos = backoff_max_segundos
+        self._fila = _FilaJusta(max_concorrencia)
+        self._requisicoes = BaldeTokens(requisicoes_por_minuto)
+        self._tokens = BaldeTokens(tokens_por_minuto) if tokens_por_minuto else None
+        self.rate_limits = 0
+        self.concluidas = 0
+
+    def cliente(self) -> AsyncOpenAI:
+        """Cliente compartilhado sem retentativas: quem refaz é o agendador"""
+        return sem_retentativas(obter_cliente_async())
+
+    def _espera(self, tentativa: int, erro: Exception) -> float:
+        # Respeita o Retry-After do provedor quando ele vem na resposta
+        resposta = getattr(erro, "response", None)
+        cabecalho = resposta.headers.get("retry-after") if resposta else None
+        if cabecalho:
+            try:
+                return float(cabecalho)
+            except ValueError:
+                pass
+        teto = min(self.backoff_max_segundos, self.backoff_base_segundos * 2**tentativa)
+        return random.uniform(0, teto)
+
+    async def executar(
+        self,
+        fabrica: Callable[[], Awaitable[T]],
+        tokens_estimados: int = 0,
+        chamador: str = "padrao",
+    ) -> T:
+        """Executa `fabrica()` (que cria a corrotina da chamada) sob os limites do agendador"""
+        for tentativa in range(self.max_tentativas):
+            await self._fila.entrar(chamador)
+            try:
+                await self._requisicoes.adquirir()
+                if self._tokens is not None and tokens_estimados:
+                    await self._tokens.adquirir(tokens_estimados)
+                resultado = await fabrica()
+                self.concluidas += 1
+                return resultado
+            except _TRANSITORIOS as erro:
+                if isinstance(erro, RateLimitError):
+                    self.rate_limits += 1
+                if tentativa == self.max_tentativas - 1:
+                    raise
+                espera = self._espera(tentativa, erro)
+                logger.warning(
+                    f"{type(erro).__name__} ({chamador}), "
+                    f"nova tentativa em {espera:.2f}s"
+                )
+            finally:
+                self._fila.sair()
+            await asyncio.sleep(espera)
+        raise RuntimeError("max_tentativas deve ser maior que zero")
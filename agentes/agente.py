@@ -0,0 +1,212 @@
+"""
+Loop de agente com ferramentas.
+
+O modelo pode pedir ferramentas em várias rodadas: chamamos o modelo,
+executamos em paralelo as funções pedidas, devolvemos os resultados e
+repetimos até ele responder em texto. Os resultados da rodada de número
+`max_rodadas` vão com `tool_choice="none"`, então a última chamada já
+devolve a resposta final. Cada execução contabiliza chamadas ao modelo,
+latência das ferramentas e tokens, para enxergar quanto custam as idas e
+voltas.
+
+`executar_agente_async` faz o mesmo loop no event loop atual, com o
+`AsyncOpenAI` compartilhado e as ferramentas via `executar_chamadas_async`.
+"""
+
+import time
+from typing import Any, Optional
+
+from openai import AsyncOpenAI, BadRequestError, NotFoundError, OpenAI
+from pydantic import BaseModel
+
+from agentes.cliente import (
+    obter_cliente,
+    obter_cliente_async,
+    resposta_anterior_expirada,
+)
+from agentes.ferramentas import TIMEOUT_PADRAO_SEGUNDOS, RegistroFerramentas
+
+
+class EstatisticasExecucao(BaseModel):
+    """Contabilidade de uma execução do agente"""
+
+    chamadas_modelo: int = 0
+    rodadas_ferramentas: int = 0
+    chamadas_ferramentas: int = 0
+    tempo_modelo_segundos: float = 0.0
+    tempo_ferramentas_segundos: float = 0.0
+    tokens_entrada: int = 0
+    tokens_saida: int = 0
+    reenvios_completos: int = 0
+    atingiu_limite: bool = False
+
+    def registrar_uso(self, response: Any) -> None:
+        uso = getattr(response, "usage", None)
+        if uso is not None:
+            self.tokens_entrada += uso.input_tokens or 0
+            self.tokens_saida += uso.output_tokens or 0
+
+
+class ResultadoAgente(BaseModel):
+    texto: str
+    id_resposta: Optional[str] = None
+    estatisticas: EstatisticasExecucao
+
+
+class _Execucao:
+    """Estado e contabilidade de uma execução, comuns aos dois loops"""
+
+    def __init__(
+        self,
+        entrada: str | list[Any],
+        registro: RegistroFerramentas,
+        model: str,
+        instructions: Optional[str],
+        max_rodadas: int,
+        encadear_respostas: bool,
+    ):
+        self.registro = registro
+        self.max_rodadas = max_rodadas
+        self.encadear_respostas = encadear_respostas
+        self.estatisticas = EstatisticasExecucao()
+        self.mensagens = (
+            [{"role": "user", "content": entrada}]
+            if isinstance(entrada, str)
+            else list(entrada)
+        )
+        self.opcoes_base: dict[str, Any] = {"model": model}
+        if instructions is not None:
+            self.opcoes_base["instructions"] = instructions
+        # Resposta anterior e resultados de ferramentas ainda não enviados
+        self.anterior: Any = None
+        self.novos: list[Any] = []
+
+    def _opcoes(self) -> dict[str, Any]:
+        opcoes = {**self.opcoes_base, "tools": self.registro.definicoes()}
+        if self.estatisticas.rodadas_ferramentas >= self.max_rodadas:
+            # Acabaram as rodadas: a próxima resposta tem de ser o texto final
+            self.estatisticas.atingiu_limite = True
+            opcoes["tool_choice"] = "none"
+        return opcoes
+
+    def parametros_encadeados(self) -> Optional[dict[str, Any]]:
+        """Só os resultados novos, com `previous_response_id`; None se não der"""
+        if not self.encadear_respostas or self.anterior is None:
+            return None
+        return dict(
+            input=self.novos, previous_response_id=self.anterior.id, **self._opcoes()
+        )
+
+    def parametros_completos(self) -> dict[str, Any]:
+        if self.anterior is not None:
+            self.estatisticas.reenvios_completos += 1
+        return dict(input=self.mensagens, **self._opcoes())
+
+    def registrar_resposta(self, response: Any, inicio: float) -> list[Any]:
+        """Contabiliza a resposta e devolve as chamadas de ferramentas pedidas"""
+        self.estatisticas.tempo_modelo_segundos += time.perf_counter() - inicio
+        self.estatisticas.chamadas_modelo += 1
+        self.estatisticas.registrar_uso(response)
+        return [item for item in response.output if item.type == "function_call"]
+
+    def registrar_ferramentas(
+        self, response: Any, chamadas: list[Any], saidas: list[Any], inicio: float
+    ) -> None:
+        self.estatisticas.tempo_ferramentas_segundos += time.perf_counter() - inicio
+        self.estatisticas.rodadas_ferramentas += 1
+        self.estatisticas.chamadas_ferramentas += len(chamadas)
+        for chamada, saida in zip(chamadas, saidas):
+            self.mensagens.append(chamada)
+            self.mensagens.append(saida)
+        # A resposta anterior já contém as chamadas; basta enviar os resultados
+        self.anterior, self.novos = response, saidas
+
+    def resultado(self, response: Any) -> ResultadoAgente:
+        return ResultadoAgente(
+            texto=response.output_text,
+            id_resposta=response.id,
+            estatisticas=self.estatisticas,
+        )
+
+
+def executar_agente(
+    entrada: str | list[Any],
+    registro: RegistroFerramentas,
+    model: str = "gpt-4o-mini",
+    instructions: Optional[str] = None,
+    max_rodadas: int = 3,
+    timeout_ferramentas: float = TIMEOUT_PADRAO_SEGUNDOS,
+    encadear_respostas: bool = True,
+    client: Optional[OpenAI] = None,
+) -> ResultadoAgente:
+    """Executa rodadas de ferramentas até o modelo responder (no máximo `max_rodadas`)
+
+    Com `encadear_respostas`, as rodadas seguintes enviam só os resultados das
+    ferramentas com `previous_response_id`; se a resposta anterior expirou no
+    servidor, o histórico completo é reenviado.
+    """
+    client = client or obter_cliente()
+    execucao = _Execucao(
+        entrada, registro, model, instructions, max_rodadas, encadear_respostas
+    )
+
+    def chamar_modelo() -> Any:
+        parametros = execucao.parametros_encadeados()
+        if parametros is not None:
+            try:
+                return client.responses.create(**parametros)
+            except (NotFoundError, BadRequestError) as erro:
+                if not resposta_anterior_expirada(erro):
+                    raise
+        return client.responses.create(**execucao.parametros_completos())
+
+    while True:
+        inicio = time.perf_counter()
+        response = chamar_modelo()
+        chamadas = execucao.registrar_resposta(response, inicio)
+        if not chamadas or execucao.estatisticas.atingiu_limite:
+            return execucao.resultado(response)
+
+        inicio = time.perf_counter()
+        saidas = registro.executar(chamadas, timeout_segundos=timeout_ferramentas)
+        execucao.registrar_ferramentas(response, chamadas, saidas, inicio)
+
+
+async def executar_agente_async(
+    entrada: str | list[Any],
+    registro: RegistroFerramentas,
+    model: str = "gpt-4o-mini",
+    instructions: Optional[str] = None,
+    max_rodadas: int = 3,
+    timeout_ferramentas: float = TIMEOUT_PADRAO_SEGUNDOS,
+    encadear_respostas: bool = True,
+    client: Optional[AsyncOpenAI] = None,
+) -> ResultadoAgente:
+    """Versão assíncrona de `executar_agente`"""
+    client = client or obter_cliente_async()
+    execucao = _Execucao(
+        entrada, registro, model, instructions, max_rodadas, encadear_respostas
+    )
+
+    async def chamar_modelo() -> Any:
+        parametros = execucao.parametros_encadeados()
+        if parametros is not None:
+            try:
+                return await client.responses.create(**parametros)
+            except (NotFoundError, BadRequestError) as erro:
+                if not resposta_anterior_expirada(erro):
+                    raise
+        return await client.responses.create(**execucao.parametros_completos())
+
+    while True:
+        inicio = time.perf_counter()
+        response = await chamar_modelo()
+        chamadas = execucao.registrar_resposta(response, inicio)
+        if not chamadas or execucao.estatisticas.atingiu_limite:
+            return execucao.resultado(response)
+
+        inicio = time.perf_counter()
+        saidas = await registro.executar_async(
+            chamadas, timeout_segundos=timeout_ferramentas
+        )
+        execucao.registrar_ferramentas(response, chamadas, saidas, inicio)
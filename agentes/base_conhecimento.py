@@ -0,0 +1,198 @@
+"""
+Índice da base de conhecimento.
+
+Em vez de reler o kb.json a cada pergunta e despejar a base inteira no
+prompt, carregamos os registros uma vez em um índice invertido (BM25
+sobre `question` e `answer`) e devolvemos apenas os k mais relevantes.
+O arquivo é reindexado de forma incremental: só registros novos,
+alterados ou removidos são processados quando o mtime muda.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Optional
+
+from agentes.texto import tokenizar, vetor_ngramas
+
+
+def assinatura_registro(registro: dict[str, Any]) -> str:
+    """Hash do conteúdo do registro, usado para detectar alterações"""
+    conteudo = json.dumps(registro, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+class IndiceKB:
+    """Índice BM25 incremental, com reordenação vetorial opcional (NumPy)"""
+
+    def __init__(
+        self,
+        caminho: Optional[str] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        usar_vetores: bool = False,
+        peso_vetorial: float = 0.3,
+    ):
+        self.caminho = caminho
+        self.k1 = k1
+        self.b = b
+        self.usar_vetores = usar_vetores
+        self.peso_vetorial = peso_vetorial
+
+        self._registros: dict[Any, dict[str, Any]] = {}
+        self._assinaturas: dict[Any, str] = {}
+        self._termos: dict[Any, Counter] = {}
+        self._comprimentos: dict[Any, int] = {}
+        self._postings: dict[str, dict[Any, int]] = defaultdict(dict)
+        self._soma_comprimentos = 0
+        self._vetores: dict[Any, Any] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.RLock()
+
+        if caminho:
+            self.atualizar()
+
+    def __len__(self) -> int:
+        return len(self._registros)
+
+    def assinatura(self, id_registro: Any) -> Optional[str]:
+        return self._assinaturas.get(id_registro)
+
+    def atualizar(self) -> bool:
+        """Recarrega o arquivo se ele mudou desde a última leitura"""
+        if not self.caminho:
+            return False
+        mtime = os.stat(self.caminho).st_mtime
+        if mtime == self._mtime:
+            return False
+
+        with open(self.caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        self.sincronizar(dados["records"])
+        self._mtime = mtime
+        return True
+
+    def sincronizar(self, registros: list[dict[str, Any]]) -> None:
+        """Aplica apenas a diferença entre os registros atuais e os novos"""
+        with self._lock:
+            novos = {registro["id"]: registro for registro in registros}
+            for id_registro in self._registros.keys() - novos.keys():
+                self._remover(id_registro)
+            for id_registro, registro in novos.items():
+                if self._assinaturas.get(id_registro) != assinatura_registro(registro):
+                    self.indexar(registro)
+
+    def indexar(self, registro: dict[str, Any]) -> None:
+        """Insere ou substitui um registro no índice"""
+        with self._lock:
+            id_registro = registro["id"]
+            if id_registro in self._registros:
+                self._remover(id_registro)
+
+            termos = Counter(
+                tokenizar(f"{registro.get('question', '')} {registro.get('answer', '')}")
+            )
+            self._registros[id_registro] = registro
+            self._assinaturas[id_registro] = assinatura_registro(registro)
+            self._termos[id_registro] = termos
+            self._comprimentos[id_registro] = sum(termos.values())
+            self._soma_comprimentos += self._comprimentos[id_registro]
+            for termo, frequencia in termos.items():
+                self._postings[termo][id_registro] = frequencia
+
+    def _remover(self, id_registro: Any) -> None:
+        termos = self._termos.pop(id_registro)
+        for termo in termos:
+            documentos = self._postings[termo]
+            documentos.pop(id_registro, None)
+            if not documentos:
+                del self._postings[termo]
+        self._soma_comprimentos -= self._comprimentos.pop(id_registro)
+        del self._registros[id_registro]
+        del self._assinaturas[id_registro]
+        self._vetores.pop(id_registro, None)
+
+    def _pontuar_bm25(self, pergunta: str) -> dict[Any, float]:
+        total = len(self._registros)
+        media_comprimento = self._soma_comprimentos / total
+        pontuacoes: dict[Any, float] = defaultdict(float)
+
+        for termo in set(tokenizar(pergunta)):
+            documentos = self._postings.get(termo)
+            if not documentos:
+                continue
+            idf = math.log(1 + (total - len(documentos) + 0.5) / (len(documentos) + 0.5))
+            for id_registro, frequencia in documentos.items():
+                comprimento = self._comprimentos[id_registro]
+                denominador = frequencia + self.k1 * (
+                    1 - self.b + self.b * comprimento / media_comprimento
+                )
+                pontuacoes[id_registro] += idf * frequencia * (self.k1 + 1) / denominador
+        return pontuacoes
+
+    def _vetor(self, id_registro: Any):
+        vetor = self._vetores.get(id_registro)
+        if vetor is None:
+            registro = self._registros[id_registro]
+            vetor = vetor_ngramas(registro.get("question", ""))
+            self._vetores[id_registro] = vetor
+        return vetor
+
+    def buscar(self, pergunta: str, k: int = 3) -> list[dict[str, Any]]:
+        """Retorna os k registros mais relevantes para a pergunta"""
+        with self._lock:
+            if not self._registros:
+                return []
+            pontuacoes = self._pontuar_bm25(pergunta)
+            if not pontuacoes:
+                return []
+
+            candidatos = heapq.nlargest(
+                k * 5 if self.usar_vetores else k,
+                pontuacoes.items(),
+                key=lambda item: item[1],
+            )
+
+            if self.usar_vetores:
+                import numpy as np
+
+                maior = candidatos[0][1]
+                consulta = vetor_ngramas(pergunta)
+                matriz = np.stack([self._vetor(id_) for id_, _ in candidatos])
+                similaridades = matriz @ consulta
+                candidatos = sorted(
+                    (
+                        (
+                            id_,
+                            (1 - self.peso_vetorial) * pontuacao / maior
+                            + self.peso_vetorial * float(similaridade),
+                        )
+                        for (id_, pontuacao), similaridade in zip(
+                            candidatos, similaridades
+                        )
+                    ),
+                    key=lambda item: item[1],
+                    reverse=True,
+                )[:k]
+
+            return [self._registros[id_] for id_, _ in candidatos]
+
+
+_indices: dict[str, IndiceKB] = {}
+_lock_indices = threading.Lock()
+
+
+def obter_indice(caminho: str, **opcoes) -> IndiceKB:
+    """Índice carregado uma vez por arquivo; verifica alterações a cada acesso"""
+    caminho = os.path.abspath(caminho)
+    with _lock_indices:
+        indice = _indices.get(caminho)
+        if indice is None:
+            indice = _indices[caminho] = IndiceKB(caminho, **opcoes)
+            return indice
+    indice.atualizar()
+    return indice
@@ -0,0 +1,206 @@
+"""
+Utilitários de benchmark.
+
+`medir` executa uma função várias vezes (em série ou com concorrência,
+síncrona ou assíncrona) e reporta vazão, latências p50/p95/p99 e o custo
+no lado do cliente: tempo de CPU do processo e pico de memória alocada.
+Os resultados são salvos em JSON e comparados com uma execução anterior
+para apontar regressões.
+"""
+
+import asyncio
+import gc
+import inspect
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel
+
+
+class ResultadoBenchmark(BaseModel):
+    nome: str
+    execucoes: int
+    concorrencia: int
+    tempo_total_segundos: float
+    vazao_por_segundo: float
+    latencia_media_ms: float
+    latencia_p50_ms: float
+    latencia_p95_ms: float
+    latencia_p99_ms: float
+    cpu_por_execucao_ms: float
+    memoria_pico_kb: float
+
+
+def percentil(valores: list[float], p: float) -> float:
+    """Percentil com interpolação linear (p entre 0 e 100)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (
+        posicao - inferior
+    )
+
+
+async def _latencias_async(
+    funcao: Callable[[int], Any], indices: range, concorrencia: int
+) -> list[float]:
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def uma(indice: int) -> float:
+        async with semaforo:
+            inicio = time.perf_counter()
+            await funcao(indice)
+            return time.perf_counter() - inicio
+
+    return list(await asyncio.gather(*(uma(i) for i in indices)))
+
+
+def _latencias(
+    funcao: Callable[[int], Any], indices: range, concorrencia: int
+) -> list[float]:
+    def uma(indice: int) -> float:
+        inicio = time.perf_counter()
+        funcao(indice)
+        return time.perf_counter() - inicio
+
+    if concorrencia == 1:
+        return [uma(i) for i in indices]
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        return list(executor.map(uma, indices))
+
+
+def medir(
+    nome: str,
+    funcao: Callable[[int], Any],
+    execucoes: int = 50,
+    concorrencia: int = 1,
+    aquecimento: int = 2,
+    execucoes_memoria: int = 10,
+) -> ResultadoBenchmark:
+    """Mede `funcao(i)`; o índice permite variar a entrada e evitar acertos de cache
+
+    A memória é medida numa passada separada e menor, porque o tracemalloc
+    deixa o código bem mais lento e distorceria as latências. Funções
+    assíncronas rodam todas as passadas no mesmo event loop.
+    """
+    loop = None
+    if inspect.iscoroutinefunction(funcao):
+        loop = asyncio.new_event_loop()
+
+        def rodar(indices: range, concorrencia: int) -> list[float]:
+            return loop.run_until_complete(
+                _latencias_async(funcao, indices, concorrencia)
+            )
+
+    else:
+
+        def rodar(indices: range, concorrencia: int) -> list[float]:
+            return _latencias(funcao, indices, concorrencia)
+
+    try:
+        rodar(range(-aquecimento, 0), 1)
+
+        gc.collect()
+        cpu_inicio = time.process_time()
+        inicio = time.perf_counter()
+        latencias = rodar(range(execucoes), concorrencia)
+        tempo_total = time.perf_counter() - inicio
+        cpu = time.process_time() - cpu_inicio
+
+        pico = 0.0
+        if execucoes_memoria:
+            tracemalloc.start()
+            try:
+                rodar(range(execucoes, execucoes + execucoes_memoria), concorrencia)
+                pico = tracemalloc.get_traced_memory()[1] / 1024
+            finally:
+                tracemalloc.stop()
+    finally:
+        if loop is not None:
+            loop.close()
+
+    return ResultadoBenchmark(
+        nome=nome,
+        execucoes=execucoes,
+        concorrencia=concorrencia,
+        tempo_total_segundos=tempo_total,
+        vazao_por_segundo=execucoes / tempo_total if tempo_total else 0.0,
+        latencia_media_ms=statistics.fmean(latencias) * 1000,
+        latencia_p50_ms=percentil(latencias, 50) * 1000,
+        latencia_p95_ms=percentil(latencias, 95) * 1000,
+        latencia_p99_ms=percentil(latencias, 99) * 1000,
+        cpu_por_execucao_ms=cpu / execucoes * 1000,
+        memoria_pico_kb=pico,
+    )
+
+
+def salvar_resultados(
+    resultados: list[ResultadoBenchmark], caminho: str, **contexto
+) -> None:
+    """Grava os resultados com metadados do ambiente, para comparar depois"""
+    documento = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "contexto": contexto,
+        "resultados": [resultado.model_dump() for resultado in resultados],
+    }
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(documento, f, indent=2, ensure_ascii=False)
+
+
+def comparar(
+    resultados: list[ResultadoBenchmark],
+    caminho_anterior: str,
+    tolerancia: float = 0.10,
+) -> list[str]:
+    """Lista as métricas que pioraram mais que `tolerancia` em relação ao arquivo anterior"""
+    with open(caminho_anterior, "r", encoding="utf-8") as f:
+        anteriores = {r["nome"]: r for r in json.load(f)["resultados"]}
+
+    # Métrica -> se maior é melhor
+    metricas = {
+        "vazao_por_segundo": True,
+        "latencia_p50_ms": False,
+        "latencia_p95_ms": False,
+        "latencia_p99_ms": False,
+        "cpu_por_execucao_ms": False,
+        "memoria_pico_kb": False,
+    }
+    regressoes = []
+    for resultado in resultados:
+        anterior: Optional[dict] = anteriores.get(resultado.nome)
+        if anterior is None:
+            continue
+        for metrica, maior_melhor in metricas.items():
+            antes, agora = anterior[metrica], getattr(resultado, metrica)
+            if not antes:
+                continue
+            variacao = (agora - antes) / antes
+            if (-variacao if maior_melhor else variacao) > tolerancia:
+                regressoes.append(
+                    f"{resultado.nome}: {metrica} {antes:.2f} -> {agora:.2f} ({variacao:+.0%})"
+                )
+    return regressoes
+
+
+def imprimir_tabela(resultados: list[ResultadoBenchmark]) -> None:
+    print(
+        f"{'benchmark':<40} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'cpu ms':>8} {'mem KB':>9}"
+    )
+    for r in resultados:
+        print(
+            f"{r.nome:<40} {r.vazao_por_segundo:>8.1f} {r.latencia_p50_ms:>8.1f} "
+            f"{r.latencia_p95_ms:>8.1f} {r.latencia_p99_ms:>8.1f} "
+            f"{r.cpu_por_execucao_ms:>8.2f} {r.memoria_pico_kb:>9.1f}"
+        )
@@ -0,0 +1,339 @@
+"""
+Cache de respostas endereçado por conteúdo.
+
+Chamadas determinísticas de saída estruturada (mesmo modelo, instruções,
+input e esquema) não precisam ir para a rede de novo. A chave é um hash
+estável desses parâmetros mais a impressão digital do modelo Pydantic
+(`agentes.esquemas`) e do `base_url` do cliente (outro provedor ou
+servidor local não reaproveita respostas), e o valor é o objeto já
+validado. Há um nível em memória (LRU) e um nível opcional em disco
+(SQLite), ambos com TTL e limite de tamanho.
+
+A `temperature` entra na chave, mas não decide se a chamada é cacheada:
+sem `temperature=0` a primeira resposta válida passa a ser a resposta
+daquela entrada enquanto durar o TTL (é o que se quer em extração, como em
+`4-validacao.py`). Para amostrar de novo, chame `parse_com_esquema`.
+
+Chamadas idênticas que chegam juntas, antes de a primeira terminar, são
+juntas numa só pelo `Deduplicador` (`agentes.deduplicacao`): é o que
+`criar_deduplicado` e `parse_deduplicado` fazem, e o que `parse_cacheado`
+faz nas falhas do cache.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel
+
+from agentes.cliente import obter_cliente, obter_cliente_async
+from agentes.deduplicacao import Deduplicador, obter_deduplicador
+from agentes.esquemas import obter_esquema, parse_com_esquema, parse_com_esquema_async
+
+M = TypeVar("M", bound=BaseModel)
+# Executa a fábrica de uma chamada de rede, ex.: `AgendadorAsync.executar`
+Agendar = Callable[[Callable[[], Awaitable[Any]]], Awaitable[Any]]
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    if isinstance(valor, type) and issubclass(valor, BaseModel):
+        return {"nome": valor.__name__, "esquema": obter_esquema(valor).impressao_digital}
+    return repr(valor)
+
+
+def chave_cache(**parametros) -> str:
+    """Hash estável dos parâmetros da chamada (incluindo o esquema de text_format)"""
+    conteudo = json.dumps(
+        parametros, sort_keys=True, ensure_ascii=False, default=_serializar
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def _origem(client: Any) -> Optional[str]:
+    base_url = getattr(client, "base_url", None)
+    return str(base_url) if base_url is not None else None
+
+
+class _NivelDisco:
+    """Nível persistente em SQLite, compartilhável entre processos"""
+
+    def __init__(self, caminho: str, max_itens: int):
+        self.max_itens = max_itens
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS respostas ("
+            "chave TEXT PRIMARY KEY, valor TEXT NOT NULL, criado_em REAL NOT NULL)"
+        )
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_criado_em ON respostas (criado_em)"
+        )
+        self._conexao.commit()
+
+    def obter(self, chave: str) -> Optional[tuple[str, float]]:
+        linha = self._conexao.execute(
+            "SELECT valor, criado_em FROM respostas WHERE chave = ?", (chave,)
+        ).fetchone()
+        return (linha[0], linha[1]) if linha else None
+
+    def gravar(self, chave: str, valor: str, criado_em: float) -> int:
+        self._conexao.execute(
+            "INSERT OR REPLACE INTO respostas (chave, valor, criado_em) VALUES (?, ?, ?)",
+            (chave, valor, criado_em),
+        )
+        # Remove os mais antigos quando passa do limite
+        removidos = self._conexao.execute(
+            "DELETE FROM respostas WHERE chave IN ("
+            "SELECT chave FROM respostas ORDER BY criado_em DESC LIMIT -1 OFFSET ?)",
+            (self.max_itens,),
+        ).rowcount
+        self._conexao.commit()
+        return removidos
+
+    def remover(self, chave: str) -> None:
+        self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+        self._conexao.commit()
+
+    def limpar(self) -> None:
+        self._conexao.execute("DELETE FROM respostas")
+        self._conexao.commit()
+
+
+class CacheRespostas:
+    """LRU em memória com TTL, opcionalmente apoiado por um arquivo SQLite"""
+
+    def __init__(
+        self,
+        max_itens: int = 1024,
+        ttl_segundos: Optional[float] = 24 * 60 * 60,
+        caminho_disco: Optional[str] = None,
+        max_itens_disco: int = 100_000,
+    ):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._memoria: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._disco = (
+            _NivelDisco(caminho_disco, max_itens_disco) if caminho_disco else None
+        )
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.removidos = 0
+
+    def _expirou(self, criado_em: float) -> bool:
+        return (
+            self.ttl_segundos is not None
+            and time.time() - criado_em > self.ttl_segundos
+        )
+
+    def _guardar_memoria(self, chave: str, valor: str, criado_em: float) -> None:
+        self._memoria[chave] = (valor, criado_em)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_itens:
+            self._memoria.popitem(last=False)
+            self.removidos += 1
+
+    def obter(self, chave: str) -> Optional[str]:
+        """Retorna o JSON armazenado para a chave, ou None em caso de falha"""
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item is not None:
+                if not self._expirou(item[1]):
+                    self._memoria.move_to_end(chave)
+                    self.acertos += 1
+                    return item[0]
+                del self._memoria[chave]
+                self.expirados += 1
+
+            if self._disco is not None:
+                item = self._disco.obter(chave)
+                if item is not None:
+                    if not self._expirou(item[1]):
+                        self._guardar_memoria(chave, *item)
+                        self.acertos += 1
+                        self.acertos_disco += 1
+                        return item[0]
+                    self._disco.remover(chave)
+                    self.expirados += 1
+
+            self.falhas += 1
+            return None
+
+    def gravar(self, chave: str, valor: str) -> None:
+        criado_em = time.time()
+        with self._lock:
+            self._guardar_memoria(chave, valor, criado_em)
+            if self._disco is not None:
+                self.removidos += self._disco.gravar(chave, valor, criado_em)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._memoria.clear()
+            if self._disco is not None:
+                self._disco.limpar()
+
+    def estatisticas(self) -> dict[str, float]:
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "acertos_disco": self.acertos_disco,
+                "falhas": self.falhas,
+                "expirados": self.expirados,
+                "removidos": self.removidos,
+                "itens_memoria": len(self._memoria),
+                "taxa_acerto": self.acertos / total if total else 0.0,
+            }
+
+
+_cache_padrao: Optional[CacheRespostas] = None
+_lock_padrao = threading.Lock()
+
+
+def configurar_cache(**opcoes) -> CacheRespostas:
+    """Substitui o cache padrão (ex.: para ativar o nível em disco)"""
+    global _cache_padrao
+    with _lock_padrao:
+        _cache_padrao = CacheRespostas(**opcoes)
+        return _cache_padrao
+
+
+def obter_cache() -> CacheRespostas:
+    global _cache_padrao
+    with _lock_padrao:
+        if _cache_padrao is None:
+            _cache_padrao = CacheRespostas()
+        return _cache_padrao
+
+
+def criar_deduplicado(
+    client: Optional[OpenAI] = None,
+    deduplicador: Optional[Deduplicador] = None,
+    **parametros,
+) -> Any:
+    """`client.responses.create` que junta chamadas idênticas em andamento"""
+    client = client or obter_cliente()
+    deduplicador = deduplicador or obter_deduplicador()
+    chave = chave_cache(cliente=id(client), **parametros)
+    return deduplicador.executar(chave, lambda: client.responses.create(**parametros))
+
+
+async def criar_deduplicado_async(
+    client: Optional[AsyncOpenAI] = None,
+    deduplicador: Optional[Deduplicador] = None,
+    **parametros,
+) -> Any:
+    """Versão assíncrona de `criar_deduplicado`"""
+    client = client or obter_cliente_async()
+    deduplicador = deduplicador or obter_deduplicador()
+    chave = chave_cache(cliente=id(client), **parametros)
+    return await deduplicador.executar_async(
+        chave, lambda: client.responses.create(**parametros)
+    )
+
+
+def parse_deduplicado(
+    text_format: type[M],
+    client: Optional[OpenAI] = None,
+    deduplicador: Optional[Deduplicador] = None,
+    **parametros,
+) -> Optional[M]:
+    """`parse_com_esquema` que junta chamadas idênticas em andamento"""
+    client = client or obter_cliente()
+    deduplicador = deduplicador or obter_deduplicador()
+    chave = chave_cache(cliente=id(client), text_format=text_format, **parametros)
+    return deduplicador.executar(
+        chave, lambda: parse_com_esquema(text_format, client=client, **parametros)
+    )
+
+
+async def parse_deduplicado_async(
+    text_format: type[M],
+    client: Optional[AsyncOpenAI] = None,
+    deduplicador: Optional[Deduplicador] = None,
+    agendar: Optional[Agendar] = None,
+    **parametros,
+) -> Optional[M]:
+    """Versão assíncrona de `parse_deduplicado`
+
+    `agendar` recebe a fábrica da chamada de rede e a executa (ex.:
+    `functools.partial(agendador.executar, chamador=...)`); só a chamada
+    líder passa por ele, as que se juntam a ela só esperam.
+    """
+    client = client or obter_cliente_async()
+    deduplicador = deduplicador or obter_deduplicador()
+    chave = chave_cache(cliente=id(client), text_format=text_format, **parametros)
+
+    def chamar() -> Awaitable[Optional[M]]:
+        return parse_com_esquema_async(text_format, client=client, **parametros)
+
+    return await deduplicador.executar_async(
+        chave, chamar if agendar is None else lambda: agendar(chamar)
+    )
+
+
+def parse_cacheado(
+    text_format: type[M],
+    client: Optional[OpenAI] = None,
+    cache: Optional[CacheRespostas] = None,
+    **parametros,
+) -> M:
+    """`client.responses.parse` que devolve `output_parsed`, pulando a rede em acertos
+
+    Cacheia mesmo sem `temperature=0`: veja a nota no topo do módulo.
+    """
+    client = client or obter_cliente()
+    cache = cache or obter_cache()
+    chave = chave_cache(
+        base_url=_origem(client), text_format=text_format, **parametros
+    )
+    esquema = obter_esquema(text_format)
+
+    armazenado = cache.obter(chave)
+    if armazenado is not None:
+        return esquema.validar_json(armazenado)
+
+    # Falhas simultâneas da mesma chave fazem uma só chamada
+    resultado = parse_deduplicado(text_format, client=client, **parametros)
+    if resultado is not None:
+        cache.gravar(chave, esquema.serializar_json(resultado))
+    return resultado
+
+
+async def parse_cacheado_async(
+    text_format: type[M],
+    client: Optional[AsyncOpenAI] = None,
+    cache: Optional[CacheRespostas] = None,
+    agendar: Optional[Agendar] = None,
+    **parametros,
+) -> M:
+    """Versão assíncrona de `parse_cacheado`
+
+    Com `agendar`, acertos do cache e chamadas coalescidas não passam pelo
+    agendador: não gastam vaga de concorrência nem cota de RPM/TPM.
+    """
+    client = client or obter_cliente_async()
+    cache = cache or obter_cache()
+    chave = chave_cache(
+        base_url=_origem(client), text_format=text_format, **parametros
+    )
+    esquema = obter_esquema(text_format)
+
+    armazenado = cache.obter(chave)
+    if armazenado is not None:
+        return esquema.validar_json(armazenado)
+
+    resultado = await parse_deduplicado_async(
+        text_format, client=client, agendar=agendar, **parametros
+    )
+    if resultado is not None:
+        cache.gravar(chave, esquema.serializar_json(resultado))
+    return resultado
@@ -0,0 +1,203 @@
+"""
+Cache semântico de respostas.
+
+Perguntas de usuários se repetem com pequenas variações ("Qual é a
+política de devoluções?", "qual a politica de devolucao"), e o cache de
+respostas por conteúdo (`agentes.cache`) só acerta quando o texto é
+idêntico. Aqui a pergunta é normalizada (minúsculas, sem acentos, sem
+palavras vazias) e comparada por similaridade de cosseno entre vetores de
+n-gramas de caracteres (`agentes.texto.vetor_ngramas`), numa única
+multiplicação de matriz NumPy contra todas as entradas. A matriz cresce
+por linhas: gravar não reconstrói tudo.
+
+N-gramas não separam perguntas que diferem numa palavra ("produto usado"
+e "produto novo" ficam acima de 0,8), por isso o limiar padrão é alto, e
+quem chama pode confirmar o acerto com a busca local (`registros`).
+
+Cada entrada guarda as assinaturas dos registros da base de conhecimento
+usados na resposta (`base_conhecimento.assinatura_registro`). Na busca, se
+algum desses registros mudou ou foi removido, a entrada é descartada e a
+pergunta vai para o LLM de novo.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from agentes.texto import tokenizar, vetor_ngramas
+
+
+class _Entrada:
+    __slots__ = ("pergunta", "vetor", "valor", "dependencias", "criado_em")
+
+    def __init__(self, pergunta: str, vetor, valor: Any, dependencias: dict):
+        self.pergunta = pergunta
+        self.vetor = vetor
+        self.valor = valor
+        self.dependencias = dependencias
+        self.criado_em = time.time()
+
+
+class CacheSemantico:
+    """Reaproveita a resposta de uma pergunta parecida enquanto ela for válida"""
+
+    def __init__(
+        self,
+        limiar: float = 0.9,
+        max_itens: int = 1024,
+        ttl_segundos: Optional[float] = 24 * 60 * 60,
+    ):
+        self.limiar = limiar
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        # Chave: a pergunta normalizada, que também acerta sem calcular vetores
+        self._entradas: OrderedDict[str, _Entrada] = OrderedDict()
+        # Linha de cada entrada na matriz; linhas livres ficam zeradas e são
+        # reaproveitadas, e a capacidade dobra quando acaba
+        self._linhas: dict[str, int] = {}
+        self._chaves: list[Optional[str]] = []
+        self._livres: list[int] = []
+        self._matriz = None
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.acertos_exatos = 0
+        self.falhas = 0
+        self.invalidados = 0
+        self.removidos = 0
+
+    @staticmethod
+    def normalizar(pergunta: str) -> str:
+        return " ".join(tokenizar(pergunta))
+
+    def _valida(self, entrada: _Entrada, assinatura: Callable[[Any], Any]) -> bool:
+        if (
+            self.ttl_segundos is not None
+            and time.time() - entrada.criado_em > self.ttl_segundos
+        ):
+            return False
+        return all(
+            assinatura(id_registro) == valor
+            for id_registro, valor in entrada.dependencias.items()
+        )
+
+    def _remover(self, chave: str) -> None:
+        del self._entradas[chave]
+        linha = self._linhas.pop(chave)
+        self._matriz[linha] = 0.0
+        self._chaves[linha] = None
+        self._livres.append(linha)
+
+    def _adicionar(self, chave: str, vetor) -> None:
+        import numpy as np
+
+        linha = self._linhas.get(chave)
+        if linha is None:
+            if self._livres:
+                linha = self._livres.pop()
+                self._chaves[linha] = chave
+            else:
+                linha = len(self._chaves)
+                self._chaves.append(chave)
+                if self._matriz is None or linha == len(self._matriz):
+                    matriz = np.zeros((max(16, 2 * linha), len(vetor)), vetor.dtype)
+                    if self._matriz is not None:
+                        matriz[:linha] = self._matriz
+                    self._matriz = matriz
+            self._linhas[chave] = linha
+        self._matriz[linha] = vetor
+
+    def _mais_parecida(self, vetor) -> tuple[Optional[str], float]:
+        import numpy as np
+
+        if not self._entradas:
+            return None, 0.0
+        similaridades = self._matriz[: len(self._chaves)] @ vetor
+        linha = int(np.argmax(similaridades))
+        return self._chaves[linha], float(similaridades[linha])
+
+    def obter(
+        self,
+        pergunta: str,
+        assinatura: Callable[[Any], Any] = lambda _: None,
+        registros: Optional[Iterable[Any]] = None,
+    ) -> Optional[Any]:
+        """Resposta em cache para a pergunta, ou None
+
+        `assinatura(id_registro)` devolve a assinatura atual de um registro
+        (ex.: `IndiceKB.assinatura`); entradas cujos registros mudaram são
+        descartadas. `registros` são os ids que a busca local acha para a
+        pergunta nova: um acerto por similaridade (não exato) só vale se
+        todos estiverem entre os registros usados na resposta guardada.
+        """
+        chave = self.normalizar(pergunta)
+        with self._lock:
+            exata = chave in self._entradas
+            if not exata:
+                chave, similaridade = self._mais_parecida(vetor_ngramas(pergunta))
+                if chave is None or similaridade < self.limiar or (
+                    registros is not None
+                    and not self._entradas[chave].dependencias.keys() >= set(registros)
+                ):
+                    self.falhas += 1
+                    return None
+
+            entrada = self._entradas[chave]
+            if not self._valida(entrada, assinatura):
+                self._remover(chave)
+                self.invalidados += 1
+                self.falhas += 1
+                return None
+
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            self.acertos_exatos += exata
+            return entrada.valor
+
+    def gravar(
+        self, pergunta: str, valor: Any, dependencias: Optional[dict] = None
+    ) -> None:
+        """Guarda a resposta com as assinaturas dos registros usados nela"""
+        chave = self.normalizar(pergunta)
+        entrada = _Entrada(chave, vetor_ngramas(pergunta), valor, dependencias or {})
+        with self._lock:
+            self._entradas[chave] = entrada
+            self._entradas.move_to_end(chave)
+            self._adicionar(chave, entrada.vetor)
+            while len(self._entradas) > self.max_itens:
+                self._remover(next(iter(self._entradas)))
+                self.removidos += 1
+
+    def invalidar(self, id_registro: Any) -> int:
+        """Remove as entradas que dependem do registro; devolve quantas"""
+        with self._lock:
+            chaves = [
+                chave
+                for chave, entrada in self._entradas.items()
+                if id_registro in entrada.dependencias
+            ]
+            for chave in chaves:
+                self._remover(chave)
+            self.invalidados += len(chaves)
+            return len(chaves)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._linhas.clear()
+            self._chaves.clear()
+            self._livres.clear()
+            self._matriz = None
+
+    def estatisticas(self) -> dict[str, float]:
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "acertos_exatos": self.acertos_exatos,
+                "falhas": self.falhas,
+                "invalidados": self.invalidados,
+                "removidos": self.removidos,
+                "itens": len(self._entradas),
+                "taxa_acerto": self.acertos / total if total else 0.0,
+            }
@@ -0,0 +1,144 @@
+"""
+Executor de cadeias de prompts.
+
+Cada etapa declara de quais outras depende; tudo que não depende entre si
+roda em paralelo. Uma etapa de verificação de porta pode levantar
+`CadeiaInterrompida`, e aí as etapas ainda em andamento (inclusive as
+especulativas, iniciadas antes da porta ser decidida) são canceladas.
+No final temos a latência de cada etapa e do caminho crítico.
+"""
+
+import asyncio
+import contextvars
+import inspect
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel, Field
+
+from agentes.instrumentacao import na_etapa
+
+
+class CadeiaInterrompida(Exception):
+    """Levantada por uma etapa (ex.: verificação de porta) para encerrar a cadeia"""
+
+
+class Etapa(BaseModel):
+    nome: str
+    funcao: Callable[[Any, dict[str, Any]], Any]
+    depende_de: list[str] = Field(default_factory=list)
+
+
+class ResultadoCadeia(BaseModel):
+    resultados: dict[str, Any] = Field(default_factory=dict)
+    latencias: dict[str, float] = Field(default_factory=dict)
+    caminho_critico: list[str] = Field(default_factory=list)
+    latencia_caminho_critico: float = 0.0
+    tempo_total: float = 0.0
+    interrompida_em: Optional[str] = None
+    canceladas: list[str] = Field(default_factory=list)
+
+
+def _caminho_critico(
+    etapas: dict[str, Etapa], fins: dict[str, float], inicio: float
+) -> tuple[list[str], float]:
+    """Volta da última etapa concluída seguindo sempre a dependência que terminou por último"""
+    if not fins:
+        return [], 0.0
+    atual = max(fins, key=fins.get)
+    caminho = [atual]
+    while True:
+        dependencias = [nome for nome in etapas[atual].depende_de if nome in fins]
+        if not dependencias:
+            break
+        atual = max(dependencias, key=fins.get)
+        caminho.append(atual)
+    caminho.reverse()
+    return caminho, fins[caminho[-1]] - inicio
+
+
+async def executar_cadeia_async(
+    etapas: list[Etapa], entrada: Any, executor: Optional[Executor] = None
+) -> ResultadoCadeia:
+    """Executa as etapas respeitando dependências e sobrepondo as independentes
+
+    Funções síncronas rodam em threads (do `executor`, se houver): se a
+    cadeia for interrompida, o resultado delas é descartado, mas a chamada
+    em andamento não é abortada. Corrotinas são canceladas de fato.
+    """
+    por_nome = {etapa.nome: etapa for etapa in etapas}
+    resultado = ResultadoCadeia()
+    inicios: dict[str, float] = {}
+    fins: dict[str, float] = {}
+    pendentes = dict(por_nome)
+    em_execucao: dict[asyncio.Task, str] = {}
+    inicio = time.perf_counter()
+
+    async def executar(etapa: Etapa) -> Any:
+        # Cada tarefa tem seu contexto: as chamadas LLM são atribuídas à etapa
+        with na_etapa(etapa.nome):
+            if inspect.iscoroutinefunction(etapa.funcao):
+                return await etapa.funcao(entrada, resultado.resultados)
+            contexto = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, contexto.run, etapa.funcao, entrada, resultado.resultados
+            )
+
+    try:
+        while pendentes or em_execucao:
+            prontas = [
+                etapa
+                for etapa in pendentes.values()
+                if all(nome in fins for nome in etapa.depende_de)
+            ]
+            for etapa in prontas:
+                del pendentes[etapa.nome]
+                inicios[etapa.nome] = time.perf_counter()
+                em_execucao[asyncio.create_task(executar(etapa))] = etapa.nome
+
+            if not em_execucao:
+                raise ValueError(f"Dependências impossíveis: {sorted(pendentes)}")
+
+            concluidas, _ = await asyncio.wait(
+                em_execucao, return_when=asyncio.FIRST_COMPLETED
+            )
+            for tarefa in concluidas:
+                nome = em_execucao.pop(tarefa)
+                fins[nome] = time.perf_counter()
+                resultado.latencias[nome] = fins[nome] - inicios[nome]
+                resultado.resultados[nome] = tarefa.result()
+    except CadeiaInterrompida:
+        resultado.interrompida_em = nome
+        resultado.canceladas = sorted(list(em_execucao.values()) + list(pendentes))
+        for tarefa in em_execucao:
+            tarefa.cancel()
+        await asyncio.gather(*em_execucao, return_exceptions=True)
+    finally:
+        for tarefa in em_execucao:
+            tarefa.cancel()
+
+    resultado.tempo_total = time.perf_counter() - inicio
+    resultado.caminho_critico, resultado.latencia_caminho_critico = _caminho_critico(
+        por_nome, fins, inicio
+    )
+    return resultado
+
+
+def executar_cadeia(etapas: list[Etapa], entrada: Any) -> ResultadoCadeia:
+    """Versão síncrona de `executar_cadeia_async`
+
+    As etapas síncronas rodam num executor próprio: o `asyncio.run` espera
+    as threads do executor padrão antes de voltar, o que prenderia o
+    chamador até o fim de uma etapa já descartada. Use corrotinas quando a
+    chamada descartada também precisar ser abortada.
+    """
+    inicio = time.perf_counter()
+    executor = ThreadPoolExecutor(thread_name_prefix="cadeia")
+    try:
+        resultado = asyncio.run(executar_cadeia_async(etapas, entrada, executor))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    # Até o chamador ter o controle de volta, não só até o fim do event loop
+    resultado.tempo_total = time.perf_counter() - inicio
+    return resultado
@@ -0,0 +1,200 @@
+"""
+Cascata de modelos.
+
+Classificações e extrações que já devolvem uma confiança (roteamento,
+intenção, extração de evento, validação) costumam ser fáceis para um
+modelo menor. A cascata chama primeiro o modelo mais barato da etapa e só
+pergunta de novo ao próximo quando a confiança devolvida fica abaixo do
+limiar (ou quando não há resultado). O último modelo sempre responde.
+Um resultado sem o campo de confiança também escala, com um aviso no log:
+sem confiança, não há como saber se o modelo barato bastou.
+
+Os modelos e o limiar são configurados por etapa (`configurar_etapa`), e o
+relatório mostra, por etapa, a taxa de escalonamento, quem atendeu, a
+latência e o custo comparado com mandar tudo direto para o modelo mais
+forte (os tokens da primeira tentativa, com o preço do último modelo).
+"""
+
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from pydantic import BaseModel, Field
+
+from agentes.instrumentacao import ChamadaLLM, coletar_chamadas, estimar_custo
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PoliticaCascata(BaseModel):
+    """Modelos do mais barato ao mais forte e a confiança mínima para parar"""
+
+    modelos: list[str] = Field(
+        default_factory=lambda: ["gpt-4.1-nano", "gpt-4o-mini"], min_length=1
+    )
+    limiar: float = 0.7
+    campo_confianca: str = "pontuacao_confianca"
+
+
+class _TotaisEtapa:
+    def __init__(self):
+        self.chamadas = 0
+        self.escalonamentos = 0
+        self.por_modelo: Counter = Counter()
+        self.tempo_segundos = 0.0
+        self.tempo_por_modelo: dict[str, list[float]] = defaultdict(lambda: [0.0, 0])
+        self.custo = 0.0
+        self.custo_referencia = 0.0
+
+
+class Cascata:
+    """Política de modelos por etapa, com relatório de escalonamento e economia"""
+
+    def __init__(
+        self,
+        politicas: Optional[dict[str, PoliticaCascata]] = None,
+        padrao: Optional[PoliticaCascata] = None,
+    ):
+        self.politicas = dict(politicas or {})
+        self.padrao = padrao or PoliticaCascata()
+        self._totais: dict[str, _TotaisEtapa] = defaultdict(_TotaisEtapa)
+        self._lock = threading.Lock()
+
+    def configurar_etapa(self, etapa: str, **opcoes) -> PoliticaCascata:
+        """Sobrescreve campos da política de uma etapa (ex.: `modelos=[...]`)"""
+        politica = self.politica(etapa).model_copy(update=opcoes)
+        self.politicas[etapa] = politica
+        return politica
+
+    def politica(self, etapa: str) -> PoliticaCascata:
+        return self.politicas.get(etapa, self.padrao)
+
+    def _suficiente(
+        self, etapa: str, politica: PoliticaCascata, resultado: Any
+    ) -> bool:
+        if resultado is None:
+            return False
+        confianca = getattr(resultado, politica.campo_confianca, None)
+        if confianca is None:
+            logger.warning(
+                f"Cascata '{etapa}': {type(resultado).__name__} sem o campo "
+                f"'{politica.campo_confianca}'; tratado como confiança baixa"
+            )
+            return False
+        return confianca >= politica.limiar
+
+    def _registrar(
+        self,
+        etapa: str,
+        politica: PoliticaCascata,
+        tentativas: list[tuple[str, float]],
+        chamadas: list[ChamadaLLM],
+    ) -> None:
+        custo = sum(chamada.custo_estimado or 0.0 for chamada in chamadas)
+        # Referência: a primeira tentativa feita direto no modelo mais forte
+        referencia = 0.0
+        if chamadas:
+            primeira = chamadas[0]
+            referencia = (
+                estimar_custo(
+                    politica.modelos[-1],
+                    primeira.tokens_entrada,
+                    primeira.tokens_cache,
+                    primeira.tokens_saida,
+                )
+                or 0.0
+            )
+        with self._lock:
+            totais = self._totais[etapa]
+            totais.chamadas += 1
+            totais.escalonamentos += len(tentativas) > 1
+            totais.por_modelo[tentativas[-1][0]] += 1
+            for modelo, duracao in tentativas:
+                totais.tempo_segundos += duracao
+                tempo = totais.tempo_por_modelo[modelo]
+                tempo[0] += duracao
+                tempo[1] += 1
+            totais.custo += custo
+            totais.custo_referencia += referencia
+
+    def executar(self, etapa: str, chamar: Callable[[str], T]) -> T:
+        """`chamar(modelo)` faz a chamada da etapa com o modelo indicado"""
+        politica = self.politica(etapa)
+        tentativas = []
+        with coletar_chamadas() as chamadas:
+            for modelo in politica.modelos:
+                inicio = time.perf_counter()
+                resultado = chamar(modelo)
+                tentativas.append((modelo, time.perf_counter() - inicio))
+                if self._suficiente(etapa, politica, resultado):
+                    break
+        self._registrar(etapa, politica, tentativas, chamadas)
+        return resultado
+
+    async def executar_async(
+        self, etapa: str, chamar: Callable[[str], Awaitable[T]]
+    ) -> T:
+        """Versão assíncrona de `executar`"""
+        politica = self.politica(etapa)
+        tentativas = []
+        with coletar_chamadas() as chamadas:
+            for modelo in politica.modelos:
+                inicio = time.perf_counter()
+                resultado = await chamar(modelo)
+                tentativas.append((modelo, time.perf_counter() - inicio))
+                if self._suficiente(etapa, politica, resultado):
+                    break
+        self._registrar(etapa, politica, tentativas, chamadas)
+        return resultado
+
+    def _latencia_referencia(self, etapa: str, totais: _TotaisEtapa) -> Optional[float]:
+        tempo, vezes = totais.tempo_por_modelo.get(
+            self.politica(etapa).modelos[-1], (0.0, 0)
+        )
+        return tempo / vezes * 1000 if vezes else None
+
+    def relatorio(self) -> dict[str, dict[str, Any]]:
+        """Por etapa: escalonamento, quem atendeu, latência e economia de custo"""
+        with self._lock:
+            return {
+                etapa: {
+                    "chamadas": totais.chamadas,
+                    "taxa_escalonamento": totais.escalonamentos / totais.chamadas,
+                    "atendidas_por_modelo": dict(totais.por_modelo),
+                    "latencia_media_ms": totais.tempo_segundos / totais.chamadas * 1000,
+                    "latencia_por_modelo_ms": {
+                        modelo: tempo / vezes * 1000
+                        for modelo, (tempo, vezes) in totais.tempo_por_modelo.items()
+                    },
+                    # Latência média observada no modelo mais forte da etapa
+                    "latencia_referencia_ms": self._latencia_referencia(etapa, totais),
+                    "custo_usd": totais.custo,
+                    "custo_referencia_usd": totais.custo_referencia,
+                    "economia_custo": (
+                        1 - totais.custo / totais.custo_referencia
+                        if totais.custo_referencia
+                        else 0.0
+                    ),
+                }
+                for etapa, totais in self._totais.items()
+            }
+
+
+_cascata_padrao: Optional[Cascata] = None
+_lock_padrao = threading.Lock()
+
+
+def obter_cascata() -> Cascata:
+    global _cascata_padrao
+    with _lock_padrao:
+        if _cascata_padrao is None:
+            _cascata_padrao = Cascata()
+        return _cascata_padrao
+
+
+def configurar_etapa(etapa: str, **opcoes) -> PoliticaCascata:
+    return obter_cascata().configurar_etapa(etapa, **opcoes)
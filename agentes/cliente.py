@@ -0,0 +1,203 @@
+"""
+Cliente LLM compartilhado.
+
+Criar um `OpenAI()` a cada chamada significa um novo pool de conexões,
+um novo handshake TLS e reler a configuração do ambiente em todo request.
+Aqui mantemos um único cliente síncrono (e um assíncrono por event loop)
+com pool de conexões keep-alive limitado, configurado uma única vez.
+Os clientes já saem instrumentados (ver `agentes.instrumentacao`).
+"""
+
+import asyncio
+import atexit
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+from openai import (
+    AsyncOpenAI,
+    BadRequestError,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    NotFoundError,
+    OpenAI,
+)
+from pydantic import BaseModel, Field
+
+from agentes.instrumentacao import ganchos_http, instrumentar
+
+
+class ConfiguracaoCliente(BaseModel):
+    """Limites do pool de conexões e timeouts usados pelos clientes compartilhados"""
+
+    max_conexoes: int = Field(default=20, description="Conexões simultâneas no pool")
+    max_conexoes_keepalive: int = Field(
+        default=10, description="Conexões ociosas mantidas abertas para reuso"
+    )
+    keepalive_segundos: float = Field(
+        default=30.0, description="Tempo que uma conexão ociosa fica no pool"
+    )
+    timeout_segundos: float = Field(
+        default=60.0, description="Timeout de leitura/escrita de cada request"
+    )
+    timeout_conexao_segundos: float = Field(
+        default=5.0, description="Timeout para abrir uma nova conexão"
+    )
+    max_tentativas: int = Field(
+        default=2, description="Retentativas automáticas do SDK em erros transitórios"
+    )
+    api_key: Optional[str] = Field(
+        default=None, description="Chave da API; se None, usa OPENAI_API_KEY"
+    )
+    base_url: Optional[str] = Field(
+        default=None, description="URL base da API; se None, usa OPENAI_BASE_URL"
+    )
+
+    def limites(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_conexoes,
+            max_keepalive_connections=self.max_conexoes_keepalive,
+            keepalive_expiry=self.keepalive_segundos,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            self.timeout_segundos, connect=self.timeout_conexao_segundos
+        )
+
+
+_lock = threading.Lock()
+_configuracao = ConfiguracaoCliente()
+_cliente: Optional[OpenAI] = None
+# Um AsyncOpenAI por event loop: o pool do httpx fica preso ao loop que o criou
+_clientes_async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+_cliente_async_sem_loop: Optional[AsyncOpenAI] = None
+
+
+def configurar_cliente(**opcoes) -> ConfiguracaoCliente:
+    """Define limites e timeouts uma única vez; os próximos clientes usam a nova configuração"""
+    global _configuracao
+    with _lock:
+        _configuracao = _configuracao.model_copy(update=opcoes)
+        _descartar_clientes()
+        return _configuracao
+
+
+def obter_configuracao() -> ConfiguracaoCliente:
+    return _configuracao
+
+
+def obter_cliente() -> OpenAI:
+    """Retorna o cliente síncrono compartilhado, criando-o na primeira chamada"""
+    global _cliente
+    if _cliente is not None:
+        return _cliente
+
+    with _lock:
+        if _cliente is None:
+            _cliente = instrumentar(
+                OpenAI(
+                    api_key=_configuracao.api_key,
+                    base_url=_configuracao.base_url,
+                    max_retries=_configuracao.max_tentativas,
+                    timeout=_configuracao.timeout(),
+                    http_client=DefaultHttpxClient(
+                        limits=_configuracao.limites(),
+                        timeout=_configuracao.timeout(),
+                        event_hooks=ganchos_http(),
+                    ),
+                )
+            )
+        return _cliente
+
+
+def obter_cliente_async() -> AsyncOpenAI:
+    """Retorna o cliente assíncrono compartilhado do event loop atual"""
+    global _cliente_async_sem_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    with _lock:
+        cliente = (
+            _clientes_async.get(loop) if loop is not None else _cliente_async_sem_loop
+        )
+        if cliente is None:
+            cliente = instrumentar(
+                AsyncOpenAI(
+                    api_key=_configuracao.api_key,
+                    base_url=_configuracao.base_url,
+                    max_retries=_configuracao.max_tentativas,
+                    timeout=_configuracao.timeout(),
+                    http_client=DefaultAsyncHttpxClient(
+                        limits=_configuracao.limites(),
+                        timeout=_configuracao.timeout(),
+                        event_hooks=ganchos_http(assincrono=True),
+                    ),
+                ),
+                assincrono=True,
+            )
+            if loop is not None:
+                _clientes_async[loop] = cliente
+            else:
+                _cliente_async_sem_loop = cliente
+        return cliente
+
+
+# Cliente original -> cópia sem retentativas (some junto com o original)
+_sem_retentativas: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def sem_retentativas(cliente: OpenAI | AsyncOpenAI) -> OpenAI | AsyncOpenAI:
+    """Cópia do cliente com as retentativas do SDK desligadas, no mesmo pool
+
+    Para quem já refaz as chamadas por conta própria (como o agendador),
+    somar as retentativas do SDK multiplica as requisições em cada erro.
+    """
+    with _lock:
+        copia = _sem_retentativas.get(cliente)
+        if copia is None:
+            copia = _sem_retentativas[cliente] = instrumentar(
+                cliente.with_options(max_retries=0),
+                assincrono=isinstance(cliente, AsyncOpenAI),
+            )
+        return copia
+
+
+def _descartar_clientes() -> Optional[OpenAI]:
+    # Chamado com `_lock`: os próximos `obter_cliente*` criam clientes novos
+    global _cliente, _cliente_async_sem_loop
+    cliente, _cliente = _cliente, None
+    _clientes_async.clear()
+    _cliente_async_sem_loop = None
+    return cliente
+
+
+def fechar_clientes() -> None:
+    """Fecha o cliente síncrono e descarta os assíncronos (fechados pelo GC do loop)
+
+    Só para o encerramento do processo: uma thread que ainda segure o
+    cliente antigo falharia. `configurar_cliente` apenas troca os clientes
+    e deixa o GC fechar os antigos quando ninguém mais os usar.
+    """
+    with _lock:
+        cliente = _descartar_clientes()
+    if cliente is not None:
+        cliente.close()
+
+
+def resposta_anterior_expirada(erro: Exception) -> bool:
+    """Indica se o erro veio de um `previous_response_id` que não existe mais no servidor"""
+    if isinstance(erro, NotFoundError):
+        return True
+    return isinstance(erro, BadRequestError) and (
+        getattr(erro, "param", None) == "previous_response_id"
+        or "previous response" in str(erro).lower()
+    )
+
+
+atexit.register(fechar_clientes)
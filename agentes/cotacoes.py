@@ -0,0 +1,213 @@
+"""
+Provedor de cotações de ações.
+
+Centraliza o acesso ao endpoint de chart do Yahoo Finance com uma
+`requests.Session` compartilhada (pool de conexões keep-alive), timeout,
+cache curto (e limitado) por símbolo e coalescência: se várias threads pedem o mesmo
+símbolo ao mesmo tempo, apenas uma requisição vai para a rede. O
+`base_url` é configurável para apontar para um servidor HTTP local em testes.
+
+O endpoint de chart aceita um símbolo por requisição: `historicos` não é uma
+busca em lote, e sim uma requisição por símbolo em paralelo sobre a sessão.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Optional
+
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    import requests
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class SimboloInvalido(ValueError):
+    """O Yahoo não tem dados para o símbolo pedido"""
+
+
+class HistoricoAcao(BaseModel):
+    """Cotação atual e fechamentos diários de um símbolo"""
+
+    simbolo: str
+    nome: str
+    moeda: str = "USD"
+    preco: float
+    fechamentos: list[float] = Field(default_factory=list)
+
+    @property
+    def variacao_percentual(self) -> float:
+        if len(self.fechamentos) < 2 or not self.fechamentos[0]:
+            return 0.0
+        primeiro, ultimo = self.fechamentos[0], self.fechamentos[-1]
+        return round((ultimo - primeiro) / primeiro * 100, 2)
+
+
+class ProvedorCotacoes:
+    """Cliente HTTP do Yahoo Finance com cache TTL e requisições coalescidas"""
+
+    def __init__(
+        self,
+        base_url: str = "https://query1.finance.yahoo.com",
+        ttl_segundos: float = 15.0,
+        timeout_segundos: float = 5.0,
+        max_conexoes: int = 10,
+        max_itens_cache: int = 1024,
+        sessao: Optional["requests.Session"] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.ttl_segundos = ttl_segundos
+        self.max_itens_cache = max_itens_cache
+        self.timeout_segundos = timeout_segundos
+        self.max_conexoes = max_conexoes
+
+        if sessao is None:
+            # Importado só ao criar o provedor, para não pesar no import do módulo
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(
+                pool_connections=max_conexoes, pool_maxsize=max_conexoes
+            )
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+        sessao.headers.setdefault("User-Agent", USER_AGENT)
+        self.sessao = sessao
+
+        # LRU: símbolos e períodos arbitrários não fazem o cache crescer sem fim
+        self._cache: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._em_andamento: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.requisicoes = 0
+        self.coalescidas = 0
+
+    def obter(self, chave: Hashable, buscar: Callable[[], Any]) -> Any:
+        """Devolve o valor em cache ou executa `buscar` uma única vez por chave"""
+        with self._lock:
+            item = self._cache.get(chave)
+            if item is not None:
+                if time.monotonic() - item[1] < self.ttl_segundos:
+                    self._cache.move_to_end(chave)
+                    self.acertos += 1
+                    return item[0]
+                del self._cache[chave]
+
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                self.coalescidas += 1
+                dono = False
+            else:
+                futuro = self._em_andamento[chave] = Future()
+                dono = True
+
+        if not dono:
+            return futuro.result()
+
+        try:
+            valor = buscar()
+        except BaseException as erro:
+            futuro.set_exception(erro)
+            raise
+        else:
+            futuro.set_result(valor)
+            with self._lock:
+                self._cache[chave] = (valor, time.monotonic())
+                self._cache.move_to_end(chave)
+                while len(self._cache) > self.max_itens_cache:
+                    self._cache.popitem(last=False)
+            return valor
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+
+    def _buscar_chart(self, simbolo: str, periodo: str) -> HistoricoAcao:
+        with self._lock:
+            self.requisicoes += 1
+        response = self.sessao.get(
+            f"{self.base_url}/v8/finance/chart/{simbolo}",
+            params={"range": periodo, "interval": "1d"},
+            timeout=self.timeout_segundos,
+        )
+        if response.status_code == 404:
+            erro = (response.json().get("chart") or {}).get("error") or {}
+            raise SimboloInvalido(
+                f"Símbolo {simbolo}: {erro.get('description') or 'sem dados'}"
+            )
+        response.raise_for_status()
+        resultado = response.json()["chart"]["result"][0]
+        meta = resultado["meta"]
+        cotacoes = resultado.get("indicators", {}).get("quote") or [{}]
+        fechamentos = [
+            valor for valor in cotacoes[0].get("close") or [] if valor is not None
+        ]
+        return HistoricoAcao(
+            simbolo=simbolo,
+            nome=meta.get("longName") or meta.get("shortName") or simbolo,
+            moeda=meta.get("currency") or "USD",
+            preco=meta.get("regularMarketPrice")
+            or (fechamentos[-1] if fechamentos else 0.0),
+            fechamentos=fechamentos,
+        )
+
+    def historico(self, simbolo: str, periodo: str = "1d") -> HistoricoAcao:
+        simbolo = simbolo.upper()
+        return self.obter(
+            ("chart", simbolo, periodo), lambda: self._buscar_chart(simbolo, periodo)
+        )
+
+    def historicos(
+        self, simbolos: list[str], periodo: str = "1mo"
+    ) -> dict[str, HistoricoAcao]:
+        """Busca vários símbolos em paralelo: uma requisição por símbolo (o
+        endpoint não tem lote) numa thread pool, todas sobre a mesma sessão"""
+        unicos = list(dict.fromkeys(simbolo.upper() for simbolo in simbolos))
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_conexoes, len(unicos) or 1)
+        ) as executor:
+            resultados = executor.map(
+                lambda simbolo: self.historico(simbolo, periodo), unicos
+            )
+            return dict(zip(unicos, resultados))
+
+    def fundamentos(self, simbolo: str) -> dict:
+        """Dados fundamentalistas (setor, P/E, dividendos) via yfinance
+
+        O yfinance exige cookie e crumb do Yahoo e recusa uma `requests.Session`
+        externa; ele mantém a própria sessão, única no processo. Aqui ficam o
+        cache curto e a coalescência por símbolo.
+        """
+        # Importado só aqui: yfinance traz o pandas e pesa no tempo de import
+        import yfinance as yf
+
+        simbolo = simbolo.upper()
+        return self.obter(("info", simbolo), lambda: yf.Ticker(simbolo).info)
+
+    def fechar(self) -> None:
+        self.sessao.close()
+
+
+_provedor: Optional[ProvedorCotacoes] = None
+_lock_provedor = threading.Lock()
+
+
+def obter_provedor() -> ProvedorCotacoes:
+    global _provedor
+    with _lock_provedor:
+        if _provedor is None:
+            _provedor = ProvedorCotacoes()
+        return _provedor
+
+
+def configurar_provedor(**opcoes) -> ProvedorCotacoes:
+    """Substitui o provedor padrão (ex.: `base_url` de um servidor local)"""
+    global _provedor
+    with _lock_provedor:
+        if _provedor is not None:
+            _provedor.fechar()
+        _provedor = ProvedorCotacoes(**opcoes)
+        return _provedor
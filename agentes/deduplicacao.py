@@ -0,0 +1,128 @@
+"""
+Deduplicação de chamadas idênticas em andamento (single-flight).
+
+Quando várias requisições iguais chegam ao mesmo tempo (a mesma pergunta
+frequente feita por muitos usuários), o cache de respostas ainda não
+ajuda: todas falham no cache e vão para a rede. O `Deduplicador` junta as
+chamadas concorrentes com a mesma chave numa só: a primeira executa, as
+outras esperam e recebem o mesmo resultado (ou a mesma exceção). Terminada
+a chamada, a chave sai da tabela, então nada é guardado depois disso.
+
+No assíncrono, cancelar quem espera não cancela os outros; quando o último
+que esperava é cancelado, a chamada compartilhada também é (nada fica
+rodando e gastando tokens sem ninguém para receber o resultado).
+
+Os que esperam recebem o mesmo objeto, não uma cópia: não o modifique.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _VooAsync:
+    def __init__(self, tarefa: asyncio.Task):
+        self.tarefa = tarefa
+        self.esperando = 0
+
+
+class Deduplicador:
+    """Junta chamadas concorrentes com a mesma chave numa única execução"""
+
+    def __init__(self):
+        self._voos: dict[Hashable, Future] = {}
+        # Tarefas assíncronas ficam presas ao loop em que foram criadas
+        self._voos_async: dict[tuple[Any, Hashable], _VooAsync] = {}
+        self._lock = threading.Lock()
+        self.chamadas = 0
+        self.execucoes = 0
+        self.economizadas = 0
+
+    def _registrar(self, lider: bool) -> None:
+        self.chamadas += 1
+        if lider:
+            self.execucoes += 1
+        else:
+            self.economizadas += 1
+
+    def executar(self, chave: Hashable, funcao: Callable[[], T]) -> T:
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = Future()
+            self._registrar(lider)
+
+        if not lider:
+            return voo.result()
+
+        try:
+            voo.set_result(funcao())
+        except BaseException as erro:
+            voo.set_exception(erro)
+        finally:
+            with self._lock:
+                del self._voos[chave]
+        return voo.result()
+
+    async def executar_async(
+        self, chave: Hashable, funcao: Callable[[], Awaitable[T]]
+    ) -> T:
+        chave = (asyncio.get_running_loop(), chave)
+        with self._lock:
+            voo = self._voos_async.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos_async[chave] = _VooAsync(
+                    asyncio.ensure_future(funcao())
+                )
+                voo.tarefa.add_done_callback(
+                    lambda _, voo=voo: self._encerrar_async(chave, voo)
+                )
+            voo.esperando += 1
+            self._registrar(lider)
+
+        try:
+            # O shield isola quem espera: cancelar um não cancela os outros
+            return await asyncio.shield(voo.tarefa)
+        finally:
+            with self._lock:
+                voo.esperando -= 1
+                abandonado = voo.esperando == 0 and not voo.tarefa.done()
+                if abandonado and self._voos_async.get(chave) is voo:
+                    # Quem chegar agora começa outra chamada, não entra na cancelada
+                    del self._voos_async[chave]
+            if abandonado:
+                voo.tarefa.cancel()
+
+    def _encerrar_async(self, chave: tuple[Any, Hashable], voo: _VooAsync) -> None:
+        with self._lock:
+            if self._voos_async.get(chave) is voo:
+                del self._voos_async[chave]
+
+    def estatisticas(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "chamadas": self.chamadas,
+                "execucoes": self.execucoes,
+                "economizadas": self.economizadas,
+                "em_andamento": len(self._voos) + len(self._voos_async),
+                "taxa_economia": (
+                    self.economizadas / self.chamadas if self.chamadas else 0.0
+                ),
+            }
+
+
+_deduplicador_padrao: Optional[Deduplicador] = None
+_lock_padrao = threading.Lock()
+
+
+def obter_deduplicador() -> Deduplicador:
+    global _deduplicador_padrao
+    with _lock_padrao:
+        if _deduplicador_padrao is None:
+            _deduplicador_padrao = Deduplicador()
+        return _deduplicador_padrao
@@ -0,0 +1,262 @@
+"""
+Registro de esquemas de saída estruturada.
+
+`client.responses.parse(text_format=Modelo)` gera de novo o JSON Schema
+strict do modelo Pydantic a cada chamada, e a chave do cache de respostas
+também serializava o esquema inteiro. Aqui cada modelo é compilado uma vez:
+o parâmetro `text.format` pronto, uma impressão digital estável para chaves
+de cache e um `TypeAdapter` reaproveitado para validar a saída.
+
+O esquema strict sai do `model_json_schema` público do Pydantic, com os
+ajustes que o modo strict da API exige (`additionalProperties: false`,
+todos os campos em `required`, `$ref` com irmãos expandido, sem
+`default: None`), as mesmas regras que o SDK aplica internamente. Os
+parâmetros das ferramentas (`agentes.ferramentas`) usam o mesmo ajuste.
+
+Os esquemas podem ser gravados em um artefato JSON (`salvar_esquemas`) e
+carregados no início do processo (`carregar_esquemas`); uma entrada só é
+usada se a impressão digital do modelo ainda for a mesma.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from typing import Any, Generic, Optional, TypeVar, get_args
+
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel, TypeAdapter
+
+from agentes.cliente import obter_cliente, obter_cliente_async
+
+T = TypeVar("T")
+
+
+def _definicao(tipo: Any, vistos: set) -> list[str]:
+    """Campos, anotações, descrições e docstring do modelo e dos modelos aninhados"""
+    if tipo in vistos or not isinstance(tipo, type):
+        return [repr(tipo)] + [
+            parte for arg in get_args(tipo) for parte in _definicao(arg, vistos)
+        ]
+    vistos.add(tipo)
+    campos = getattr(tipo, "model_fields", None)
+    partes = [f"{tipo.__module__}.{tipo.__qualname__}|{campos!r}|{tipo.__doc__ or ''}"]
+    for campo in (campos or {}).values():
+        partes.extend(_definicao(campo.annotation, vistos))
+    return partes
+
+
+def impressao_digital(modelo: type) -> str:
+    """Hash da definição do modelo, sem gerar o JSON Schema"""
+    conteudo = "\n".join(_definicao(modelo, set()))
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def _resolver_ref(raiz: dict[str, Any], ref: str) -> dict[str, Any]:
+    if not ref.startswith("#/"):
+        raise ValueError(f"$ref inesperado: {ref!r}")
+    resolvido = raiz
+    for chave in ref[2:].split("/"):
+        resolvido = resolvido[chave]
+    return resolvido
+
+
+def _estrito(
+    esquema: dict[str, Any],
+    raiz: dict[str, Any],
+    expandindo: frozenset[str] = frozenset(),
+) -> dict[str, Any]:
+    """Ajusta o esquema (no lugar) ao que o modo strict da API aceita
+
+    `expandindo` guarda os `$ref` em expansão neste ramo: num modelo
+    recursivo, a segunda ocorrência fica como `$ref` puro.
+    """
+    for chave in ("$defs", "definitions"):
+        for definicao in (esquema.get(chave) or {}).values():
+            _estrito(definicao, raiz)
+
+    if esquema.get("type") == "object" and "additionalProperties" not in esquema:
+        esquema["additionalProperties"] = False
+
+    propriedades = esquema.get("properties")
+    if isinstance(propriedades, dict):
+        esquema["required"] = list(propriedades)
+        esquema["properties"] = {
+            nome: _estrito(propriedade, raiz, expandindo)
+            for nome, propriedade in propriedades.items()
+        }
+
+    if isinstance(esquema.get("items"), dict):
+        esquema["items"] = _estrito(esquema["items"], raiz, expandindo)
+
+    if isinstance(esquema.get("anyOf"), list):
+        esquema["anyOf"] = [
+            _estrito(variante, raiz, expandindo) for variante in esquema["anyOf"]
+        ]
+
+    todos = esquema.get("allOf")
+    if isinstance(todos, list):
+        if len(todos) == 1:
+            esquema.update(_estrito(todos[0], raiz, expandindo))
+            esquema.pop("allOf")
+        else:
+            esquema["allOf"] = [_estrito(parte, raiz, expandindo) for parte in todos]
+
+    # Campo opcional continua aceitando null; o default fica no modelo
+    if "default" in esquema and esquema["default"] is None:
+        esquema.pop("default")
+
+    # A API não aceita `$ref` com outras chaves (ex.: "description"): expande
+    ref = esquema.get("$ref")
+    if ref and len(esquema) > 1:
+        if ref in expandindo:
+            # Expandir de novo não terminaria; sem os irmãos, o `$ref` é aceito
+            esquema.clear()
+            esquema["$ref"] = ref
+            return esquema
+        # Cópia: a definição em `$defs` não pode ser alterada pela expansão
+        esquema.update({**copy.deepcopy(_resolver_ref(raiz, ref)), **esquema})
+        esquema.pop("$ref")
+        return _estrito(esquema, raiz, expandindo | {ref})
+
+    return esquema
+
+
+def esquema_estrito(modelo: type[BaseModel]) -> dict[str, Any]:
+    """JSON Schema do modelo Pydantic já ajustado ao modo strict"""
+    esquema = modelo.model_json_schema()
+    return _estrito(esquema, esquema)
+
+
+def formato_estrito(modelo: type[BaseModel]) -> dict[str, Any]:
+    """Parâmetro `text.format` (json_schema strict) para o modelo Pydantic"""
+    return {
+        "type": "json_schema",
+        "strict": True,
+        "name": modelo.__name__,
+        "schema": esquema_estrito(modelo),
+    }
+
+
+class EsquemaCompilado(Generic[T]):
+    def __init__(self, modelo: type[T], formato: Optional[dict[str, Any]] = None):
+        self.modelo = modelo
+        self.impressao_digital = impressao_digital(modelo)
+        self.formato = formato or formato_estrito(modelo)
+        self.adaptador: TypeAdapter[T] = TypeAdapter(modelo)
+
+    @property
+    def nome(self) -> str:
+        return self.formato["name"]
+
+    def validar_json(self, texto: str) -> T:
+        return self.adaptador.validate_json(texto)
+
+    def serializar_json(self, valor: T) -> str:
+        return self.adaptador.dump_json(valor).decode("utf-8")
+
+
+class RegistroEsquemas:
+    """Um `EsquemaCompilado` por modelo, criado na primeira vez que é pedido"""
+
+    def __init__(self):
+        self._esquemas: dict[type, EsquemaCompilado] = {}
+        # Carregados de um artefato e ainda não associados a uma classe
+        self._precomputados: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, modelo: type[T]) -> EsquemaCompilado[T]:
+        esquema = self._esquemas.get(modelo)
+        if esquema is not None:
+            return esquema
+        with self._lock:
+            esquema = self._esquemas.get(modelo)
+            if esquema is None:
+                digital = impressao_digital(modelo)
+                formato = self._precomputados.pop(digital, None)
+                esquema = EsquemaCompilado(modelo, formato)
+                self._esquemas[modelo] = esquema
+            return esquema
+
+    def precompilar(self, *modelos: type) -> None:
+        """Compila os esquemas já no início, tirando o custo da primeira chamada"""
+        for modelo in modelos:
+            self.obter(modelo)
+
+    def salvar(self, caminho: str) -> int:
+        with self._lock:
+            artefato = {
+                esquema.impressao_digital: esquema.formato
+                for esquema in self._esquemas.values()
+            }
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(artefato, f, ensure_ascii=False)
+        return len(artefato)
+
+    def carregar(self, caminho: str) -> int:
+        with open(caminho, "r", encoding="utf-8") as f:
+            artefato = json.load(f)
+        with self._lock:
+            self._precomputados.update(artefato)
+        return len(artefato)
+
+
+_registro = RegistroEsquemas()
+
+
+def obter_esquema(modelo: type[T]) -> EsquemaCompilado[T]:
+    return _registro.obter(modelo)
+
+
+def precompilar_esquemas(*modelos: type) -> None:
+    _registro.precompilar(*modelos)
+
+
+def salvar_esquemas(caminho: str) -> int:
+    return _registro.salvar(caminho)
+
+
+def carregar_esquemas(caminho: str) -> int:
+    return _registro.carregar(caminho)
+
+
+def _parametros_texto(esquema: EsquemaCompilado, parametros: dict) -> dict:
+    texto = dict(parametros.pop("text", None) or {})
+    texto["format"] = esquema.formato
+    return texto
+
+
+def corpo_com_esquema(text_format: type, **parametros) -> dict[str, Any]:
+    """Corpo de `responses.create` com o esquema em `text.format` (ex.: Batch API)"""
+    esquema = obter_esquema(text_format)
+    return {**parametros, "text": _parametros_texto(esquema, parametros)}
+
+
+def _saida(esquema: EsquemaCompilado[T], response: Any) -> Optional[T]:
+    # Recusas do modelo não têm output_text; como no SDK, o resultado é None
+    texto = response.output_text
+    return esquema.validar_json(texto) if texto else None
+
+
+def parse_com_esquema(
+    text_format: type[T], client: Optional[OpenAI] = None, **parametros
+) -> Optional[T]:
+    """Equivalente a `responses.parse(...).output_parsed` com o esquema já compilado"""
+    esquema = obter_esquema(text_format)
+    client = client or obter_cliente()
+    response = client.responses.create(
+        text=_parametros_texto(esquema, parametros), **parametros
+    )
+    return _saida(esquema, response)
+
+
+async def parse_com_esquema_async(
+    text_format: type[T], client: Optional[AsyncOpenAI] = None, **parametros
+) -> Optional[T]:
+    """Versão assíncrona de `parse_com_esquema`"""
+    esquema = obter_esquema(text_format)
+    client = client or obter_cliente_async()
+    response = await client.responses.create(
+        text=_parametros_texto(esquema, parametros), **parametros
+    )
+    return _saida(esquema, response)
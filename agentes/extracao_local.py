@@ -0,0 +1,131 @@
+"""
+Extração local de dados de contato, sem LLM.
+
+Textos como "Meu nome é Alberto Souza e meu telefone é (11) 99999-9999"
+seguem poucos formatos: um nome depois de "meu nome é"/"me chamo", um
+telefone brasileiro (com ou sem +55, DDD entre parênteses, 8 ou 9 dígitos)
+e, às vezes, uma cidade conhecida. Regex resolvem esses casos em
+microssegundos. `extrair_contato` devolve os campos e uma confiança: alta
+quando há exatamente um nome e um telefone achados por padrões
+explícitos, baixa quando algo é ambíguo ou quando o texto menciona um
+lugar fora da lista de cidades (aí o LLM decide, se estiver disponível).
+"""
+
+import re
+from typing import Optional
+
+from agentes.texto import normalizar
+
+_PALAVRA_NOME = r"[A-ZÀ-Ý][a-zà-ÿ]+"
+_NOME = rf"{_PALAVRA_NOME}(?:\s+(?:(?:d[aeo]s?|e)\s+)?{_PALAVRA_NOME})*"
+
+_PADRAO_NOME = re.compile(
+    r"(?i:meu nome [ée]|me chamo|nome:|aqui [ée] (?:o|a)|eu sou (?:o|a)|"
+    r"my name is|this is)\s+"
+    rf"({_NOME})"
+)
+
+_PADRAO_TELEFONE = re.compile(
+    r"(?<!\d)(?:\+?55[\s-]?)?"  # código do país
+    r"(?:\((\d{2})\)|(\d{2}))?[\s-]?"  # DDD, com ou sem parênteses
+    r"(9?\d{4})[\s.-]?(\d{4})(?!\d)"
+)
+
+# Capitais e maiores cidades; a chave é a forma normalizada
+CIDADES = {
+    normalizar(cidade): cidade
+    for cidade in [
+        "São Paulo",
+        "Rio de Janeiro",
+        "Belo Horizonte",
+        "Brasília",
+        "Salvador",
+        "Fortaleza",
+        "Recife",
+        "Curitiba",
+        "Porto Alegre",
+        "Manaus",
+        "Belém",
+        "Goiânia",
+        "Campinas",
+        "Florianópolis",
+        "Vitória",
+        "Natal",
+        "João Pessoa",
+        "Maceió",
+        "Teresina",
+        "São Luís",
+        "Aracaju",
+        "Cuiabá",
+        "Campo Grande",
+        "Porto Velho",
+        "Rio Branco",
+        "Macapá",
+        "Boa Vista",
+        "Palmas",
+        "Santos",
+        "Guarulhos",
+        "Niterói",
+        "Ribeirão Preto",
+        "Uberlândia",
+        "Sorocaba",
+        "Joinville",
+        "Londrina",
+    ]
+}
+_PADRAO_CIDADE = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, CIDADES), key=len, reverse=True)) + r")\b"
+)
+
+
+# Indícios de que o texto cita um lugar: "moro em Osasco", "sou de Itu"
+_PADRAO_LOCAL = re.compile(
+    r"(?i:\b(?:moro|vivo|resido|estou)\s+(?:em|no|na)\b|\bsou d[aeo]\b|\bcidade\b)"
+    r"|\b(?:de|em|no|na)\s+[A-ZÀ-Ý][a-zà-ÿ]+"
+)
+
+
+def extrair_telefones(texto: str) -> list[str]:
+    """Telefones no formato "(DD) NNNNN-NNNN" (ou sem DDD, se não houver)"""
+    telefones = []
+    for ddd_parenteses, ddd, prefixo, sufixo in _PADRAO_TELEFONE.findall(texto):
+        ddd = ddd_parenteses or ddd
+        numero = f"{prefixo}-{sufixo}"
+        telefones.append(f"({ddd}) {numero}" if ddd else numero)
+    return list(dict.fromkeys(telefones))
+
+
+def extrair_nomes(texto: str) -> list[str]:
+    return list(dict.fromkeys(_PADRAO_NOME.findall(texto)))
+
+
+def extrair_cidades(texto: str) -> list[str]:
+    encontradas = _PADRAO_CIDADE.findall(normalizar(texto))
+    return list(dict.fromkeys(CIDADES[cidade] for cidade in encontradas))
+
+
+def extrair_contato(texto: str) -> Optional[tuple[dict[str, Optional[str]], float]]:
+    """Campos `nome`, `telefone` e `cidade` e a confiança; None sem nome ou telefone"""
+    nomes = extrair_nomes(texto)
+    telefones = extrair_telefones(texto)
+    if not nomes or not telefones:
+        return None
+    # "Carlos dos Santos" não é uma menção à cidade de Santos
+    sem_nomes = texto
+    for nome in nomes:
+        sem_nomes = sem_nomes.replace(nome, " ")
+    cidades = extrair_cidades(sem_nomes)
+    # Mais de um candidato para o mesmo campo: não há como escolher com regex.
+    # Um lugar que não está em CIDADES seria perdido em silêncio
+    ambiguo = (
+        len(nomes) > 1
+        or len(telefones) > 1
+        or len(cidades) > 1
+        or (not cidades and _PADRAO_LOCAL.search(sem_nomes) is not None)
+    )
+    campos = {
+        "nome": nomes[0],
+        "telefone": telefones[0],
+        "cidade": cidades[0] if cidades else None,
+    }
+    return campos, 0.5 if ambiguo else 0.95
@@ -0,0 +1,265 @@
+"""
+Execução de chamadas de ferramentas.
+
+Quando o modelo pede várias funções no mesmo turno (ex.: cotações de AAPL,
+MSFT e GOOG), elas são independentes entre si. Aqui executamos todas ao
+mesmo tempo: funções bloqueantes em um pool de threads, corrotinas no
+asyncio, cada uma com seu timeout, e devolvemos os resultados na ordem
+original para montar o histórico de mensagens.
+
+Uma ferramenta que falha (exceção, argumentos inválidos, timeout) vira um
+`function_call_output` de erro para o modelo, sem derrubar as outras
+chamadas do turno. Python não interrompe uma thread em execução: uma
+função bloqueante que estoura o timeout continua rodando até terminar.
+Para ela não tomar a vaga das próximas chamadas, o pool em que ela está
+é aposentado e as chamadas seguintes usam um pool novo.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturoTimeoutError
+from typing import Any, Callable, Optional
+
+from pydantic import create_model
+
+from agentes.esquemas import esquema_estrito
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_PADRAO_SEGUNDOS = 30.0
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock_executor = threading.Lock()
+
+
+def _obter_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock_executor:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=16, thread_name_prefix="ferramenta"
+            )
+        return _executor
+
+
+def _aposentar_executor(executor: ThreadPoolExecutor) -> None:
+    # A thread travada fica no pool antigo, que termina o que já recebeu
+    # mas não recebe mais nada; as próximas chamadas vão para um pool novo
+    global _executor
+    with _lock_executor:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _resolver(chamada: Any, funcoes: dict[str, Callable]) -> tuple[Callable, dict]:
+    funcao = funcoes.get(chamada.name)
+    if funcao is None:
+        raise ValueError(f"Função desconhecida: {chamada.name}")
+    return funcao, json.loads(chamada.arguments or "{}")
+
+
+def _saida(chamada: Any, resultado: Any) -> dict[str, str]:
+    return {
+        "type": "function_call_output",
+        "call_id": chamada.call_id,
+        "output": str(resultado),
+    }
+
+
+def _saida_timeout(chamada: Any, timeout: float) -> dict[str, str]:
+    return _saida(
+        chamada, f"Erro: a ferramenta {chamada.name} excedeu o tempo limite de {timeout}s"
+    )
+
+
+def _saida_erro(chamada: Any, erro: Exception) -> dict[str, str]:
+    logger.warning(f"Ferramenta {chamada.name} falhou: {erro!r}")
+    return _saida(
+        chamada,
+        f"Erro: a ferramenta {chamada.name} falhou ({type(erro).__name__}: {erro})",
+    )
+
+
+def executar_chamadas(
+    chamadas: list[Any],
+    funcoes: dict[str, Callable],
+    timeout_segundos: float = TIMEOUT_PADRAO_SEGUNDOS,
+    timeouts: Optional[dict[str, float]] = None,
+) -> list[dict[str, str]]:
+    """Executa as chamadas em paralelo e devolve os `function_call_output` na mesma ordem"""
+    timeouts = timeouts or {}
+    executor = _obter_executor()
+    inicio = time.monotonic()
+
+    futuros = []
+    for chamada in chamadas:
+        try:
+            funcao, argumentos = _resolver(chamada, funcoes)
+        except Exception as erro:
+            futuro = Future()
+            futuro.set_exception(erro)
+        else:
+            if inspect.iscoroutinefunction(funcao):
+                futuro = executor.submit(asyncio.run, funcao(**argumentos))
+            else:
+                futuro = executor.submit(funcao, **argumentos)
+        futuros.append(futuro)
+
+    saidas = []
+    travou = False
+    for chamada, futuro in zip(chamadas, futuros):
+        timeout = timeouts.get(chamada.name, timeout_segundos)
+        restante = max(0.0, inicio + timeout - time.monotonic())
+        try:
+            saidas.append(_saida(chamada, futuro.result(timeout=restante)))
+        except FuturoTimeoutError:
+            # Só sai da fila se ainda não começou; rodando, segue até o fim
+            travou |= not futuro.cancel()
+            saidas.append(_saida_timeout(chamada, timeout))
+        except Exception as erro:
+            saidas.append(_saida_erro(chamada, erro))
+    if travou:
+        _aposentar_executor(executor)
+    return saidas
+
+
+async def executar_chamadas_async(
+    chamadas: list[Any],
+    funcoes: dict[str, Callable],
+    timeout_segundos: float = TIMEOUT_PADRAO_SEGUNDOS,
+    timeouts: Optional[dict[str, float]] = None,
+) -> list[dict[str, str]]:
+    """Versão assíncrona: corrotinas rodam no loop atual, funções bloqueantes em threads"""
+    timeouts = timeouts or {}
+
+    async def executar(chamada: Any) -> dict[str, str]:
+        executor = None
+        timeout = timeouts.get(chamada.name, timeout_segundos)
+        try:
+            funcao, argumentos = _resolver(chamada, funcoes)
+            if inspect.iscoroutinefunction(funcao):
+                tarefa = funcao(**argumentos)
+            else:
+                executor = _obter_executor()
+                tarefa = asyncio.get_running_loop().run_in_executor(
+                    executor, lambda: funcao(**argumentos)
+                )
+            return _saida(chamada, await asyncio.wait_for(tarefa, timeout))
+        except asyncio.TimeoutError:
+            if executor is not None:
+                _aposentar_executor(executor)
+            return _saida_timeout(chamada, timeout)
+        except Exception as erro:
+            return _saida_erro(chamada, erro)
+
+    return list(await asyncio.gather(*(executar(chamada) for chamada in chamadas)))
+
+
+class RegistroFerramentas:
+    """Registro de ferramentas com esquema derivado das type hints e despacho O(1)"""
+
+    def __init__(self):
+        self._definicoes: dict[str, dict[str, Any]] = {}
+        self.funcoes: dict[str, Callable] = {}
+
+    def ferramenta(
+        self,
+        funcao: Optional[Callable] = None,
+        *,
+        nome: Optional[str] = None,
+        descricao: Optional[str] = None,
+    ):
+        """Decorador: `@registro.ferramenta` ou `@registro.ferramenta(nome=...)`"""
+
+        def registrar(funcao: Callable) -> Callable:
+            self.registrar(funcao, nome=nome, descricao=descricao)
+            return funcao
+
+        return registrar(funcao) if funcao is not None else registrar
+
+    def registrar(
+        self,
+        funcao: Callable,
+        nome: Optional[str] = None,
+        descricao: Optional[str] = None,
+    ) -> None:
+        nome = nome or funcao.__name__
+        campos = {}
+        for parametro in inspect.signature(funcao).parameters.values():
+            anotacao = (
+                parametro.annotation
+                if parametro.annotation is not inspect.Parameter.empty
+                else Any
+            )
+            padrao = (
+                parametro.default
+                if parametro.default is not inspect.Parameter.empty
+                else ...
+            )
+            campos[parametro.name] = (anotacao, padrao)
+
+        # Parâmetros opcionais não são compatíveis com o modo strict
+        strict = all(padrao is ... for _, padrao in campos.values())
+        argumentos = create_model(f"{nome}_argumentos", **campos)
+        self._definicoes[nome] = {
+            "type": "function",
+            "name": nome,
+            "description": descricao or inspect.getdoc(funcao) or "",
+            "parameters": (
+                esquema_estrito(argumentos)
+                if strict
+                else argumentos.model_json_schema()
+            ),
+            "strict": strict,
+        }
+
+        def validar(kwargs: dict[str, Any]) -> dict[str, Any]:
+            validados = argumentos.model_validate(kwargs)
+            return {campo: getattr(validados, campo) for campo in campos}
+
+        if inspect.iscoroutinefunction(funcao):
+
+            async def chamar(**kwargs):
+                return await funcao(**validar(kwargs))
+
+        else:
+
+            def chamar(**kwargs):
+                return funcao(**validar(kwargs))
+
+        self.funcoes[nome] = chamar
+
+    def definicoes(self) -> list[dict[str, Any]]:
+        """Lista no formato `tools` da Responses API"""
+        return list(self._definicoes.values())
+
+    def chamar(self, nome: str, argumentos: str) -> Any:
+        """Executa uma ferramenta pelo nome com os argumentos JSON do modelo"""
+        funcao = self.funcoes.get(nome)
+        if funcao is None:
+            raise ValueError(f"Função desconhecida: {nome}")
+        return funcao(**json.loads(argumentos or "{}"))
+
+    def executar(
+        self,
+        chamadas: list[Any],
+        timeout_segundos: float = TIMEOUT_PADRAO_SEGUNDOS,
+        timeouts: Optional[dict[str, float]] = None,
+    ) -> list[dict[str, str]]:
+        return executar_chamadas(chamadas, self.funcoes, timeout_segundos, timeouts)
+
+    async def executar_async(
+        self,
+        chamadas: list[Any],
+        timeout_segundos: float = TIMEOUT_PADRAO_SEGUNDOS,
+        timeouts: Optional[dict[str, float]] = None,
+    ) -> list[dict[str, str]]:
+        return await executar_chamadas_async(
+            chamadas, self.funcoes, timeout_segundos, timeouts
+        )
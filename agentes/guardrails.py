@@ -0,0 +1,86 @@
+"""
+Guardrails com curto-circuito.
+
+As verificações rodam em paralelo e são avaliadas na ordem em que
+terminam: assim que uma reprova a entrada, o veredito está decidido e as
+chamadas LLM ainda em andamento são canceladas. Opcionalmente, as
+verificações baratas rodam antes das caras, que só começam se as baratas
+aprovarem.
+"""
+
+import asyncio
+from itertools import groupby
+from typing import Any, Awaitable, Callable, Optional
+
+from pydantic import BaseModel, Field
+
+from agentes.instrumentacao import na_etapa
+
+
+class Verificacao(BaseModel):
+    nome: str
+    executar: Callable[[str], Awaitable[Any]]
+    aprovada: Callable[[Any], bool]
+    custo: float = Field(default=1.0, description="Custo relativo (ex.: 0 para regras locais)")
+
+
+class ResultadoGuardrails(BaseModel):
+    valido: bool
+    resultados: dict[str, Any] = Field(default_factory=dict)
+    reprovada_por: Optional[str] = None
+    canceladas: list[str] = Field(default_factory=list)
+
+
+async def _executar_grupo(
+    entrada: str, verificacoes: list[Verificacao], resultado: ResultadoGuardrails
+) -> bool:
+    async def executar(verificacao: Verificacao) -> Any:
+        with na_etapa(verificacao.nome):
+            return await verificacao.executar(entrada)
+
+    tarefas = {
+        asyncio.create_task(executar(verificacao)): verificacao
+        for verificacao in verificacoes
+    }
+    try:
+        while tarefas:
+            concluidas, _ = await asyncio.wait(
+                tarefas, return_when=asyncio.FIRST_COMPLETED
+            )
+            for tarefa in concluidas:
+                verificacao = tarefas.pop(tarefa)
+                resultado.resultados[verificacao.nome] = tarefa.result()
+                if not verificacao.aprovada(tarefa.result()):
+                    resultado.reprovada_por = verificacao.nome
+                    return False
+        return True
+    finally:
+        # Veredito decidido (ou erro): não há por que esperar o resto
+        for tarefa, verificacao in tarefas.items():
+            tarefa.cancel()
+            resultado.canceladas.append(verificacao.nome)
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+async def executar_guardrails(
+    entrada: str,
+    verificacoes: list[Verificacao],
+    baratas_primeiro: bool = False,
+) -> ResultadoGuardrails:
+    """Aprova a entrada só se todas as verificações aprovarem; para na primeira reprovação"""
+    resultado = ResultadoGuardrails(valido=True)
+
+    if baratas_primeiro:
+        ordenadas = sorted(verificacoes, key=lambda verificacao: verificacao.custo)
+        grupos = [list(grupo) for _, grupo in groupby(ordenadas, lambda v: v.custo)]
+    else:
+        grupos = [verificacoes]
+
+    for indice, grupo in enumerate(grupos):
+        if not await _executar_grupo(entrada, grupo, resultado):
+            resultado.valido = False
+            resultado.canceladas.extend(
+                verificacao.nome for restante in grupos[indice + 1 :] for verificacao in restante
+            )
+            break
+    return resultado
@@ -0,0 +1,489 @@
+"""
+Instrumentação das chamadas ao LLM.
+
+Os clientes compartilhados de `agentes.cliente` passam por `instrumentar`,
+que envolve `responses.create`, `responses.parse` e
+`chat.completions.create`. Cada chamada vira um `ChamadaLLM` com tempo
+total, tempo até o primeiro byte, tokens (entrada, saída e em cache),
+modelo, custo estimado e a etapa de quem chamou, entregue às saídas
+registradas: agregador em memória, arquivo JSONL ou spans OpenTelemetry.
+
+A etapa vem de um contextvar, então vale para threads de `asyncio.to_thread`
+e tarefas criadas dentro do bloco:
+
+    with na_etapa("extracao"):
+        extrair_informacao_evento(entrada)
+
+`coletar_chamadas` devolve as chamadas feitas dentro de um bloco, para quem
+precisa do custo de uma operação específica (ex.: `agentes.cascata`).
+
+Sem nenhuma saída registrada nem coleta ativa, as chamadas seguem direto,
+sem medição.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Iterator, Optional, Protocol, TypeVar
+
+from pydantic import BaseModel
+
+# USD por milhão de tokens: (entrada, entrada em cache, saída)
+PRECOS_POR_MILHAO: dict[str, tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "o4-mini": (1.10, 0.275, 4.40),
+}
+
+
+class ChamadaLLM(BaseModel):
+    operacao: str
+    modelo: str
+    etapa: Optional[str] = None
+    local: Optional[str] = None
+    prefixo: Optional[str] = None
+    inicio: float
+    duracao_segundos: float = 0.0
+    tempo_primeiro_byte: Optional[float] = None
+    streaming: bool = False
+    tokens_entrada: int = 0
+    tokens_saida: int = 0
+    tokens_cache: int = 0
+    custo_estimado: Optional[float] = None
+    erro: Optional[str] = None
+
+
+def estimar_custo(
+    modelo: str, tokens_entrada: int, tokens_cache: int, tokens_saida: int
+) -> Optional[float]:
+    """Custo em USD pela tabela de preços; None para modelos desconhecidos"""
+    # Nomes com data (gpt-4o-mini-2024-07-18) usam o prefixo mais longo
+    prefixo = max(
+        (nome for nome in PRECOS_POR_MILHAO if modelo.startswith(nome)),
+        key=len,
+        default=None,
+    )
+    if prefixo is None:
+        return None
+    entrada, cache, saida = PRECOS_POR_MILHAO[prefixo]
+    return (
+        (tokens_entrada - tokens_cache) * entrada
+        + tokens_cache * cache
+        + tokens_saida * saida
+    ) / 1_000_000
+
+
+# --------------------------------------------------------------
+# Etapa de quem chama
+# --------------------------------------------------------------
+
+_etapa: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "etapa_llm", default=None
+)
+
+
+@contextlib.contextmanager
+def na_etapa(nome: str) -> Iterator[None]:
+    """Atribui as chamadas feitas dentro do bloco à etapa `nome`"""
+    token = _etapa.set(nome)
+    try:
+        yield
+    finally:
+        _etapa.reset(token)
+
+
+def etapa_atual() -> Optional[str]:
+    return _etapa.get()
+
+
+_coletores: contextvars.ContextVar[tuple[list["ChamadaLLM"], ...]] = (
+    contextvars.ContextVar("coletores_llm", default=())
+)
+
+
+@contextlib.contextmanager
+def coletar_chamadas() -> Iterator[list[ChamadaLLM]]:
+    """Lista das chamadas concluídas dentro do bloco (ex.: para somar o custo)"""
+    chamadas: list[ChamadaLLM] = []
+    token = _coletores.set(_coletores.get() + (chamadas,))
+    try:
+        yield chamadas
+    finally:
+        _coletores.reset(token)
+
+
+# --------------------------------------------------------------
+# Saídas
+# --------------------------------------------------------------
+
+
+class Saida(Protocol):
+    def registrar(self, chamada: ChamadaLLM) -> None: ...
+
+
+class AgregadorMemoria:
+    """Guarda as últimas chamadas e soma tempo, tokens e custo por etapa e modelo"""
+
+    def __init__(self, max_chamadas: int = 10000):
+        self.chamadas: deque[ChamadaLLM] = deque(maxlen=max_chamadas)
+        self._totais: dict[tuple[str, str], dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self._lock = threading.Lock()
+
+    def registrar(self, chamada: ChamadaLLM) -> None:
+        with self._lock:
+            self.chamadas.append(chamada)
+            total = self._totais[(chamada.etapa or "-", chamada.modelo)]
+            total["chamadas"] += 1
+            total["erros"] += chamada.erro is not None
+            total["tempo_segundos"] += chamada.duracao_segundos
+            total["tokens_entrada"] += chamada.tokens_entrada
+            total["tokens_saida"] += chamada.tokens_saida
+            total["tokens_cache"] += chamada.tokens_cache
+            total["custo_estimado"] += chamada.custo_estimado or 0.0
+
+    def resumo(self) -> dict[str, dict[str, Any]]:
+        """Totais por "etapa/modelo", da etapa mais cara para a mais barata"""
+        with self._lock:
+            linhas = {
+                f"{etapa}/{modelo}": dict(total)
+                for (etapa, modelo), total in self._totais.items()
+            }
+        for total in linhas.values():
+            total["taxa_cache"] = (
+                total["tokens_cache"] / total["tokens_entrada"]
+                if total["tokens_entrada"]
+                else 0.0
+            )
+        return dict(
+            sorted(
+                linhas.items(),
+                key=lambda item: (item[1]["custo_estimado"], item[1]["tempo_segundos"]),
+                reverse=True,
+            )
+        )
+
+
+class SaidaJSONL:
+    """Uma linha JSON por chamada, para análise posterior"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+    def registrar(self, chamada: ChamadaLLM) -> None:
+        linha = json.dumps(chamada.model_dump(), ensure_ascii=False)
+        with self._lock, open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+
+
+class SaidaOpenTelemetry:
+    """Um span por chamada, com os atributos `gen_ai.*` das convenções semânticas"""
+
+    def __init__(self, tracer: Any = None):
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as erro:
+                raise ImportError(
+                    "SaidaOpenTelemetry precisa do pacote opentelemetry-api"
+                ) from erro
+            tracer = trace.get_tracer("agentes")
+        self.tracer = tracer
+
+    def registrar(self, chamada: ChamadaLLM) -> None:
+        atributos = {
+            "gen_ai.operation.name": chamada.operacao,
+            "gen_ai.request.model": chamada.modelo,
+            "gen_ai.usage.input_tokens": chamada.tokens_entrada,
+            "gen_ai.usage.output_tokens": chamada.tokens_saida,
+            "agentes.tokens_cache": chamada.tokens_cache,
+            "agentes.etapa": chamada.etapa,
+            "agentes.streaming": chamada.streaming,
+            "agentes.tempo_primeiro_byte": chamada.tempo_primeiro_byte,
+            "agentes.custo_estimado": chamada.custo_estimado,
+            "error.type": chamada.erro,
+        }
+        inicio_ns = int(chamada.inicio * 1e9)
+        span = self.tracer.start_span(
+            f"{chamada.operacao} {chamada.modelo}",
+            start_time=inicio_ns,
+            attributes={k: v for k, v in atributos.items() if v is not None},
+        )
+        span.end(end_time=inicio_ns + int(chamada.duracao_segundos * 1e9))
+
+
+S = TypeVar("S", bound=Saida)
+
+_saidas: list[Saida] = []
+_lock_saidas = threading.Lock()
+
+
+def adicionar_saida(saida: S) -> S:
+    with _lock_saidas:
+        _saidas.append(saida)
+    return saida
+
+
+def remover_saida(saida: Saida) -> None:
+    with _lock_saidas:
+        if saida in _saidas:
+            _saidas.remove(saida)
+
+
+# --------------------------------------------------------------
+# Medição
+# --------------------------------------------------------------
+
+
+_DIRETORIOS_INTERNOS = tuple(
+    os.path.normcase(caminho)
+    for caminho in (
+        os.path.dirname(os.path.abspath(__file__)),
+        sysconfig.get_paths()["stdlib"],
+        sysconfig.get_paths()["purelib"],
+    )
+)
+
+
+def _local_chamador() -> Optional[str]:
+    """Primeiro quadro da pilha fora de agentes/, da stdlib e dos pacotes instalados"""
+    quadro = sys._getframe(2)
+    while quadro is not None:
+        arquivo = quadro.f_code.co_filename
+        if not arquivo.startswith("<") and not os.path.normcase(
+            os.path.abspath(arquivo)
+        ).startswith(_DIRETORIOS_INTERNOS):
+            return f"{os.path.basename(arquivo)}:{quadro.f_lineno}"
+        quadro = quadro.f_back
+    return None
+
+
+def _hash_prefixo(parametros: dict) -> str:
+    """Hash da parte que deveria se repetir entre chamadas: tudo menos a última mensagem"""
+    entrada = parametros.get("input", parametros.get("messages"))
+    fixo = entrada[:-1] if isinstance(entrada, list) else []
+    conteudo = json.dumps(
+        [parametros.get("instructions"), fixo], ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:16]
+
+
+class _Medicao:
+    def __init__(self, operacao: str, parametros: dict):
+        self.chamada = ChamadaLLM(
+            operacao=operacao,
+            modelo=str(parametros.get("model", "")),
+            etapa=_etapa.get(),
+            local=_local_chamador(),
+            prefixo=_hash_prefixo(parametros),
+            inicio=time.time(),
+            streaming=bool(parametros.get("stream")),
+        )
+        self._inicio = time.perf_counter()
+        self._finalizada = False
+
+    def primeiro_byte(self) -> None:
+        # Com retentativas do SDK, vale a resposta que foi usada (a última)
+        self.chamada.tempo_primeiro_byte = time.perf_counter() - self._inicio
+
+    def uso(self, usage: Any) -> None:
+        if usage is None:
+            return
+        chamada = self.chamada
+        if hasattr(usage, "input_tokens"):
+            chamada.tokens_entrada = usage.input_tokens or 0
+            chamada.tokens_saida = usage.output_tokens or 0
+            detalhes = getattr(usage, "input_tokens_details", None)
+        else:
+            chamada.tokens_entrada = usage.prompt_tokens or 0
+            chamada.tokens_saida = usage.completion_tokens or 0
+            detalhes = getattr(usage, "prompt_tokens_details", None)
+        chamada.tokens_cache = getattr(detalhes, "cached_tokens", None) or 0
+
+    def finalizar(self, erro: Optional[BaseException] = None) -> None:
+        if self._finalizada:
+            return
+        self._finalizada = True
+        chamada = self.chamada
+        chamada.duracao_segundos = time.perf_counter() - self._inicio
+        if erro is not None:
+            chamada.erro = type(erro).__name__
+        chamada.custo_estimado = estimar_custo(
+            chamada.modelo,
+            chamada.tokens_entrada,
+            chamada.tokens_cache,
+            chamada.tokens_saida,
+        )
+        for coletor in _coletores.get():
+            coletor.append(chamada)
+        with _lock_saidas:
+            saidas = list(_saidas)
+        for saida in saidas:
+            saida.registrar(chamada)
+
+
+_medicao_atual: contextvars.ContextVar[Optional[_Medicao]] = contextvars.ContextVar(
+    "medicao_llm", default=None
+)
+
+
+def _registrar_primeiro_byte(response: Any) -> None:
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.primeiro_byte()
+
+
+async def _registrar_primeiro_byte_async(response: Any) -> None:
+    _registrar_primeiro_byte(response)
+
+
+def ganchos_http(assincrono: bool = False) -> dict[str, list]:
+    """`event_hooks` do httpx que marcam a chegada dos cabeçalhos da resposta"""
+    if assincrono:
+        return {"response": [_registrar_primeiro_byte_async]}
+    return {"response": [_registrar_primeiro_byte]}
+
+
+def _uso_do_evento(evento: Any) -> Any:
+    # Responses API: o uso vem no evento final; Chat Completions: no último chunk
+    resposta = getattr(evento, "response", None)
+    if resposta is not None and getattr(evento, "type", None) == "response.completed":
+        return resposta.usage
+    return getattr(evento, "usage", None)
+
+
+class _FluxoInstrumentado:
+    def __init__(self, fluxo: Any, medicao: _Medicao):
+        self._fluxo = fluxo
+        self._medicao = medicao
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self._fluxo, nome)
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for evento in self._fluxo:
+                uso = _uso_do_evento(evento)
+                if uso is not None:
+                    self._medicao.uso(uso)
+                yield evento
+        except GeneratorExit:
+            # Consumidor parou antes do fim (ex.: break): não é erro da chamada
+            self._medicao.finalizar()
+            raise
+        except BaseException as erro:
+            self._medicao.finalizar(erro)
+            raise
+        self._medicao.finalizar()
+
+    def close(self) -> None:
+        self._fluxo.close()
+        self._medicao.finalizar()
+
+    def __enter__(self) -> "_FluxoInstrumentado":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class _FluxoInstrumentadoAsync:
+    def __init__(self, fluxo: Any, medicao: _Medicao):
+        self._fluxo = fluxo
+        self._medicao = medicao
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self._fluxo, nome)
+
+    async def __aiter__(self):
+        try:
+            async for evento in self._fluxo:
+                uso = _uso_do_evento(evento)
+                if uso is not None:
+                    self._medicao.uso(uso)
+                yield evento
+        except GeneratorExit:
+            # Consumidor parou antes do fim (ex.: break): não é erro da chamada
+            self._medicao.finalizar()
+            raise
+        except BaseException as erro:
+            self._medicao.finalizar(erro)
+            raise
+        self._medicao.finalizar()
+
+    async def close(self) -> None:
+        await self._fluxo.close()
+        self._medicao.finalizar()
+
+    async def __aenter__(self) -> "_FluxoInstrumentadoAsync":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+def _envolver(operacao: str, metodo):
+    def instrumentado(*args, **parametros):
+        if not _saidas and not _coletores.get():
+            return metodo(*args, **parametros)
+        medicao = _Medicao(operacao, parametros)
+        token = _medicao_atual.set(medicao)
+        try:
+            resultado = metodo(*args, **parametros)
+        except BaseException as erro:
+            medicao.finalizar(erro)
+            raise
+        finally:
+            _medicao_atual.reset(token)
+        if medicao.chamada.streaming:
+            return _FluxoInstrumentado(resultado, medicao)
+        medicao.uso(getattr(resultado, "usage", None))
+        medicao.finalizar()
+        return resultado
+
+    return instrumentado
+
+
+def _envolver_async(operacao: str, metodo):
+    async def instrumentado(*args, **parametros):
+        if not _saidas and not _coletores.get():
+            return await metodo(*args, **parametros)
+        medicao = _Medicao(operacao, parametros)
+        token = _medicao_atual.set(medicao)
+        try:
+            resultado = await metodo(*args, **parametros)
+        except BaseException as erro:
+            medicao.finalizar(erro)
+            raise
+        finally:
+            _medicao_atual.reset(token)
+        if medicao.chamada.streaming:
+            return _FluxoInstrumentadoAsync(resultado, medicao)
+        medicao.uso(getattr(resultado, "usage", None))
+        medicao.finalizar()
+        return resultado
+
+    return instrumentado
+
+
+def instrumentar(cliente: Any, assincrono: bool = False) -> Any:
+    """Envolve os métodos de geração do cliente (na instância, não na classe)"""
+    envolver = _envolver_async if assincrono else _envolver
+    cliente.responses.create = envolver("responses.create", cliente.responses.create)
+    cliente.responses.parse = envolver("responses.parse", cliente.responses.parse)
+    cliente.chat.completions.create = envolver(
+        "chat.completions.create", cliente.chat.completions.create
+    )
+    return cliente
@@ -0,0 +1,238 @@
+"""
+Processamento em lote.
+
+Para rodar um bloco de construção sobre centenas de milhares de mensagens,
+os registros (um iterável ou um arquivo JSONL) passam por um pool limitado
+de trabalhadores assíncronos e cada resultado é gravado no JSONL de saída
+assim que fica pronto. O próprio arquivo de saída serve de checkpoint: ao
+rodar de novo, os ids que já têm resultado são pulados e os que falharam
+são tentados outra vez. A retomada reescreve a saída sem as linhas de erro
+e as cortadas, então ao fim de cada execução há uma linha por id.
+
+Também é possível montar um job no formato JSONL da Batch API, para quem
+prefere deixar o processamento com o provedor.
+"""
+
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+_FIM = object()
+# Registros lidos da entrada por ida à thread de leitura
+TAMANHO_LEITURA = 256
+
+
+class ResumoLote(BaseModel):
+    processados: int = 0
+    ignorados: int = 0
+    erros: int = 0
+    tempo_total: float = 0.0
+
+
+def ler_jsonl(caminho: str) -> Iterator[dict]:
+    """Lê um registro por linha, sem carregar o arquivo inteiro"""
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+def _resultados_salvos(
+    caminho_saida: str, campo_id: str
+) -> Iterator[tuple[str, Optional[str]]]:
+    """(linha, id) de cada linha da saída; id None para linhas a descartar
+
+    Descarta linhas com erro (o registro vai ser tentado de novo), repetidas
+    e as que não são JSON válido: uma execução interrompida pode deixar a
+    última linha pela metade.
+    """
+    vistos = set()
+    with open(caminho_saida, "r", encoding="utf-8") as f:
+        for numero, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                logger.warning(f"{caminho_saida}:{numero} incompleta, ignorada")
+                yield linha, None
+                continue
+            id_registro = str(registro[campo_id])
+            if "erro" in registro or id_registro in vistos:
+                yield linha, None
+                continue
+            vistos.add(id_registro)
+            yield linha, id_registro
+
+
+def ids_concluidos(caminho_saida: str, campo_id: str = "id") -> set[str]:
+    """Ids que já têm resultado no arquivo de saída (registros com erro não contam)"""
+    if not os.path.exists(caminho_saida):
+        return set()
+    return {
+        id_registro
+        for _, id_registro in _resultados_salvos(caminho_saida, campo_id)
+        if id_registro is not None
+    }
+
+
+def _preparar_saida(caminho_saida: str, campo_id: str) -> set[str]:
+    """Deixa na saída só os resultados válidos, um por id, e devolve esses ids
+
+    Sem isso, cada retentativa de um id que falhou somaria outra linha de
+    erro. O arquivo só é reescrito quando há o que descartar.
+    """
+    if not os.path.exists(caminho_saida):
+        return set()
+    concluidos = set()
+    descartar = False
+    for linha, id_registro in _resultados_salvos(caminho_saida, campo_id):
+        if id_registro is None:
+            descartar = True
+        else:
+            concluidos.add(id_registro)
+            # Uma linha válida sem "\n" final também pede reescrita
+            descartar |= not linha.endswith("\n")
+
+    if descartar:
+        temporario = f"{caminho_saida}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            for linha, id_registro in _resultados_salvos(caminho_saida, campo_id):
+                if id_registro is not None:
+                    f.write(linha.rstrip("\n") + "\n")
+        os.replace(temporario, caminho_saida)
+    return concluidos
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    if isinstance(valor, dict):
+        return {chave: _serializar(item) for chave, item in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_serializar(item) for item in valor]
+    return valor
+
+
+async def processar_lote_async(
+    registros: Iterable[dict],
+    processar: Callable[[dict], Any],
+    caminho_saida: str,
+    campo_id: str = "id",
+    max_trabalhadores: int = 16,
+    intervalo_log: int = 1000,
+) -> ResumoLote:
+    """Aplica `processar` a cada registro e grava `{id, resultado}` ou `{id, erro}` por linha
+
+    Registros sem `campo_id` usam a posição no iterável como id, então a
+    ordem da entrada precisa ser estável entre execuções para retomar.
+    """
+    resumo = ResumoLote()
+    # Arquivos de entrada e saída são lidos em threads, fora do event loop
+    concluidos = await asyncio.to_thread(_preparar_saida, caminho_saida, campo_id)
+    fila: asyncio.Queue = asyncio.Queue(maxsize=max_trabalhadores * 2)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_trabalhadores)
+    inicio = time.perf_counter()
+
+    async def executar(registro: dict) -> Any:
+        if inspect.iscoroutinefunction(processar):
+            return await processar(registro)
+        return await loop.run_in_executor(executor, processar, registro)
+
+    async def produzir() -> None:
+        # Lê a entrada aos poucos: a fila limitada segura o leitor
+        numerados = enumerate(registros)
+        while lote := await asyncio.to_thread(
+            list, itertools.islice(numerados, TAMANHO_LEITURA)
+        ):
+            for indice, registro in lote:
+                id_registro = str(registro.get(campo_id, indice))
+                if id_registro in concluidos:
+                    resumo.ignorados += 1
+                    continue
+                await fila.put((id_registro, registro))
+        for _ in range(max_trabalhadores):
+            await fila.put(_FIM)
+
+    with open(caminho_saida, "a", encoding="utf-8") as saida:
+
+        def gravar(linha: dict) -> None:
+            saida.write(json.dumps(linha, ensure_ascii=False) + "\n")
+            saida.flush()
+
+        async def trabalhar() -> None:
+            while (item := await fila.get()) is not _FIM:
+                id_registro, registro = item
+                try:
+                    resultado = await executar(registro)
+                    gravar({campo_id: id_registro, "resultado": _serializar(resultado)})
+                    resumo.processados += 1
+                except Exception as erro:
+                    logger.warning(f"Registro {id_registro} falhou: {erro}")
+                    gravar({campo_id: id_registro, "erro": str(erro)})
+                    resumo.erros += 1
+                total = resumo.processados + resumo.erros
+                if intervalo_log and total % intervalo_log == 0:
+                    logger.info(f"{total} registros processados")
+
+        tarefas = [asyncio.create_task(produzir())] + [
+            asyncio.create_task(trabalhar()) for _ in range(max_trabalhadores)
+        ]
+        try:
+            await asyncio.gather(*tarefas)
+        finally:
+            # Se a leitura da entrada falhar, os trabalhadores não ficam presos na fila
+            for tarefa in tarefas:
+                tarefa.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    resumo.tempo_total = time.perf_counter() - inicio
+    return resumo
+
+
+def processar_lote(
+    registros: Iterable[dict],
+    processar: Callable[[dict], Any],
+    caminho_saida: str,
+    campo_id: str = "id",
+    max_trabalhadores: int = 16,
+) -> ResumoLote:
+    """Versão síncrona de `processar_lote_async`"""
+    return asyncio.run(
+        processar_lote_async(
+            registros, processar, caminho_saida, campo_id, max_trabalhadores
+        )
+    )
+
+
+def gerar_job_batch(
+    registros: Iterable[dict],
+    montar_corpo: Callable[[dict], dict],
+    caminho_job: str,
+    url: str = "/v1/responses",
+    campo_id: str = "id",
+) -> int:
+    """Escreve um job JSONL da Batch API (`custom_id`, `method`, `url`, `body`)"""
+    total = 0
+    with open(caminho_job, "w", encoding="utf-8") as f:
+        for indice, registro in enumerate(registros):
+            linha = {
+                "custom_id": str(registro.get(campo_id, indice)),
+                "method": "POST",
+                "url": url,
+                "body": montar_corpo(registro),
+            }
+            f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+            total += 1
+    return total
@@ -0,0 +1,436 @@
+"""
+Memória de conversa com orçamento de tokens.
+
+Reenviar o histórico inteiro a cada turno faz o custo crescer sem limite.
+Aqui os turnos são guardados por sessão com a contagem de tokens feita
+uma única vez (na escrita), e as mensagens enviadas ao modelo são
+montadas dentro de um orçamento: prompt de sistema fixo, resumo opcional
+do que ficou para trás e uma janela deslizante com os turnos mais recentes.
+O armazenamento é plugável (memória do processo ou SQLite).
+"""
+
+import asyncio
+import inspect
+import json
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Optional
+
+from openai import AsyncOpenAI, BadRequestError, NotFoundError, OpenAI
+from pydantic import BaseModel
+
+from agentes.cliente import (
+    obter_cliente,
+    obter_cliente_async,
+    resposta_anterior_expirada,
+)
+from agentes.texto import contar_tokens, truncar_tokens
+
+
+class Turno(BaseModel):
+    papel: str
+    conteudo: str
+    tokens: int
+
+    def mensagem(self) -> dict[str, str]:
+        return {"role": self.papel, "content": self.conteudo}
+
+
+def _turno(papel: str, conteudo: str) -> Turno:
+    return Turno(papel=papel, conteudo=conteudo, tokens=contar_tokens(conteudo))
+
+
+class MemoriaEmProcesso:
+    """Backend em memória com LRU de sessões
+
+    Os turnos de cada sessão não têm limite próprio: quem os descarta é a
+    `MemoriaConversa`, depois de resumi-los ou quando saem da janela.
+    """
+
+    def __init__(self, max_sessoes: int = 10_000):
+        self.max_sessoes = max_sessoes
+        self._sessoes: OrderedDict[str, deque[Turno]] = OrderedDict()
+        self._resumos: dict[str, str] = {}
+        self._ids_resposta: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _sessao(self, sessao_id: str) -> deque[Turno]:
+        turnos = self._sessoes.get(sessao_id)
+        if turnos is None:
+            turnos = self._sessoes[sessao_id] = deque()
+            while len(self._sessoes) > self.max_sessoes:
+                antiga, _ = self._sessoes.popitem(last=False)
+                self._resumos.pop(antiga, None)
+                self._ids_resposta.pop(antiga, None)
+        self._sessoes.move_to_end(sessao_id)
+        return turnos
+
+    def adicionar(self, sessao_id: str, turno: Turno) -> None:
+        with self._lock:
+            self._sessao(sessao_id).append(turno)
+
+    def turnos(self, sessao_id: str) -> list[Turno]:
+        with self._lock:
+            return list(self._sessoes.get(sessao_id, ()))
+
+    def descartar_antigos(self, sessao_id: str, quantidade: int) -> None:
+        with self._lock:
+            turnos = self._sessoes.get(sessao_id)
+            for _ in range(min(quantidade, len(turnos or ()))):
+                turnos.popleft()
+
+    def resumo(self, sessao_id: str) -> Optional[str]:
+        return self._resumos.get(sessao_id)
+
+    def definir_resumo(self, sessao_id: str, resumo: str) -> None:
+        with self._lock:
+            self._resumos[sessao_id] = resumo
+
+    def id_resposta(self, sessao_id: str) -> Optional[str]:
+        return self._ids_resposta.get(sessao_id)
+
+    def definir_id_resposta(self, sessao_id: str, id_resposta: Optional[str]) -> None:
+        with self._lock:
+            if id_resposta is None:
+                self._ids_resposta.pop(sessao_id, None)
+            else:
+                self._ids_resposta[sessao_id] = id_resposta
+
+    def limpar(self, sessao_id: str) -> None:
+        with self._lock:
+            self._sessoes.pop(sessao_id, None)
+            self._resumos.pop(sessao_id, None)
+            self._ids_resposta.pop(sessao_id, None)
+
+
+class MemoriaSQLite:
+    """Backend persistente: nada fica em memória além da conexão"""
+
+    def __init__(self, caminho: str = "memoria.db"):
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conexao.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS turnos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sessao_id TEXT NOT NULL,
+                    turno TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_turnos_sessao ON turnos (sessao_id, id);
+                CREATE TABLE IF NOT EXISTS resumos (
+                    sessao_id TEXT PRIMARY KEY,
+                    resumo TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS ids_resposta (
+                    sessao_id TEXT PRIMARY KEY,
+                    id_resposta TEXT NOT NULL
+                );
+                """
+            )
+
+    def adicionar(self, sessao_id: str, turno: Turno) -> None:
+        with self._lock:
+            self._conexao.execute(
+                "INSERT INTO turnos (sessao_id, turno) VALUES (?, ?)",
+                (sessao_id, turno.model_dump_json()),
+            )
+            self._conexao.commit()
+
+    def turnos(self, sessao_id: str) -> list[Turno]:
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT turno FROM turnos WHERE sessao_id = ? ORDER BY id",
+                (sessao_id,),
+            ).fetchall()
+        return [Turno.model_validate(json.loads(linha[0])) for linha in linhas]
+
+    def descartar_antigos(self, sessao_id: str, quantidade: int) -> None:
+        with self._lock:
+            self._conexao.execute(
+                "DELETE FROM turnos WHERE id IN ("
+                "SELECT id FROM turnos WHERE sessao_id = ? ORDER BY id LIMIT ?)",
+                (sessao_id, quantidade),
+            )
+            self._conexao.commit()
+
+    def resumo(self, sessao_id: str) -> Optional[str]:
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT resumo FROM resumos WHERE sessao_id = ?", (sessao_id,)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def definir_resumo(self, sessao_id: str, resumo: str) -> None:
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO resumos (sessao_id, resumo) VALUES (?, ?)",
+                (sessao_id, resumo),
+            )
+            self._conexao.commit()
+
+    def id_resposta(self, sessao_id: str) -> Optional[str]:
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT id_resposta FROM ids_resposta WHERE sessao_id = ?", (sessao_id,)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def definir_id_resposta(self, sessao_id: str, id_resposta: Optional[str]) -> None:
+        with self._lock:
+            if id_resposta is None:
+                self._conexao.execute(
+                    "DELETE FROM ids_resposta WHERE sessao_id = ?", (sessao_id,)
+                )
+            else:
+                self._conexao.execute(
+                    "INSERT OR REPLACE INTO ids_resposta (sessao_id, id_resposta) VALUES (?, ?)",
+                    (sessao_id, id_resposta),
+                )
+            self._conexao.commit()
+
+    def limpar(self, sessao_id: str) -> None:
+        with self._lock:
+            for tabela in ("turnos", "resumos", "ids_resposta"):
+                self._conexao.execute(
+                    f"DELETE FROM {tabela} WHERE sessao_id = ?", (sessao_id,)
+                )
+            self._conexao.commit()
+
+
+def _parametros_resumo(
+    resumo_anterior: Optional[str], turnos: list[Turno]
+) -> dict[str, str]:
+    historico = "\n".join(f"{turno.papel}: {turno.conteudo}" for turno in turnos)
+    return {
+        "model": "gpt-4o-mini",
+        "instructions": (
+            "Resuma a conversa em poucas frases, mantendo fatos, nomes, "
+            "decisões e pedidos pendentes do usuário."
+        ),
+        "input": f"Resumo anterior: {resumo_anterior or 'nenhum'}\n\nNovos turnos:\n{historico}",
+    }
+
+
+def resumir_com_llm(resumo_anterior: Optional[str], turnos: list[Turno]) -> str:
+    """Resumidor padrão: condensa o resumo anterior e os turnos que saíram da janela"""
+    response = obter_cliente().responses.create(
+        **_parametros_resumo(resumo_anterior, turnos)
+    )
+    return response.output_text
+
+
+async def resumir_com_llm_async(
+    resumo_anterior: Optional[str], turnos: list[Turno]
+) -> str:
+    """Versão assíncrona de `resumir_com_llm`"""
+    response = await obter_cliente_async().responses.create(
+        **_parametros_resumo(resumo_anterior, turnos)
+    )
+    return response.output_text
+
+
+class MemoriaConversa:
+    """Monta as mensagens de cada sessão dentro de um orçamento de tokens"""
+
+    def __init__(
+        self,
+        prompt_sistema: Optional[str] = None,
+        orcamento_tokens: int = 4000,
+        backend: Optional[MemoriaEmProcesso | MemoriaSQLite] = None,
+        resumidor: Optional[
+            Callable[[Optional[str], list[Turno]], str | Awaitable[str]]
+        ] = None,
+        turnos_para_resumir: int = 10,
+    ):
+        self.prompt_sistema = prompt_sistema
+        self.orcamento_tokens = orcamento_tokens
+        self.backend = backend or MemoriaEmProcesso()
+        self.resumidor = resumidor
+        self.turnos_para_resumir = turnos_para_resumir
+        self._tokens_sistema = contar_tokens(prompt_sistema) if prompt_sistema else 0
+
+    def registrar(self, sessao_id: str, papel: str, conteudo: str) -> None:
+        self.backend.adicionar(sessao_id, _turno(papel, conteudo))
+
+    def _turnos(self, sessao_id: str, pendente: Optional[Turno]) -> list[Turno]:
+        turnos = self.backend.turnos(sessao_id)
+        return turnos + [pendente] if pendente else turnos
+
+    def _restante(self, resumo: Optional[str]) -> int:
+        restante = self.orcamento_tokens - self._tokens_sistema
+        return restante - contar_tokens(resumo) if resumo else restante
+
+    def _inicio_janela(self, turnos: list[Turno], resumo: Optional[str]) -> int:
+        restante = self._restante(resumo)
+        inicio_janela = len(turnos)
+        while inicio_janela > 0:
+            tokens = turnos[inicio_janela - 1].tokens
+            # O turno mais recente entra sempre, nem que seja truncado em `_montar`
+            if tokens > restante and inicio_janela < len(turnos):
+                break
+            inicio_janela -= 1
+            restante -= tokens
+        return inicio_janela
+
+    def _deve_resumir(self, inicio_janela: int) -> bool:
+        return self.resumidor is not None and inicio_janela >= self.turnos_para_resumir
+
+    def _compactar(self, sessao_id: str, resumo: str, inicio_janela: int) -> None:
+        # Turnos que ficaram de fora viram resumo e deixam de ocupar o armazenamento
+        self.backend.definir_resumo(sessao_id, resumo)
+        self.backend.descartar_antigos(sessao_id, inicio_janela)
+        # O contexto no servidor ainda tem os turnos antigos: recomeça a cadeia
+        self.backend.definir_id_resposta(sessao_id, None)
+
+    def mensagens(
+        self, sessao_id: str, pendente: Optional[Turno] = None
+    ) -> list[dict[str, str]]:
+        """Prompt de sistema + resumo + turnos mais recentes que couberem no orçamento
+
+        `pendente` é um turno ainda não registrado que entra no fim da janela.
+        """
+        turnos = self._turnos(sessao_id, pendente)
+        resumo = self.backend.resumo(sessao_id)
+        inicio_janela = self._inicio_janela(turnos, resumo)
+
+        if self._deve_resumir(inicio_janela):
+            if inspect.iscoroutinefunction(self.resumidor):
+                raise TypeError("Resumidor assíncrono: use `mensagens_async`")
+            resumo = self.resumidor(resumo, turnos[:inicio_janela])
+            self._compactar(sessao_id, resumo, inicio_janela)
+            return self.mensagens(sessao_id, pendente)
+
+        return self._janela(sessao_id, resumo, turnos, inicio_janela)
+
+    async def mensagens_async(
+        self, sessao_id: str, pendente: Optional[Turno] = None
+    ) -> list[dict[str, str]]:
+        """Versão assíncrona de `mensagens`; um resumidor síncrono roda em thread"""
+        turnos = self._turnos(sessao_id, pendente)
+        resumo = self.backend.resumo(sessao_id)
+        inicio_janela = self._inicio_janela(turnos, resumo)
+
+        if self._deve_resumir(inicio_janela):
+            if inspect.iscoroutinefunction(self.resumidor):
+                resumo = await self.resumidor(resumo, turnos[:inicio_janela])
+            else:
+                resumo = await asyncio.to_thread(
+                    self.resumidor, resumo, turnos[:inicio_janela]
+                )
+            self._compactar(sessao_id, resumo, inicio_janela)
+            return await self.mensagens_async(sessao_id, pendente)
+
+        return self._janela(sessao_id, resumo, turnos, inicio_janela)
+
+    def _janela(
+        self,
+        sessao_id: str,
+        resumo: Optional[str],
+        turnos: list[Turno],
+        inicio_janela: int,
+    ) -> list[dict[str, str]]:
+        if self.resumidor is None and inicio_janela:
+            # Sem resumidor, o que saiu da janela nunca mais é enviado
+            self.backend.descartar_antigos(sessao_id, inicio_janela)
+        return self._montar(resumo, turnos[inicio_janela:])
+
+    def _montar(
+        self, resumo: Optional[str], turnos: list[Turno]
+    ) -> list[dict[str, str]]:
+        mensagens = []
+        if self.prompt_sistema:
+            mensagens.append({"role": "system", "content": self.prompt_sistema})
+        if resumo:
+            mensagens.append(
+                {"role": "system", "content": f"Resumo da conversa até aqui: {resumo}"}
+            )
+        mensagens.extend(turno.mensagem() for turno in turnos)
+        restante = self._restante(resumo)
+        if len(turnos) == 1 and turnos[0].tokens > restante:
+            # Nem o turno mais recente cabe sozinho: vai truncado, mas vai
+            mensagens[-1]["content"] = truncar_tokens(
+                turnos[0].conteudo, max(restante, 1)
+            )
+        return mensagens
+
+    def _cabe_no_orcamento(self, sessao_id: str, pendente: Turno) -> bool:
+        resumo = self.backend.resumo(sessao_id)
+        total = self._tokens_sistema + (contar_tokens(resumo) if resumo else 0)
+        total += sum(turno.tokens for turno in self._turnos(sessao_id, pendente))
+        return total <= self.orcamento_tokens
+
+    def _registrar_troca(self, sessao_id: str, pergunta: Turno, response) -> str:
+        # Só depois do sucesso: uma chamada que falha não deixa turno órfão
+        self.backend.adicionar(sessao_id, pergunta)
+        self.registrar(sessao_id, "assistant", response.output_text)
+        self.backend.definir_id_resposta(sessao_id, response.id)
+        return response.output_text
+
+    def responder(
+        self,
+        sessao_id: str,
+        mensagem: str,
+        model: str = "gpt-4o-mini",
+        client: Optional[OpenAI] = None,
+    ) -> str:
+        """Chama a Responses API e registra a mensagem e a resposta
+
+        Enquanto o histórico cabe no orçamento, o turno é encadeado com
+        `previous_response_id` e só a nova mensagem é enviada. Se a resposta
+        anterior expirou no servidor (ou o histórico estourou o orçamento),
+        as mensagens montadas pela memória são reenviadas por completo.
+        Se a chamada falhar, nada é registrado.
+        """
+        client = client or obter_cliente()
+        pergunta = _turno("user", mensagem)
+
+        response = None
+        id_anterior = self.backend.id_resposta(sessao_id)
+        if id_anterior and self._cabe_no_orcamento(sessao_id, pergunta):
+            try:
+                response = client.responses.create(
+                    model=model,
+                    previous_response_id=id_anterior,
+                    input=[{"role": "user", "content": mensagem}],
+                )
+            except (NotFoundError, BadRequestError) as erro:
+                if not resposta_anterior_expirada(erro):
+                    raise
+        if response is None:
+            response = client.responses.create(
+                model=model, input=self.mensagens(sessao_id, pergunta)
+            )
+
+        return self._registrar_troca(sessao_id, pergunta, response)
+
+    async def responder_async(
+        self,
+        sessao_id: str,
+        mensagem: str,
+        model: str = "gpt-4o-mini",
+        client: Optional[AsyncOpenAI] = None,
+    ) -> str:
+        """Versão assíncrona de `responder`"""
+        client = client or obter_cliente_async()
+        pergunta = _turno("user", mensagem)
+
+        response = None
+        id_anterior = self.backend.id_resposta(sessao_id)
+        if id_anterior and self._cabe_no_orcamento(sessao_id, pergunta):
+            try:
+                response = await client.responses.create(
+                    model=model,
+                    previous_response_id=id_anterior,
+                    input=[{"role": "user", "content": mensagem}],
+                )
+            except (NotFoundError, BadRequestError) as erro:
+                if not resposta_anterior_expirada(erro):
+                    raise
+        if response is None:
+            response = await client.responses.create(
+                model=model, input=await self.mensagens_async(sessao_id, pergunta)
+            )
+
+        return self._registrar_troca(sessao_id, pergunta, response)
@@ -0,0 +1,113 @@
+"""
+Prompts montados para o cache de prompt do provedor.
+
+O provedor reaproveita o processamento do prefixo de um prompt que já viu
+(a partir de ~1024 tokens), mas só se o prefixo for idêntico. Interpolar o
+texto do usuário nas instruções (`instructions=f"Analise: '{entrada}'"`)
+torna cada prefixo único e o cache nunca acerta. `montar_prompt` fixa a
+ordem: instruções estáticas primeiro, depois o contexto do mais estável
+para o mais variável (base de conhecimento, data), e o conteúdo do usuário
+por último. O esquema de `text_format` já vai no início, junto com as
+instruções.
+
+`MonitorPrefixos` é uma saída da instrumentação que acompanha cada local
+de chamada e avisa quando o prefixo muda a cada chamada ou quando prompts
+longos nunca recebem tokens em cache.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Optional
+
+from agentes.instrumentacao import ChamadaLLM
+
+logger = logging.getLogger(__name__)
+
+# Abaixo disso o provedor não cacheia o prefixo
+TOKENS_MINIMOS_CACHE = 1024
+
+
+def montar_prompt(
+    instrucoes: str,
+    usuario: str,
+    contexto: Optional[list[str] | str] = None,
+) -> dict[str, Any]:
+    """Parâmetros `instructions`/`input` com o conteúdo variável no final
+
+    `contexto` vai entre as instruções e o usuário, na ordem dada: passe
+    primeiro o que muda menos (ex.: base de conhecimento, depois a data).
+    """
+    if isinstance(contexto, str):
+        contexto = [contexto]
+    mensagens = [
+        {"role": "developer", "content": trecho} for trecho in contexto or [] if trecho
+    ]
+    mensagens.append({"role": "user", "content": usuario})
+    return {"instructions": instrucoes.strip(), "input": mensagens}
+
+
+class MonitorPrefixos:
+    """Saída de instrumentação que aponta locais de chamada que desperdiçam o cache"""
+
+    def __init__(self, min_chamadas: int = 5, max_variacao: float = 0.5):
+        self.min_chamadas = min_chamadas
+        self.max_variacao = max_variacao
+        self._chamadas: dict[str, int] = defaultdict(int)
+        self._prefixos: dict[str, set[str]] = defaultdict(set)
+        self._tokens: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self._avisados: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def registrar(self, chamada: ChamadaLLM) -> None:
+        local = chamada.local or chamada.etapa or "desconhecido"
+        with self._lock:
+            self._chamadas[local] += 1
+            # Limita a memória: passado o limite, o local já foi diagnosticado
+            if len(self._prefixos[local]) < 1000:
+                self._prefixos[local].add(chamada.prefixo)
+            self._tokens[local][0] += chamada.tokens_entrada
+            self._tokens[local][1] += chamada.tokens_cache
+            avisos = self._diagnosticar(local)
+        for aviso in avisos:
+            logger.warning(aviso)
+
+    def _diagnosticar(self, local: str) -> list[str]:
+        chamadas = self._chamadas[local]
+        if chamadas < self.min_chamadas:
+            return []
+        avisos = []
+        variacao = len(self._prefixos[local]) / chamadas
+        if variacao > self.max_variacao and (local, "prefixo") not in self._avisados:
+            self._avisados.add((local, "prefixo"))
+            avisos.append(
+                f"{local}: o prefixo do prompt mudou em {len(self._prefixos[local])} de "
+                f"{chamadas} chamadas; mova o conteúdo variável para o fim (montar_prompt)"
+            )
+        entrada, cache = self._tokens[local]
+        if (
+            entrada / chamadas >= TOKENS_MINIMOS_CACHE
+            and cache == 0
+            and (local, "cache") not in self._avisados
+        ):
+            self._avisados.add((local, "cache"))
+            avisos.append(
+                f"{local}: {chamadas} chamadas com prompts longos e nenhum token em cache"
+            )
+        return avisos
+
+    def relatorio(self) -> dict[str, dict[str, float]]:
+        """Por local: chamadas, prefixos distintos e fração dos tokens de entrada em cache"""
+        with self._lock:
+            return {
+                local: {
+                    "chamadas": chamadas,
+                    "prefixos_distintos": len(self._prefixos[local]),
+                    "taxa_cache": (
+                        self._tokens[local][1] / self._tokens[local][0]
+                        if self._tokens[local][0]
+                        else 0.0
+                    ),
+                }
+                for local, chamadas in self._chamadas.items()
+            }
@@ -0,0 +1,267 @@
+"""
+Camada de resiliência para chamadas ao LLM.
+
+Um erro de API, um timeout ou um rate limit derrubava a requisição
+inteira. Aqui cada chamada tem:
+
+- prazo: passado o tempo, o chamador desiste e segue pelo caminho local
+  (no síncrono a chamada termina em segundo plano e o resultado é
+  descartado; no assíncrono ela é cancelada, a menos que a mesma chamada
+  deduplicada ainda tenha outros esperando por ela);
+- disjuntor por endpoint de modelo: depois de `limite_falhas` falhas
+  seguidas ele abre e as chamadas nem são tentadas; passado
+  `tempo_recuperacao_segundos`, uma única chamada de teste decide se ele
+  fecha de novo;
+- extrator local: usado direto quando é confiante (nem chama o LLM) e
+  como fallback quando o disjuntor está aberto ou a chamada falhou.
+
+As métricas contam qual caminho atendeu cada requisição.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as PrazoEsgotado
+from typing import Any, Awaitable, Callable, Optional
+
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Falhas do provedor, não do pedido: contam para abrir o disjuntor
+ERROS_TRANSITORIOS = (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+    PrazoEsgotado,
+    asyncio.TimeoutError,
+)
+
+
+class DisjuntorAberto(Exception):
+    """O disjuntor do endpoint está aberto e não há resultado local"""
+
+
+class Disjuntor:
+    """Circuit breaker: abre após falhas seguidas, testa uma chamada antes de fechar"""
+
+    def __init__(
+        self,
+        nome: str,
+        limite_falhas: int = 5,
+        tempo_recuperacao_segundos: float = 30.0,
+    ):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_recuperacao_segundos = tempo_recuperacao_segundos
+        self._falhas_seguidas = 0
+        self._aberto_em: Optional[float] = None
+        self._testando = False
+        self._lock = threading.Lock()
+        self.aberturas = 0
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._aberto_em is None:
+                return "fechado"
+            if self._testando or self._recuperou():
+                return "meio-aberto"
+            return "aberto"
+
+    def _recuperou(self) -> bool:
+        return time.monotonic() - self._aberto_em >= self.tempo_recuperacao_segundos
+
+    def permitir(self) -> bool:
+        """Se a chamada pode ser feita; no meio-aberto, só uma por vez"""
+        with self._lock:
+            if self._aberto_em is None:
+                return True
+            if self._testando or not self._recuperou():
+                return False
+            self._testando = True
+            return True
+
+    def registrar_sucesso(self) -> None:
+        with self._lock:
+            self._falhas_seguidas = 0
+            self._aberto_em = None
+            self._testando = False
+
+    def liberar(self) -> None:
+        """Encerra uma chamada de teste que não chegou a um resultado"""
+        with self._lock:
+            self._testando = False
+
+    def registrar_falha(self) -> None:
+        with self._lock:
+            self._falhas_seguidas += 1
+            if self._testando or self._falhas_seguidas >= self.limite_falhas:
+                if self._aberto_em is None or self._testando:
+                    logger.warning(f"Disjuntor {self.nome} aberto")
+                    self.aberturas += 1
+                self._aberto_em = time.monotonic()
+                self._testando = False
+
+
+_disjuntores: dict[str, Disjuntor] = {}
+_lock_disjuntores = threading.Lock()
+
+
+def obter_disjuntor(endpoint: str, **opcoes) -> Disjuntor:
+    """Um disjuntor por endpoint de modelo, compartilhado no processo"""
+    with _lock_disjuntores:
+        disjuntor = _disjuntores.get(endpoint)
+        if disjuntor is None:
+            disjuntor = _disjuntores[endpoint] = Disjuntor(endpoint, **opcoes)
+        return disjuntor
+
+
+# Threads das chamadas síncronas com prazo; uma chamada que estoura o prazo
+# continua aqui até o timeout do cliente, sem prender o chamador
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="prazo")
+
+
+def chamar_com_prazo(funcao: Callable[[], Any], prazo_segundos: float) -> Any:
+    """Executa `funcao()` e levanta `PrazoEsgotado` se passar do prazo"""
+    contexto = contextvars.copy_context()
+    return _executor.submit(contexto.run, funcao).result(timeout=prazo_segundos)
+
+
+class ResultadoResiliente(BaseModel):
+    valor: Any
+    origem: str  # "local", "llm" ou "fallback"
+    motivo: Optional[str] = None  # Por que o LLM não atendeu, no fallback
+
+
+class CaminhoResiliente:
+    """Local confiante → LLM com prazo e disjuntor → local como fallback"""
+
+    def __init__(
+        self,
+        chamar_llm: Callable[[str], Any],
+        extrair_local: Callable[[str], Optional[tuple[Any, float]]],
+        disjuntor: Disjuntor,
+        prazo_segundos: float = 10.0,
+        limiar_local: float = 0.9,
+        chamar_llm_async: Optional[Callable[[str], Awaitable[Any]]] = None,
+    ):
+        self.chamar_llm = chamar_llm
+        self.chamar_llm_async = chamar_llm_async
+        self.extrair_local = extrair_local
+        self.disjuntor = disjuntor
+        self.prazo_segundos = prazo_segundos
+        self.limiar_local = limiar_local
+        self._contagem_origens: Counter = Counter()
+        self._contagem_motivos: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _contar(self, resultado: ResultadoResiliente) -> ResultadoResiliente:
+        with self._lock:
+            self._contagem_origens[resultado.origem] += 1
+            if resultado.motivo:
+                self._contagem_motivos[resultado.motivo] += 1
+        return resultado
+
+    def _fallback(
+        self, local: Optional[tuple[Any, float]], motivo: str, erro: Exception
+    ) -> ResultadoResiliente:
+        if local is None:
+            with self._lock:
+                self._contagem_origens["erro"] += 1
+                self._contagem_motivos[motivo] += 1
+            raise erro
+        return self._contar(
+            ResultadoResiliente(valor=local[0], origem="fallback", motivo=motivo)
+        )
+
+    def _motivo(self, erro: Exception) -> str:
+        if isinstance(erro, (PrazoEsgotado, asyncio.TimeoutError)):
+            return "prazo esgotado"
+        return type(erro).__name__
+
+    def _depois_da_chamada(
+        self, local: Optional[tuple[Any, float]], valor: Any
+    ) -> ResultadoResiliente:
+        self.disjuntor.registrar_sucesso()
+        if valor is None:
+            # Recusa do modelo: o provedor está bem, só este pedido não rendeu
+            return self._fallback(
+                local, "recusa", ValueError("O modelo não devolveu resultado")
+            )
+        return self._contar(ResultadoResiliente(valor=valor, origem="llm"))
+
+    def _antes_da_chamada(
+        self, texto: str
+    ) -> tuple[Optional[tuple[Any, float]], Optional[ResultadoResiliente]]:
+        local = self.extrair_local(texto)
+        if local is not None and local[1] >= self.limiar_local:
+            resultado = ResultadoResiliente(valor=local[0], origem="local")
+            return local, self._contar(resultado)
+        if not self.disjuntor.permitir():
+            erro = DisjuntorAberto(f"Disjuntor {self.disjuntor.nome} aberto")
+            return local, self._fallback(local, "disjuntor aberto", erro)
+        return local, None
+
+    def executar(self, texto: str) -> ResultadoResiliente:
+        local, resultado = self._antes_da_chamada(texto)
+        if resultado is not None:
+            return resultado
+        try:
+            valor = chamar_com_prazo(
+                lambda: self.chamar_llm(texto), self.prazo_segundos
+            )
+        except ERROS_TRANSITORIOS as erro:
+            self.disjuntor.registrar_falha()
+            return self._fallback(local, self._motivo(erro), erro)
+        except BaseException:
+            # Erro do pedido (ex.: 400), não do provedor: não conta como falha
+            self.disjuntor.liberar()
+            raise
+        return self._depois_da_chamada(local, valor)
+
+    async def executar_async(self, texto: str) -> ResultadoResiliente:
+        """Como `executar`; usa `chamar_llm_async` quando houver"""
+        local, resultado = self._antes_da_chamada(texto)
+        if resultado is not None:
+            return resultado
+        try:
+            if self.chamar_llm_async is not None:
+                valor = await asyncio.wait_for(
+                    self.chamar_llm_async(texto), self.prazo_segundos
+                )
+            else:
+                valor = await asyncio.to_thread(
+                    chamar_com_prazo,
+                    lambda: self.chamar_llm(texto),
+                    self.prazo_segundos,
+                )
+        except ERROS_TRANSITORIOS as erro:
+            self.disjuntor.registrar_falha()
+            return self._fallback(local, self._motivo(erro), erro)
+        except BaseException:
+            self.disjuntor.liberar()
+            raise
+        return self._depois_da_chamada(local, valor)
+
+    def metricas(self) -> dict[str, Any]:
+        with self._lock:
+            total = sum(self._contagem_origens.values())
+            return {
+                "total": total,
+                "por_origem": dict(self._contagem_origens),
+                "motivos_fallback": dict(self._contagem_motivos),
+                "disjuntor": self.disjuntor.estado,
+                "taxa_llm": self._contagem_origens["llm"] / total if total else 0.0,
+            }
@@ -0,0 +1,217 @@
+"""
+Pré-roteador local.
+
+Seguindo a ideia de só chamar o LLM quando código comum não resolve, as
+entradas óbvias são roteadas por regras (regex sobre o texto normalizado)
+ou por um pequeno modelo de n-gramas com hashing, treinado com as decisões
+que o próprio LLM tomou antes. Só quando a confiança local fica abaixo do
+limiar a entrada é escalada para o classificador LLM.
+"""
+
+import asyncio
+import json
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from agentes.texto import hash_estavel, normalizar, tokenizar
+
+
+class Regra(BaseModel):
+    """Padrões regex (sem acento, minúsculos) que indicam um rótulo
+
+    A confiança padrão fica abaixo do limiar: a regra sozinha não decide,
+    só torna o caso ambíguo quando dispara junto com a de outro rótulo.
+    Dê uma confiança acima do limiar apenas a padrões inequívocos.
+    """
+
+    rotulo: str
+    padroes: list[str]
+    confianca: float = 0.6
+
+
+class DecisaoRoteamento(BaseModel):
+    rotulo: str
+    confianca: float
+    origem: str  # "regra", "modelo" ou "llm"
+    resposta_llm: Optional[Any] = None
+
+
+class ModeloNgramas:
+    """Naive Bayes multinomial sobre unigramas e bigramas de palavras com hashing"""
+
+    def __init__(self, dimensao: int = 2**18):
+        self.dimensao = dimensao
+        self._contagens: dict[str, Counter] = defaultdict(Counter)
+        self._totais: Counter = Counter()
+        self._exemplos: Counter = Counter()
+        # `aprender` roda nas threads que escalaram ao LLM enquanto outras preveem
+        self._lock = threading.Lock()
+
+    @property
+    def exemplos(self) -> int:
+        with self._lock:
+            return sum(self._exemplos.values())
+
+    def _atributos(self, texto: str) -> list[int]:
+        palavras = tokenizar(texto, remover_palavras_vazias=False)
+        termos = palavras + [f"{a} {b}" for a, b in zip(palavras, palavras[1:])]
+        return [hash_estavel(termo, self.dimensao) for termo in termos]
+
+    def aprender(self, texto: str, rotulo: str) -> None:
+        atributos = self._atributos(texto)
+        with self._lock:
+            self._contagens[rotulo].update(atributos)
+            self._totais[rotulo] += len(atributos)
+            self._exemplos[rotulo] += 1
+
+    def prever(self, texto: str) -> Optional[tuple[str, float]]:
+        atributos = self._atributos(texto)
+        with self._lock:
+            if not self._exemplos:
+                return None
+            total_exemplos = sum(self._exemplos.values())
+            log_probs = {}
+            for rotulo, exemplos in self._exemplos.items():
+                contagens = self._contagens[rotulo]
+                denominador = self._totais[rotulo] + self.dimensao
+                log_probs[rotulo] = math.log(exemplos / total_exemplos) + sum(
+                    math.log((contagens[atributo] + 1) / denominador)
+                    for atributo in atributos
+                )
+        maior = max(log_probs.values())
+        normalizador = sum(math.exp(valor - maior) for valor in log_probs.values())
+        rotulo = max(log_probs, key=log_probs.get)
+        return rotulo, 1 / normalizador
+
+
+class PreRoteador:
+    """Regras → modelo local → LLM, escalando só abaixo do limiar de confiança"""
+
+    def __init__(
+        self,
+        regras: list[Regra],
+        classificar_llm: Callable[[str], Any],
+        campo_rotulo: str,
+        campo_confianca: str,
+        limiar: float = 0.8,
+        modelo: Optional[ModeloNgramas] = None,
+        min_exemplos_modelo: int = 50,
+        caminho_log: Optional[str] = None,
+        classificar_llm_async: Optional[Callable[[str], Awaitable[Any]]] = None,
+    ):
+        self.regras = [
+            (regra, [re.compile(padrao) for padrao in regra.padroes])
+            for regra in regras
+        ]
+        self.classificar_llm = classificar_llm
+        self.classificar_llm_async = classificar_llm_async
+        self.campo_rotulo = campo_rotulo
+        self.campo_confianca = campo_confianca
+        self.limiar = limiar
+        self.modelo = modelo
+        self.min_exemplos_modelo = min_exemplos_modelo
+        self.caminho_log = caminho_log
+        self._contagem_origens: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _por_regras(self, texto: str) -> Optional[DecisaoRoteamento]:
+        normalizado = normalizar(texto)
+        acertos: dict[str, float] = {}
+        for regra, padroes in self.regras:
+            if any(padrao.search(normalizado) for padrao in padroes):
+                acertos[regra.rotulo] = max(
+                    regra.confianca, acertos.get(regra.rotulo, 0.0)
+                )
+        # Regras de rótulos diferentes disparando juntas: caso ambíguo
+        if len(acertos) != 1:
+            return None
+        rotulo, confianca = acertos.popitem()
+        return DecisaoRoteamento(rotulo=rotulo, confianca=confianca, origem="regra")
+
+    def _por_modelo(self, texto: str) -> Optional[DecisaoRoteamento]:
+        if self.modelo is None or self.modelo.exemplos < self.min_exemplos_modelo:
+            return None
+        previsao = self.modelo.prever(texto)
+        if previsao is None:
+            return None
+        rotulo, confianca = previsao
+        return DecisaoRoteamento(rotulo=rotulo, confianca=confianca, origem="modelo")
+
+    def _registrar_decisao_llm(self, texto: str, decisao: DecisaoRoteamento) -> None:
+        if self.modelo is not None:
+            self.modelo.aprender(texto, decisao.rotulo)
+        if self.caminho_log:
+            with self._lock, open(self.caminho_log, "a", encoding="utf-8") as f:
+                registro = {
+                    "texto": texto,
+                    "rotulo": decisao.rotulo,
+                    "confianca": decisao.confianca,
+                }
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def _local(self, texto: str) -> Optional[DecisaoRoteamento]:
+        for etapa in (self._por_regras, self._por_modelo):
+            decisao = etapa(texto)
+            if decisao is not None and decisao.confianca >= self.limiar:
+                return decisao
+        return None
+
+    def _decisao_llm(self, texto: str, resposta: Any) -> DecisaoRoteamento:
+        decisao = DecisaoRoteamento(
+            rotulo=getattr(resposta, self.campo_rotulo),
+            confianca=getattr(resposta, self.campo_confianca),
+            origem="llm",
+            resposta_llm=resposta,
+        )
+        self._registrar_decisao_llm(texto, decisao)
+        return decisao
+
+    def _contar(self, decisao: DecisaoRoteamento) -> DecisaoRoteamento:
+        with self._lock:
+            self._contagem_origens[decisao.origem] += 1
+        return decisao
+
+    def classificar(self, texto: str) -> DecisaoRoteamento:
+        decisao = self._local(texto)
+        if decisao is None:
+            decisao = self._decisao_llm(texto, self.classificar_llm(texto))
+        return self._contar(decisao)
+
+    async def classificar_async(self, texto: str) -> DecisaoRoteamento:
+        """Como `classificar`, mas escala com `classificar_llm_async` quando houver"""
+        decisao = self._local(texto)
+        if decisao is None:
+            if self.classificar_llm_async is not None:
+                resposta = await self.classificar_llm_async(texto)
+            else:
+                resposta = await asyncio.to_thread(self.classificar_llm, texto)
+            decisao = self._decisao_llm(texto, resposta)
+        return self._contar(decisao)
+
+    def treinar_de_log(self, caminho: Optional[str] = None) -> int:
+        """Treina o modelo local com as decisões do LLM gravadas em JSONL"""
+        if self.modelo is None:
+            self.modelo = ModeloNgramas()
+        total = 0
+        with open(caminho or self.caminho_log, "r", encoding="utf-8") as f:
+            for linha in f:
+                registro = json.loads(linha)
+                self.modelo.aprender(registro["texto"], registro["rotulo"])
+                total += 1
+        return total
+
+    def metricas(self) -> dict[str, Any]:
+        with self._lock:
+            total = sum(self._contagem_origens.values())
+            return {
+                "total": total,
+                "por_origem": dict(self._contagem_origens),
+                "taxa_escalonamento": (
+                    self._contagem_origens["llm"] / total if total else 0.0
+                ),
+            }
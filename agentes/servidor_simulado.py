@@ -0,0 +1,473 @@
+"""
+Servidor simulado do LLM.
+
+Um substituto local, só com a biblioteca padrão, que fala os endpoints
+`/v1/responses` (com e sem streaming) e `/v1/chat/completions`, para
+exercitar os scripts e medir o nosso próprio overhead sem depender da API.
+As respostas são montadas a partir da requisição:
+
+- com `text.format`/`response_format` do tipo json_schema, devolve um
+  objeto válido gerado a partir do esquema (ou um objeto roteirizado);
+- com ferramentas e sem saídas de ferramenta na entrada, devolve uma
+  chamada de função com argumentos gerados do esquema (ou roteirizados);
+- caso contrário, devolve `tokens_saida` palavras de texto.
+
+A latência, o custo por token do streaming e uma taxa de erros 429 são
+configuráveis. Também responde ao endpoint de chart do Yahoo Finance usado
+por `agentes.cotacoes`, para que as ferramentas não saiam para a rede.
+
+Uso: `python -m agentes.servidor_simulado --porta 8765 --latencia 0.05`
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+from agentes.texto import contar_tokens
+
+
+class ConfiguracaoSimulador(BaseModel):
+    latencia_segundos: float = 0.05
+    segundos_por_token: float = 0.0
+    tokens_saida: int = 50
+    taxa_rate_limit: float = Field(
+        default=0.0, description="Fração de requisições respondidas com 429"
+    )
+    taxa_erro_servidor: float = Field(
+        default=0.0, description="Fração de requisições respondidas com 500"
+    )
+    respostas_estruturadas: dict[str, dict] = Field(
+        default_factory=dict, description="Nome do esquema -> objeto devolvido"
+    )
+    chamadas_ferramentas: dict[str, dict] = Field(
+        default_factory=dict, description="Nome da ferramenta -> argumentos da chamada"
+    )
+    simbolos_inexistentes: list[str] = Field(
+        default_factory=list, description="Símbolos respondidos com 404 no chart"
+    )
+
+
+_ids = itertools.count(1)
+
+
+def _novo_id(prefixo: str) -> str:
+    return f"{prefixo}_simulado_{next(_ids)}"
+
+
+def _resolver(esquema: dict, definicoes: dict) -> dict:
+    while "$ref" in esquema:
+        esquema = definicoes[esquema["$ref"].split("/")[-1]]
+    return esquema
+
+
+def exemplo_do_esquema(esquema: dict, definicoes: Optional[dict] = None) -> Any:
+    """Gera um valor válido para o JSON Schema (booleanos verdadeiros, confiança alta)"""
+    definicoes = {**(definicoes or {}), **esquema.get("$defs", {})}
+    esquema = _resolver(esquema, definicoes)
+    if "enum" in esquema:
+        return esquema["enum"][0]
+    if "const" in esquema:
+        return esquema["const"]
+    for chave in ("anyOf", "oneOf"):
+        if chave in esquema:
+            opcoes = [op for op in esquema[chave] if op.get("type") != "null"]
+            return exemplo_do_esquema((opcoes or esquema[chave])[0], definicoes)
+
+    tipo = esquema.get("type")
+    if isinstance(tipo, list):
+        tipo = next((t for t in tipo if t != "null"), "null")
+    if tipo == "object":
+        return {
+            nome: exemplo_do_esquema(propriedade, definicoes)
+            for nome, propriedade in esquema.get("properties", {}).items()
+        }
+    if tipo == "array":
+        return [exemplo_do_esquema(esquema.get("items", {}), definicoes)]
+    if tipo == "boolean":
+        return True
+    if tipo == "integer":
+        return 1
+    if tipo == "number":
+        return 0.9
+    if tipo == "null":
+        return None
+    return "exemplo"
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo saem em escritas separadas; com Nagle, cada
+    # resposta esperaria o ACK atrasado do cliente (~40 ms)
+    disable_nagle_algorithm = True
+    servidor: "ServidorSimulado"
+
+    def log_message(self, formato: str, *args) -> None:
+        pass
+
+    # -------------------------------------------------------------- HTTP
+
+    def _enviar_json(
+        self, status: int, corpo: dict, cabecalhos: Optional[dict] = None
+    ) -> None:
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/v8/finance/chart/"):
+            simbolo = self.path.split("/")[-1].split("?")[0]
+            if simbolo in self.servidor.config.simbolos_inexistentes:
+                # Mesmo formato do Yahoo para símbolo sem dados
+                erro = {"code": "Not Found", "description": "No data found"}
+                self._enviar_json(404, {"chart": {"result": None, "error": erro}})
+            else:
+                self._enviar_json(200, _chart(simbolo))
+        else:
+            self._enviar_json(404, {"error": {"message": "Não encontrado"}})
+
+    def do_POST(self) -> None:
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+        config = self.servidor.config
+        self.servidor._contar()
+
+        if config.taxa_rate_limit and random.random() < config.taxa_rate_limit:
+            self._enviar_json(
+                429,
+                {"error": {"message": "Rate limit simulado", "type": "rate_limit"}},
+                {"retry-after": "0.1"},
+            )
+            return
+
+        taxa_erro = config.taxa_erro_servidor
+        if taxa_erro and random.random() < taxa_erro:
+            self._enviar_json(
+                500, {"error": {"message": "Erro simulado", "type": "server_error"}}
+            )
+            return
+
+        time.sleep(config.latencia_segundos)
+        if self.path.endswith("/responses"):
+            resposta = self.servidor.responder(corpo)
+            if corpo.get("stream"):
+                try:
+                    self._transmitir(resposta)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # O cliente parou de ler a transmissão no meio
+            else:
+                self._enviar_json(200, resposta)
+        elif self.path.endswith("/chat/completions"):
+            self._enviar_json(200, self.servidor.completar(corpo))
+        else:
+            self._enviar_json(404, {"error": {"message": "Não encontrado"}})
+
+    def _transmitir(self, resposta: dict) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        sequencia = itertools.count()
+
+        def evento(dados: dict) -> None:
+            dados["sequence_number"] = next(sequencia)
+            linha = f"event: {dados['type']}\ndata: {json.dumps(dados)}\n\n"
+            self.wfile.write(linha.encode())
+            self.wfile.flush()
+
+        evento(
+            {
+                "type": "response.created",
+                "response": {**resposta, "status": "in_progress", "output": []},
+            }
+        )
+        for indice, item in enumerate(resposta["output"]):
+            if item["type"] != "message":
+                continue
+            texto = item["content"][0]["text"]
+            for trecho in texto.split(" "):
+                time.sleep(self.servidor.config.segundos_por_token)
+                evento(
+                    {
+                        "type": "response.output_text.delta",
+                        "item_id": item["id"],
+                        "output_index": indice,
+                        "content_index": 0,
+                        "delta": trecho + " ",
+                        "logprobs": [],
+                    }
+                )
+        evento({"type": "response.completed", "response": resposta})
+
+
+def _chart(simbolo: str) -> dict:
+    return {
+        "chart": {
+            "result": [
+                {
+                    "meta": {
+                        "symbol": simbolo,
+                        "shortName": simbolo,
+                        "currency": "USD",
+                        "regularMarketPrice": 100.0,
+                    },
+                    "indicators": {"quote": [{"close": [98.0, 99.0, 100.0]}]},
+                }
+            ],
+            "error": None,
+        }
+    }
+
+
+def _tem_saidas_de_ferramenta(entrada: Any) -> bool:
+    if not isinstance(entrada, list):
+        return False
+    return any(
+        isinstance(item, dict)
+        and (item.get("type") == "function_call_output" or item.get("role") == "tool")
+        for item in entrada
+    )
+
+
+class ServidorSimulado:
+    """Servidor HTTP em thread; use como context manager ou com `iniciar`/`parar`"""
+
+    def __init__(
+        self, porta: int = 0, config: Optional[ConfiguracaoSimulador] = None, **opcoes
+    ):
+        self.config = config or ConfiguracaoSimulador(**opcoes)
+        self.requisicoes = 0
+        self._prefixos: set[bytes] = set()
+        self._lock = threading.Lock()
+        manipulador = type("Manipulador", (_Manipulador,), {"servidor": self})
+        self._http = ThreadingHTTPServer(("127.0.0.1", porta), manipulador)
+        self._http.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}/v1"
+
+    @property
+    def url_raiz(self) -> str:
+        return self.base_url.removesuffix("/v1")
+
+    def _contar(self) -> None:
+        with self._lock:
+            self.requisicoes += 1
+
+    def iniciar(self) -> str:
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def parar(self) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+
+    def __enter__(self) -> "ServidorSimulado":
+        self.iniciar()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.parar()
+
+    # -------------------------------------------------------------- conteúdo
+
+    def _texto(self) -> str:
+        return " ".join(["simulado"] * self.config.tokens_saida)
+
+    def _estruturado(self, formato: dict) -> str:
+        nome = formato.get("name", "")
+        objeto = self.config.respostas_estruturadas.get(nome)
+        if objeto is None:
+            objeto = exemplo_do_esquema(formato.get("schema", {}))
+        return json.dumps(objeto, ensure_ascii=False)
+
+    def _chamada(self, ferramenta: dict) -> tuple[str, str]:
+        # Responses API: campos no topo; Chat Completions: dentro de "function"
+        definicao = ferramenta.get("function", ferramenta)
+        nome = definicao.get("name")
+        parametros = definicao.get("parameters") or {}
+        argumentos = self.config.chamadas_ferramentas.get(nome)
+        if argumentos is None:
+            argumentos = exemplo_do_esquema(parametros)
+        return nome, json.dumps(argumentos, ensure_ascii=False)
+
+    def _uso(self, corpo: dict, saida: str) -> tuple[int, int, int]:
+        """Tokens de entrada, em cache e de saída
+
+        Imita o cache de prompt do provedor: um prefixo (tudo menos a última
+        mensagem) já visto, com 1024 tokens ou mais, conta como cache em
+        blocos de 128 tokens.
+        """
+        mensagens = corpo.get("input", corpo.get("messages"))
+        fixo = mensagens[:-1] if isinstance(mensagens, list) else []
+        prefixo = json.dumps([corpo.get("instructions"), fixo], ensure_ascii=False)
+        entrada = json.dumps(
+            [corpo.get("instructions"), mensagens], ensure_ascii=False
+        )
+        tokens_prefixo = contar_tokens(prefixo)
+        chave = hashlib.sha1(prefixo.encode("utf-8")).digest()
+        with self._lock:
+            visto = chave in self._prefixos
+            self._prefixos.add(chave)
+        cache = tokens_prefixo // 128 * 128 if visto and tokens_prefixo >= 1024 else 0
+        return contar_tokens(entrada), cache, contar_tokens(saida)
+
+    def responder(self, corpo: dict) -> dict:
+        """Corpo de resposta da Responses API"""
+        ferramentas = [
+            f for f in corpo.get("tools") or [] if f.get("type") == "function"
+        ]
+        chamar = (
+            ferramentas
+            and corpo.get("tool_choice") != "none"
+            and not _tem_saidas_de_ferramenta(corpo.get("input"))
+        )
+        if chamar:
+            nome, argumentos = self._chamada(ferramentas[0])
+            saida = [
+                {
+                    "type": "function_call",
+                    "id": _novo_id("fc"),
+                    "call_id": _novo_id("call"),
+                    "name": nome,
+                    "arguments": argumentos,
+                    "status": "completed",
+                }
+            ]
+            texto = argumentos
+        else:
+            formato = (corpo.get("text") or {}).get("format") or {}
+            if formato.get("type") == "json_schema":
+                texto = self._estruturado(formato)
+            else:
+                texto = self._texto()
+            saida = [
+                {
+                    "type": "message",
+                    "id": _novo_id("msg"),
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [
+                        {"type": "output_text", "text": texto, "annotations": []}
+                    ],
+                }
+            ]
+
+        tokens_entrada, tokens_cache, tokens_saida = self._uso(corpo, texto)
+        return {
+            "id": _novo_id("resp"),
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": corpo.get("model", "simulado"),
+            "status": "completed",
+            "error": None,
+            "incomplete_details": None,
+            "instructions": corpo.get("instructions"),
+            "output": saida,
+            "parallel_tool_calls": True,
+            "previous_response_id": corpo.get("previous_response_id"),
+            "temperature": corpo.get("temperature"),
+            "text": corpo.get("text") or {"format": {"type": "text"}},
+            "tool_choice": corpo.get("tool_choice", "auto"),
+            "tools": corpo.get("tools") or [],
+            "top_p": None,
+            "usage": {
+                "input_tokens": tokens_entrada,
+                "input_tokens_details": {"cached_tokens": tokens_cache},
+                "output_tokens": tokens_saida,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": tokens_entrada + tokens_saida,
+            },
+        }
+
+    def completar(self, corpo: dict) -> dict:
+        """Corpo de resposta da Chat Completions API"""
+        ferramentas = corpo.get("tools") or []
+        mensagem: dict[str, Any] = {"role": "assistant", "content": None}
+        chamar = (
+            ferramentas
+            and corpo.get("tool_choice") != "none"
+            and not _tem_saidas_de_ferramenta(corpo.get("messages"))
+        )
+        if chamar:
+            nome, argumentos = self._chamada(ferramentas[0])
+            mensagem["tool_calls"] = [
+                {
+                    "id": _novo_id("call"),
+                    "type": "function",
+                    "function": {"name": nome, "arguments": argumentos},
+                }
+            ]
+            texto, motivo = argumentos, "tool_calls"
+        else:
+            formato = corpo.get("response_format") or {}
+            if formato.get("type") == "json_schema":
+                texto = self._estruturado(formato.get("json_schema", {}))
+            else:
+                texto = self._texto()
+            mensagem["content"], motivo = texto, "stop"
+
+        tokens_entrada, tokens_cache, tokens_saida = self._uso(corpo, texto)
+        return {
+            "id": _novo_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": corpo.get("model", "simulado"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": mensagem,
+                    "finish_reason": motivo,
+                    "logprobs": None,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": tokens_entrada,
+                "completion_tokens": tokens_saida,
+                "total_tokens": tokens_entrada + tokens_saida,
+                "prompt_tokens_details": {"cached_tokens": tokens_cache},
+            },
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor simulado do LLM")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--segundos-por-token", type=float, default=0.0)
+    parser.add_argument("--tokens-saida", type=int, default=50)
+    parser.add_argument("--taxa-rate-limit", type=float, default=0.0)
+    parser.add_argument("--taxa-erro-servidor", type=float, default=0.0)
+    argumentos = parser.parse_args()
+
+    servidor = ServidorSimulado(
+        porta=argumentos.porta,
+        latencia_segundos=argumentos.latencia,
+        segundos_por_token=argumentos.segundos_por_token,
+        tokens_saida=argumentos.tokens_saida,
+        taxa_rate_limit=argumentos.taxa_rate_limit,
+        taxa_erro_servidor=argumentos.taxa_erro_servidor,
+    )
+    print(f"Servidor simulado em {servidor.base_url}", flush=True)
+    try:
+        servidor._http.serve_forever()
+    except KeyboardInterrupt:
+        servidor._http.server_close()
@@ -0,0 +1,99 @@
+"""
+Saída em streaming.
+
+Em vez de esperar a resposta inteira, consumimos os eventos
+`response.output_text.delta` da Responses API e entregamos cada trecho de
+texto assim que ele chega. Cada transmissão mede o tempo até o primeiro
+token (TTFT) e o tempo total, e guarda o texto completo no final.
+"""
+
+import time
+from typing import AsyncIterator, Iterator, Optional
+
+from openai import AsyncOpenAI, OpenAI
+
+from agentes.cliente import obter_cliente, obter_cliente_async
+
+
+class _MetricasTransmissao:
+    def __init__(self):
+        self.tempo_primeiro_token: Optional[float] = None
+        self.tempo_total: Optional[float] = None
+        self._trechos: list[str] = []
+        self._inicio = 0.0
+
+    @property
+    def texto(self) -> str:
+        return "".join(self._trechos)
+
+    def _iniciar(self) -> None:
+        self._inicio = time.perf_counter()
+
+    def _registrar(self, delta: str) -> None:
+        if self.tempo_primeiro_token is None:
+            self.tempo_primeiro_token = time.perf_counter() - self._inicio
+        self._trechos.append(delta)
+
+    def _finalizar(self) -> None:
+        self.tempo_total = time.perf_counter() - self._inicio
+
+
+class Transmissao(_MetricasTransmissao):
+    """Iterador síncrono sobre os trechos de texto da resposta"""
+
+    def __init__(self, client: OpenAI, **parametros):
+        super().__init__()
+        self._client = client
+        self._parametros = parametros
+
+    def __iter__(self) -> Iterator[str]:
+        self._iniciar()
+        eventos = self._client.responses.create(stream=True, **self._parametros)
+        try:
+            for evento in eventos:
+                if evento.type == "response.output_text.delta":
+                    self._registrar(evento.delta)
+                    yield evento.delta
+        finally:
+            eventos.close()
+            self._finalizar()
+
+
+class TransmissaoAsync(_MetricasTransmissao):
+    """Iterador assíncrono sobre os trechos de texto da resposta"""
+
+    def __init__(self, client: AsyncOpenAI, **parametros):
+        super().__init__()
+        self._client = client
+        self._parametros = parametros
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self._iniciar()
+        eventos = await self._client.responses.create(stream=True, **self._parametros)
+        try:
+            async for evento in eventos:
+                if evento.type == "response.output_text.delta":
+                    self._registrar(evento.delta)
+                    yield evento.delta
+        finally:
+            await eventos.close()
+            self._finalizar()
+
+
+def transmitir(
+    input: str | list, model: str = "gpt-4o-mini", client: Optional[OpenAI] = None, **opcoes
+) -> Transmissao:
+    """`for trecho in transmitir(...)`; depois use `.texto` e `.tempo_primeiro_token`"""
+    return Transmissao(client or obter_cliente(), model=model, input=input, **opcoes)
+
+
+def transmitir_async(
+    input: str | list,
+    model: str = "gpt-4o-mini",
+    client: Optional[AsyncOpenAI] = None,
+    **opcoes,
+) -> TransmissaoAsync:
+    """`async for trecho in transmitir_async(...)`"""
+    return TransmissaoAsync(
+        client or obter_cliente_async(), model=model, input=input, **opcoes
+    )
@@ -0,0 +1,93 @@
+"""
+Normalização de texto usada pelos componentes locais (busca, roteamento,
+cache semântico), para que todos enxerguem "Devolução" e "devolucao" como
+a mesma palavra.
+"""
+
+import re
+import unicodedata
+import zlib
+
+PALAVRAS_VAZIAS = frozenset(
+    """
+    a o as os um uma uns umas de da do das dos em na no nas nos por para pra
+    com sem e ou que se me te lhe nos vos meu minha seu sua ao aos
+    ser esta este isso isto essa esse qual quais como the of to and is are
+    """.split()
+)
+
+_PADRAO_PALAVRA = re.compile(r"\w+")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas e sem acentos"""
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokenizar(texto: str, remover_palavras_vazias: bool = True) -> list[str]:
+    tokens = _PADRAO_PALAVRA.findall(normalizar(texto))
+    if remover_palavras_vazias:
+        return [t for t in tokens if t not in PALAVRAS_VAZIAS]
+    return tokens
+
+
+def ngramas_caracteres(texto: str, n: int = 3) -> list[str]:
+    """N-gramas de caracteres por palavra, com bordas marcadas ("#de", "dev"...)"""
+    ngramas = []
+    for token in tokenizar(texto):
+        marcado = f"#{token}#"
+        if len(marcado) <= n:
+            ngramas.append(marcado)
+            continue
+        ngramas.extend(marcado[i : i + n] for i in range(len(marcado) - n + 1))
+    return ngramas
+
+
+def hash_estavel(termo: str, dimensao: int) -> int:
+    """Hash independente de PYTHONHASHSEED, para vetores reprodutíveis entre processos"""
+    return zlib.crc32(termo.encode("utf-8")) % dimensao
+
+
+def vetor_ngramas(texto: str, dimensao: int = 1024, n: int = 3):
+    """Vetor NumPy normalizado (L2) de n-gramas de caracteres com hashing"""
+    import numpy as np
+
+    vetor = np.zeros(dimensao, dtype=np.float32)
+    for ngrama in ngramas_caracteres(texto, n):
+        vetor[hash_estavel(ngrama, dimensao)] += 1.0
+    norma = np.linalg.norm(vetor)
+    return vetor / norma if norma else vetor
+
+
+def contar_tokens(texto: str) -> int:
+    """Usa tiktoken se estiver instalado; senão, a aproximação de ~4 caracteres por token"""
+    codificador = _obter_codificador()
+    if codificador is not None:
+        return len(codificador.encode(texto))
+    return max(1, len(texto) // 4)
+
+
+def truncar_tokens(texto: str, limite: int) -> str:
+    """Corta o texto em `limite` tokens, contados como em `contar_tokens`"""
+    codificador = _obter_codificador()
+    if codificador is not None:
+        return codificador.decode(codificador.encode(texto)[:limite])
+    return texto[: limite * 4]
+
+
+_codificador = None
+_codificador_carregado = False
+
+
+def _obter_codificador():
+    global _codificador, _codificador_carregado
+    if not _codificador_carregado:
+        try:
+            import tiktoken
+
+            _codificador = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _codificador = None
+        _codificador_carregado = True
+    return _codificador
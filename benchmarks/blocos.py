@@ -0,0 +1,218 @@
+"""
+Benchmarks offline dos blocos de construção e dos workflows.
+
+Sobe o servidor simulado em outro processo (assim a CPU e a memória medidas
+são só as do cliente), aponta o cliente compartilhado e o provedor de
+cotações para ele e mede cada bloco. Cada execução usa uma entrada
+diferente, para que o cache de respostas não esconda o caminho real.
+
+O exemplo-03 fica de fora: ele consulta o yfinance, que não passa pelo
+servidor simulado.
+
+Uso:
+    uv run python benchmarks/blocos.py --saida resultados.json
+    uv run python benchmarks/blocos.py --comparar resultados.json
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import logging
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+from agentes.benchmark import comparar, imprimir_tabela, medir, salvar_resultados
+from agentes.cliente import configurar_cliente
+from agentes.cotacoes import configurar_provedor
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def carregar(caminho: str):
+    """Importa um script pelo caminho (os nomes começam com número)"""
+    arquivo = RAIZ / caminho
+    nome = arquivo.stem.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(nome, arquivo)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def servidor_em_processo(latencia: float, tokens_saida: int):
+    porta = porta_livre()
+    processo = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "agentes.servidor_simulado",
+            "--porta",
+            str(porta),
+            "--latencia",
+            str(latencia),
+            "--tokens-saida",
+            str(tokens_saida),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+        cwd=RAIZ,
+    )
+    try:
+        # A primeira linha só é impressa quando o servidor já está escutando
+        processo.stdout.readline()
+        yield f"http://127.0.0.1:{porta}"
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def blocos() -> dict:
+    """Nome do benchmark -> função que recebe o índice da execução"""
+    inteligencia = carregar("1-inteligencia.py")
+    memoria = carregar("2-memoria.py")
+    tools = carregar("3-tools.py")
+    validacao = carregar("4-validacao.py")
+    controle = carregar("5-controle.py")
+    recuperacao = carregar("6-recuperacao.py")
+    feedback = carregar("7-feedback.py")
+    kb = carregar("workflows-parte-1/exemplo-04.py")
+    encadeamento = carregar("workflows-parte-2/1-prompt-chaining.py")
+    roteamento = carregar("workflows-parte-2/2-routing.py")
+    paralelizacao = carregar("workflows-parte-2/3-parallelization.py")
+
+    def consumir(transmissao) -> str:
+        for _ in transmissao:
+            pass
+        return transmissao.texto
+
+    async def validar(i: int) -> bool:
+        return await paralelizacao.validar_solicitacao(f"Reunião {i} amanhã às 14h")
+
+    # `medir` só reconhece funções `async def`; um lambda devolveria a corrotina.
+    # A entrada é diferente da versão síncrona para não acertar o mesmo cache
+    def assincrono(funcao, modelo_entrada: str):
+        async def executar(i: int):
+            return await funcao(modelo_entrada.format(i=i) + " (async)")
+
+        return executar
+
+    return {
+        "1-inteligencia": lambda i: inteligencia.basic_intelligence(f"Pergunta {i}"),
+        "1-inteligencia.streaming": lambda i: consumir(
+            inteligencia.basic_intelligence_stream(f"Pergunta {i}")
+        ),
+        "2-memoria": lambda i: memoria.perguntar_com_memoria(
+            f"sessao-{i % 10}", f"Pergunta {i}"
+        ),
+        "3-tools": lambda i: tools.inteligencia_com_ferramentas(
+            f"Qual a cotação da ação {i}?"
+        ),
+        "4-validacao": lambda i: validacao.inteligencia_estruturada(f"Tarefa {i}"),
+        "5-controle": lambda i: controle.roteamento_por_intencao(f"Mensagem {i}"),
+        "6-recuperacao": lambda i: recuperacao.inteligencia_resiliente(
+            f"Contato número {i}"
+        ),
+        "7-feedback.rascunho": lambda i: feedback.gerar_rascunho_em_streaming(
+            f"Rascunho {i}"
+        ),
+        "workflows-1.exemplo-04": lambda i: kb.answer_question(f"Pergunta {i}"),
+        "workflows-2.encadeamento": lambda i: (
+            encadeamento.processar_solicitacao_calendario(f"Reunião {i} amanhã às 14h")
+        ),
+        "workflows-2.encadeamento.especulativo": lambda i: (
+            encadeamento.processar_solicitacao_calendario(
+                f"Reunião {i} amanhã às 14h", especulativo=True
+            )
+        ),
+        "workflows-2.roteamento": lambda i: (
+            roteamento.processar_solicitacao_calendario(f"Evento {i} na terça")
+        ),
+        "workflows-2.paralelizacao": validar,
+        "1-inteligencia.async": assincrono(
+            inteligencia.basic_intelligence_async, "Pergunta {i}"
+        ),
+        "3-tools.async": assincrono(
+            tools.inteligencia_com_ferramentas_async, "Qual a cotação da ação {i}?"
+        ),
+        "4-validacao.async": assincrono(
+            validacao.inteligencia_estruturada_async, "Tarefa {i}"
+        ),
+        "5-controle.async": assincrono(
+            controle.roteamento_por_intencao_async, "Mensagem {i}"
+        ),
+        "6-recuperacao.async": assincrono(
+            recuperacao.inteligencia_resiliente_async, "Contato número {i}"
+        ),
+        "workflows-2.encadeamento.async": assincrono(
+            encadeamento.processar_solicitacao_calendario_async,
+            "Reunião {i} amanhã às 14h",
+        ),
+        "workflows-2.roteamento.async": assincrono(
+            roteamento.processar_solicitacao_calendario_async, "Evento {i} na terça"
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--saida", default="resultados_benchmark.json")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.10)
+    parser.add_argument("--execucoes", type=int, default=50)
+    parser.add_argument("--concorrencia", type=int, default=1)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--tokens-saida", type=int, default=50)
+    parser.add_argument(
+        "--filtro", default="", help="Só benchmarks cujo nome contém o texto"
+    )
+    argumentos = parser.parse_args()
+
+    resultados = []
+    with servidor_em_processo(argumentos.latencia, argumentos.tokens_saida) as url:
+        configurar_cliente(base_url=f"{url}/v1", api_key="simulado")
+        configurar_provedor(base_url=url)
+
+        # Os scripts imprimem e registram logs; aqui só interessa a tabela
+        logging.disable(logging.WARNING)
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            for nome, funcao in blocos().items():
+                if argumentos.filtro not in nome:
+                    continue
+                resultados.append(
+                    medir(
+                        nome,
+                        funcao,
+                        execucoes=argumentos.execucoes,
+                        concorrencia=argumentos.concorrencia,
+                    )
+                )
+        logging.disable(logging.NOTSET)
+
+    imprimir_tabela(resultados)
+    if argumentos.comparar:
+        regressoes = comparar(resultados, argumentos.comparar, argumentos.tolerancia)
+        print("\nRegressões:" if regressoes else "\nSem regressões.")
+        for regressao in regressoes:
+            print(f"  {regressao}")
+    salvar_resultados(
+        resultados,
+        argumentos.saida,
+        execucoes=argumentos.execucoes,
+        concorrencia=argumentos.concorrencia,
+        latencia_simulada=argumentos.latencia,
+        tokens_saida=argumentos.tokens_saida,
+    )
+    print(f"\nResultados salvos em {argumentos.saida}")
+
+
+if __name__ == "__main__":
+    main()
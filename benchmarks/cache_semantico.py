@@ -0,0 +1,199 @@
+"""
+Acertos e custo do cache semântico sobre perguntas parafraseadas.
+
+O cache começa com as perguntas do kb.json do exemplo-04 já respondidas.
+Depois recebe variações delas (sem acento, minúsculas, com saudação,
+reescritas), rotuladas com o registro certo, e perguntas fora da base. Para
+cada limiar de similaridade, reporta a taxa de acerto (chamadas ao LLM
+evitadas) e os acertos errados (resposta de outro registro), que não podem
+aparecer, com e sem a confirmação pela busca local (como no exemplo-04).
+Pares de perguntas diferentes que só mudam numa palavra ("produto usado"
+e "produto novo") medem as colisões. Também mede o custo de uma busca com
+o cache cheio.
+
+Uso:
+    uv run python benchmarks/cache_semantico.py
+    uv run python benchmarks/cache_semantico.py --itens 10000
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+from agentes.base_conhecimento import IndiceKB, assinatura_registro
+from agentes.benchmark import imprimir_tabela, medir, salvar_resultados
+from agentes.cache_semantico import CacheSemantico
+from agentes.texto import normalizar
+
+CAMINHO_KB = Path(__file__).resolve().parent.parent / "workflows-parte-1" / "kb.json"
+
+PARAFRASES = {
+    1: [
+        "qual a politica de devolucao",
+        "Como funciona a política de devoluções?",
+        "Qual é a política de devoluções da loja?",
+        "política de devolução?",
+    ],
+    2: [
+        "voces entregam em todo o brasil",
+        "Vocês entregam em todo Brasil?",
+        "Entregam em todo o Brasil?",
+    ],
+    3: [
+        "Quais as formas de pagamento?",
+        "quais formas de pagamento sao aceitas",
+        "Quais formas de pagamento vocês aceitam?",
+    ],
+    4: [
+        "Como rastrear meu pedido?",
+        "como faco pra rastrear o pedido",
+        "Como eu faço para rastrear meu pedido?",
+    ],
+    5: [
+        "Vocês oferecem garantia estendida?",
+        "voces tem garantia estendida",
+        "Oferecem garantia estendida?",
+    ],
+}
+
+FORA_DA_BASE = [
+    "Qual a capital da França?",
+    "Qual é a política de privacidade?",
+    "Vocês têm loja física em São Paulo?",
+    "Posso trocar o endereço de entrega?",
+    "Quais marcas vocês vendem?",
+]
+
+# Perguntas diferentes (respostas diferentes) com texto quase igual
+DISTINTAS = [
+    ("Posso devolver um produto novo?", "Posso devolver um produto usado?"),
+    ("Vocês aceitam pagamento com cartão?", "Vocês aceitam pagamento com boleto?"),
+    ("Vocês entregam em todo o Brasil?", "Vocês entregam em Portugal?"),
+    ("Qual o prazo de entrega?", "Qual o prazo de devolução?"),
+    ("Garantia de 12 meses?", "Garantia de 36 meses?"),
+]
+
+_SAUDACOES = ["", "Oi, ", "Olá! ", "Bom dia, "]
+
+
+def gerar_consultas(semente: int = 42) -> list[tuple[str, object]]:
+    """Pares (pergunta, id esperado ou None) com variações de forma"""
+    aleatorio = random.Random(semente)
+    consultas = []
+    for id_registro, frases in PARAFRASES.items():
+        for frase in frases:
+            for saudacao in _SAUDACOES:
+                texto = saudacao + frase
+                if aleatorio.random() < 0.5:
+                    texto = normalizar(texto)
+                consultas.append((texto, id_registro))
+    consultas += [(frase, None) for frase in FORA_DA_BASE]
+    return consultas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--itens", type=int, default=1000)
+    parser.add_argument("--execucoes", type=int, default=2000)
+    parser.add_argument("--saida", default="resultados_cache_semantico.json")
+    argumentos = parser.parse_args()
+
+    with open(CAMINHO_KB, "r", encoding="utf-8") as f:
+        registros = json.load(f)["records"]
+    indice = IndiceKB()
+    indice.sincronizar(registros)
+    consultas = gerar_consultas()
+
+    print(f"{len(consultas)} consultas, {len(registros)} registros na base")
+    print(
+        f"{'limiar':>6} {'busca':>6} {'acertos':>8} {'errados':>8} "
+        f"{'fora da base':>13} {'colisões':>9}"
+    )
+    por_limiar = {}
+    for limiar in (0.6, 0.7, 0.75, 0.8, 0.9):
+        for confirmar in (False, True):
+
+            def ids(pergunta: str):
+                if not confirmar:
+                    return None
+                return [r["id"] for r in indice.buscar(pergunta, k=3)]
+
+            cache = CacheSemantico(limiar=limiar)
+            for registro in registros:
+                # Como no exemplo-04: a resposta usa os registros da busca
+                cache.gravar(
+                    registro["question"],
+                    registro["id"],
+                    dependencias={
+                        id_: indice.assinatura(id_)
+                        for id_ in ids(registro["question"]) or [registro["id"]]
+                    },
+                )
+            acertos = errados = fora = 0
+            for pergunta, esperado in consultas:
+                obtido = cache.obter(pergunta, indice.assinatura, ids(pergunta))
+                if obtido is None:
+                    continue
+                if esperado is None:
+                    fora += 1
+                elif obtido == esperado:
+                    acertos += 1
+                else:
+                    errados += 1
+            colisoes = 0
+            for respondida, nova in DISTINTAS:
+                distintas = CacheSemantico(limiar=limiar)
+                distintas.gravar(
+                    respondida,
+                    respondida,
+                    dependencias={
+                        id_: indice.assinatura(id_) for id_ in ids(respondida) or []
+                    },
+                )
+                obtido = distintas.obter(nova, indice.assinatura, ids(nova))
+                colisoes += obtido is not None
+            rotuladas = sum(esperado is not None for _, esperado in consultas)
+            por_limiar[f"{limiar}{' busca' if confirmar else ''}"] = {
+                "taxa_acerto": acertos / rotuladas,
+                "errados": errados,
+                "fora_da_base": fora,
+                "colisoes": colisoes,
+            }
+            print(
+                f"{limiar:>6} {'sim' if confirmar else 'não':>6} "
+                f"{acertos / rotuladas:>8.1%} {errados:>8} {fora:>13} "
+                f"{colisoes:>4}/{len(DISTINTAS)}"
+            )
+
+    # Custo da busca com o cache cheio: perguntas sintéticas distintas
+    cache = CacheSemantico(max_itens=argumentos.itens + len(registros))
+    aleatorio = random.Random(0)
+    palavras = normalizar(" ".join(r["answer"] for r in registros)).split()
+    for i in range(argumentos.itens):
+        cache.gravar(" ".join(aleatorio.sample(palavras, 6)) + f" {i}", i)
+    for registro in registros:
+        cache.gravar(registro["question"], registro["id"])
+    textos = [pergunta for pergunta, _ in consultas]
+
+    resultados = [
+        medir(
+            f"cache_semantico.obter.{argumentos.itens}",
+            lambda i: cache.obter(textos[i % len(textos)]),
+            execucoes=argumentos.execucoes,
+        ),
+    ]
+    imprimir_tabela(resultados)
+
+    salvar_resultados(
+        resultados,
+        argumentos.saida,
+        execucoes=argumentos.execucoes,
+        itens=argumentos.itens,
+        por_limiar=por_limiar,
+    )
+    print(f"\nResultados salvos em {argumentos.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Cascata de modelos no roteamento do calendário contra o modelo único.
+
+O servidor simulado responde como se o modelo barato fosse mais rápido e
+acertasse com confiança a maior parte das solicitações: em uma fração
+(`--dificeis`) ele devolve confiança baixa e a cascata pergunta de novo ao
+modelo mais forte. "antes" chama sempre o gpt-4o-mini (como o script
+fazia), "depois" passa pela cascata. Reporta latências, taxa de
+escalonamento e custo estimado dos dois caminhos.
+
+Uso:
+    uv run python benchmarks/cascata.py
+    uv run python benchmarks/cascata.py --execucoes 200 --dificeis 0.3
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+import zlib
+
+from agentes.benchmark import imprimir_tabela, medir, salvar_resultados
+from agentes.cache import parse_cacheado
+from agentes.cascata import obter_cascata
+from agentes.cliente import configurar_cliente
+from agentes.instrumentacao import coletar_chamadas
+from agentes.servidor_simulado import ServidorSimulado
+from blocos import carregar
+
+# Latência extra por modelo, somada à do servidor
+LATENCIA_MODELO = {"gpt-4.1-nano": 0.02, "gpt-4o-mini": 0.06}
+
+ENTRADAS = [
+    "Marque uma reunião com a equipe na terça às 14h",
+    "Mude a reunião de sexta para segunda às 10h",
+    "Agende almoço com a Ana amanhã ao meio-dia",
+    "Adicione o Pedro na reunião de planejamento",
+    "Cancele a chamada de quinta e remarque para a próxima semana",
+    "Crie um evento de aniversário no sábado à noite",
+]
+
+
+class ServidorCascata(ServidorSimulado):
+    """Servidor simulado em que o modelo barato às vezes fica inseguro"""
+
+    def __init__(self, dificeis: float, **opcoes):
+        super().__init__(**opcoes)
+        self.dificeis = dificeis
+        self._local = threading.local()
+
+    def responder(self, corpo: dict) -> dict:
+        time.sleep(LATENCIA_MODELO.get(corpo.get("model"), 0.0))
+        self._local.corpo = corpo
+        return super().responder(corpo)
+
+    def _estruturado(self, formato: dict) -> str:
+        objeto = json.loads(super()._estruturado(formato))
+        corpo = self._local.corpo
+        entrada = json.dumps(corpo.get("input"), ensure_ascii=False)
+        # Sorteio determinístico por entrada: a mesma pergunta é sempre difícil
+        dificil = zlib.crc32(entrada.encode()) % 1000 < self.dificeis * 1000
+        if corpo.get("model") == "gpt-4.1-nano" and dificil:
+            objeto["pontuacao_confianca"] = 0.4
+        return json.dumps(objeto, ensure_ascii=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--execucoes", type=int, default=100)
+    parser.add_argument("--dificeis", type=float, default=0.2)
+    parser.add_argument("--limiar", type=float, default=0.7)
+    parser.add_argument("--saida", default="resultados_cascata.json")
+    argumentos = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    script = carregar("workflows-parte-2/2-routing.py")
+    obter_cascata().configurar_etapa("roteamento", limiar=argumentos.limiar)
+    custos = {"antes": 0.0, "depois": 0.0}
+
+    def entrada(i: int, caminho: str) -> str:
+        # Sufixo distinto por execução: o cache de respostas não interfere
+        return f"{ENTRADAS[i % len(ENTRADAS)]} (#{i} {caminho})"
+
+    def antes(i: int):
+        with coletar_chamadas() as chamadas:
+            parse_cacheado(
+                **script._parametros_classificacao(entrada(i, "antes"), "gpt-4o-mini")
+            )
+        custos["antes"] += sum(c.custo_estimado or 0.0 for c in chamadas)
+
+    def depois(i: int):
+        with coletar_chamadas() as chamadas:
+            script.classificar_solicitacao_llm(entrada(i, "depois"))
+        custos["depois"] += sum(c.custo_estimado or 0.0 for c in chamadas)
+
+    with ServidorCascata(argumentos.dificeis, latencia_segundos=0.01) as servidor:
+        configurar_cliente(base_url=servidor.base_url, api_key="simulado")
+        resultados = [
+            medir(
+                f"cascata.{nome}",
+                funcao,
+                execucoes=argumentos.execucoes,
+                aquecimento=0,
+                execucoes_memoria=0,
+            )
+            for nome, funcao in (("antes", antes), ("depois", depois))
+        ]
+
+    imprimir_tabela(resultados)
+    relatorio = obter_cascata().relatorio()["roteamento"]
+    print(
+        f"\nescalonamento: {relatorio['taxa_escalonamento']:.1%}  "
+        f"atendidas: {relatorio['atendidas_por_modelo']}"
+    )
+    economia = 1 - custos["depois"] / custos["antes"] if custos["antes"] else 0.0
+    print(
+        f"custo antes/depois: ${custos['antes']:.6f}/${custos['depois']:.6f} "
+        f"(economia {economia:.1%})"
+    )
+
+    salvar_resultados(
+        resultados,
+        argumentos.saida,
+        execucoes=argumentos.execucoes,
+        dificeis=argumentos.dificeis,
+        limiar=argumentos.limiar,
+        custos=custos,
+        cascata=relatorio,
+    )
+    print(f"\nResultados salvos em {argumentos.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Pedidos idênticos e simultâneos, com e sem deduplicação (single-flight).
+
+Simula muitos usuários fazendo a mesma pergunta frequente ao mesmo tempo:
+todas as execuções usam a mesma entrada, com `--concorrencia` em paralelo,
+contra o servidor simulado com latência. "sem" chama o LLM direto, "com"
+passa pelo `Deduplicador`; a coluna "upstream" conta as requisições que
+chegaram ao servidor.
+
+Uso:
+    uv run python benchmarks/deduplicacao.py
+    uv run python benchmarks/deduplicacao.py --concorrencia 50 --latencia 0.2
+"""
+
+import argparse
+import logging
+
+from pydantic import BaseModel, Field
+
+from agentes.benchmark import imprimir_tabela, medir, salvar_resultados
+from agentes.cache import parse_deduplicado, parse_deduplicado_async
+from agentes.cliente import configurar_cliente
+from agentes.deduplicacao import obter_deduplicador
+from agentes.esquemas import parse_com_esquema, parse_com_esquema_async
+from agentes.servidor_simulado import ServidorSimulado
+from blocos import carregar
+
+PERGUNTA = "Qual é a política de devoluções?"
+
+
+class Resposta(BaseModel):
+    answer: str = Field(description="Resposta à pergunta do usuário")
+    confidence: str = Field(description="Nível de confiança: alto, médio ou baixo")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--execucoes", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--latencia", type=float, default=0.1)
+    parser.add_argument("--saida", default="resultados_deduplicacao.json")
+    argumentos = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    parametros = {"model": "gpt-4o-mini", "input": PERGUNTA}
+    exemplo_04 = carregar("workflows-parte-1/exemplo-04.py")
+
+    async def sem_async(i: int):
+        return await parse_com_esquema_async(Resposta, **parametros)
+
+    async def com_async(i: int):
+        return await parse_deduplicado_async(Resposta, **parametros)
+
+    cenarios = [
+        ("parse.sem", lambda i: parse_com_esquema(Resposta, **parametros)),
+        ("parse.com", lambda i: parse_deduplicado(Resposta, **parametros)),
+        ("parse.async.sem", sem_async),
+        ("parse.async.com", com_async),
+        ("exemplo-04.answer_question", lambda i: exemplo_04.answer_question(PERGUNTA)),
+    ]
+
+    resultados, upstream = [], {}
+    with ServidorSimulado(latencia_segundos=argumentos.latencia) as servidor:
+        configurar_cliente(base_url=servidor.base_url, api_key="simulado")
+        for nome, funcao in cenarios:
+            antes = servidor.requisicoes
+            resultados.append(
+                medir(
+                    nome,
+                    funcao,
+                    execucoes=argumentos.execucoes,
+                    concorrencia=argumentos.concorrencia,
+                    aquecimento=0,
+                    execucoes_memoria=0,
+                )
+            )
+            upstream[nome] = servidor.requisicoes - antes
+
+    imprimir_tabela(resultados)
+    print(f"\n{'benchmark':<40} {'upstream':>9} {'por pedido':>11}")
+    for nome, requisicoes in upstream.items():
+        por_pedido = requisicoes / argumentos.execucoes
+        print(f"{nome:<40} {requisicoes:>9} {por_pedido:>11.2f}")
+    print(f"\nDeduplicação: {obter_deduplicador().estatisticas()}")
+
+    salvar_resultados(
+        resultados,
+        argumentos.saida,
+        execucoes=argumentos.execucoes,
+        concorrencia=argumentos.concorrencia,
+        latencia=argumentos.latencia,
+        upstream=upstream,
+    )
+    print(f"\nResultados salvos em {argumentos.saida}")
+
+
+if __name__ == "__main__":
+    main()
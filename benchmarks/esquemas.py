@@ -0,0 +1,112 @@
+"""
+Custo no cliente da saída estruturada, antes e depois do registro de esquemas.
+
+"antes" é o caminho do SDK: `responses.parse(text_format=...)` gera o JSON
+Schema strict a cada chamada e a chave do cache serializava o esquema
+inteiro. "depois" usa `agentes.esquemas`: esquema compilado uma vez,
+impressão digital na chave e `TypeAdapter` reaproveitado.
+
+Os benchmarks "preparo" medem só o trabalho local (montar o parâmetro,
+a chave de cache e validar a saída); os "ponta-a-ponta" fazem a chamada
+contra o servidor simulado sem latência, então a diferença é overhead do
+cliente.
+
+Uso:
+    uv run python benchmarks/esquemas.py
+"""
+
+import argparse
+import json
+
+from pydantic import BaseModel, Field
+
+from agentes.benchmark import imprimir_tabela, medir, salvar_resultados
+from agentes.cache import chave_cache
+from agentes.cliente import configurar_cliente, obter_cliente
+from agentes.esquemas import formato_estrito, obter_esquema, parse_com_esquema
+from agentes.servidor_simulado import ServidorSimulado, exemplo_do_esquema
+
+
+class Participante(BaseModel):
+    nome: str = Field(description="Nome do participante")
+    email: str = Field(description="Email do participante")
+
+
+class EventoDetalhado(BaseModel):
+    """Tamanho típico dos modelos dos workflows, com um modelo aninhado"""
+
+    nome: str = Field(description="Nome do evento")
+    data: str = Field(description="Data e hora no formato ISO 8601")
+    duracao_minutos: int = Field(description="Duração esperada em minutos")
+    participantes: list[Participante] = Field(description="Quem participa")
+    local: str = Field(description="Onde o evento acontece")
+    confianca: float = Field(description="Confiança entre 0 e 1")
+
+
+def _chave_antiga(**parametros) -> str:
+    """Chave do cache como era antes: o JSON Schema inteiro entra no hash"""
+
+    def serializar(valor):
+        if isinstance(valor, type) and issubclass(valor, BaseModel):
+            return {"nome": valor.__name__, "esquema": valor.model_json_schema()}
+        return repr(valor)
+
+    return json.dumps(parametros, sort_keys=True, default=serializar)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--saida", default="resultados_esquemas.json")
+    parser.add_argument("--execucoes", type=int, default=500)
+    argumentos = parser.parse_args()
+
+    formato = formato_estrito(EventoDetalhado)
+    saida = json.dumps(exemplo_do_esquema(formato["schema"]))
+
+    def preparo_antes(i: int):
+        # O SDK faz a mesma conversão em cada `responses.parse`
+        formato_estrito(EventoDetalhado)
+        _chave_antiga(input=f"Evento {i}", text_format=EventoDetalhado)
+        return EventoDetalhado.model_validate_json(saida)
+
+    def preparo_depois(i: int):
+        esquema = obter_esquema(EventoDetalhado)
+        chave_cache(input=f"Evento {i}", text_format=EventoDetalhado)
+        return esquema.validar_json(saida)
+
+    resultados = [
+        medir("preparo.antes", preparo_antes, execucoes=argumentos.execucoes),
+        medir("preparo.depois", preparo_depois, execucoes=argumentos.execucoes),
+    ]
+
+    with ServidorSimulado(latencia_segundos=0) as servidor:
+        configurar_cliente(base_url=servidor.base_url, api_key="simulado")
+        client = obter_cliente()
+
+        def ponta_a_ponta_antes(i: int):
+            return client.responses.parse(
+                model="gpt-4o-mini",
+                input=f"Evento {i}",
+                text_format=EventoDetalhado,
+            ).output_parsed
+
+        def ponta_a_ponta_depois(i: int):
+            return parse_com_esquema(
+                EventoDetalhado,
+                client=client,
+                model="gpt-4o-mini",
+                input=f"Evento {i}",
+            )
+
+        resultados += [
+            medir("ponta-a-ponta.antes", ponta_a_ponta_antes, execucoes=200),
+            medir("ponta-a-ponta.depois", ponta_a_ponta_depois, execucoes=200),
+        ]
+
+    imprimir_tabela(resultados)
+    salvar_resultados(resultados, argumentos.saida, execucoes=argumentos.execucoes)
+    print(f"\nResultados salvos em {argumentos.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Tempo de import a frio de cada script e dos módulos de `agentes`.
+
+Cada medição roda num interpretador novo, sem nenhum módulo já
+carregado, importa o módulo pelo caminho e mede só o import. Importar não
+pode fazer chamadas de rede nem exigir credenciais, então os processos
+rodam sem `OPENAI_API_KEY`: um script que ainda crie clientes ou execute
+exemplos no import aparece como erro.
+
+A coluna "mais pesado" vem do `-X importtime`: a dependência de maior
+tempo acumulado puxada pelo módulo.
+
+Uso:
+    uv run python benchmarks/importacao.py
+    uv run python benchmarks/importacao.py --execucoes 10 --saida importacao.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from agentes.benchmark import percentil
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+SCRIPTS = [
+    "1-inteligencia.py",
+    "2-memoria.py",
+    "3-tools.py",
+    "4-validacao.py",
+    "5-controle.py",
+    "6-recuperacao.py",
+    "7-feedback.py",
+    "workflows-parte-1/exemplo-01.py",
+    "workflows-parte-1/exemplo-02.py",
+    "workflows-parte-1/exemplo-03.py",
+    "workflows-parte-1/exemplo-04.py",
+    "workflows-parte-2/1-prompt-chaining.py",
+    "workflows-parte-2/2-routing.py",
+    "workflows-parte-2/3-parallelization.py",
+]
+
+MODULOS = [
+    "agentes.texto",
+    "agentes.instrumentacao",
+    "agentes.cotacoes",
+    "agentes.cliente",
+    "agentes.cache",
+]
+
+_MEDIR = """
+import importlib, importlib.util, sys, time
+alvo = sys.argv[1]
+print("--inicio--", file=sys.stderr, flush=True)
+inicio = time.perf_counter()
+if alvo.endswith(".py"):
+    spec = importlib.util.spec_from_file_location("alvo", alvo)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+else:
+    importlib.import_module(alvo)
+print(time.perf_counter() - inicio)
+"""
+
+
+def _ambiente() -> dict[str, str]:
+    ambiente = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    ambiente["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(RAIZ), ambiente.get("PYTHONPATH")])
+    )
+    return ambiente
+
+
+def _mais_pesado(saida_importtime: str) -> str:
+    """Dependência de terceiros com maior tempo acumulado no `-X importtime`"""
+    # O que o interpretador importa antes do alvo (site, .pth) não conta
+    _, _, saida_importtime = saida_importtime.partition("--inicio--")
+    maior, nome_maior = 0, ""
+    for linha in saida_importtime.splitlines():
+        partes = linha.removeprefix("import time:").split("|")
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        nome = partes[2].strip()
+        acumulado = int(partes[1])
+        # Só o nível de pacote, ignorando o próprio alvo e os módulos do repo
+        if "." in nome or nome in ("alvo", "agentes"):
+            continue
+        if acumulado > maior:
+            maior, nome_maior = acumulado, nome
+    return f"{nome_maior} ({maior / 1000:.0f} ms)" if nome_maior else "-"
+
+
+def medir_import(alvo: str, execucoes: int) -> dict:
+    caminho = str(RAIZ / alvo) if alvo.endswith(".py") else alvo
+    tempos = []
+    for _ in range(execucoes):
+        processo = subprocess.run(
+            [sys.executable, "-c", _MEDIR, caminho],
+            capture_output=True,
+            text=True,
+            env=_ambiente(),
+            cwd=RAIZ,
+        )
+        if processo.returncode != 0:
+            erro = processo.stderr.strip().splitlines()[-1]
+            return {"alvo": alvo, "erro": erro}
+        tempos.append(float(processo.stdout) * 1000)
+
+    importtime = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _MEDIR, caminho],
+        capture_output=True,
+        text=True,
+        env=_ambiente(),
+        cwd=RAIZ,
+    )
+    return {
+        "alvo": alvo,
+        "mediana_ms": statistics.median(tempos),
+        "p95_ms": percentil(tempos, 95),
+        "mais_pesado": _mais_pesado(importtime.stderr),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--execucoes", type=int, default=5)
+    parser.add_argument("--saida", help="Grava os resultados em JSON")
+    argumentos = parser.parse_args()
+
+    resultados = [
+        medir_import(alvo, argumentos.execucoes) for alvo in MODULOS + SCRIPTS
+    ]
+
+    print(f"{'módulo':<42} {'mediana ms':>10} {'p95 ms':>8}  mais pesado")
+    for r in resultados:
+        if "erro" in r:
+            print(f"{r['alvo']:<42} {'ERRO':>10} {'':>8}  {r['erro']}")
+        else:
+            print(
+                f"{r['alvo']:<42} {r['mediana_ms']:>10.1f} {r['p95_ms']:>8.1f}  "
+                f"{r['mais_pesado']}"
+            )
+
+    if argumentos.saida:
+        with open(argumentos.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados salvos em {argumentos.saida}")
+
+
+if __name__ == "__main__":
+    main()
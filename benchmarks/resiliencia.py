@@ -0,0 +1,115 @@
+"""
+`inteligencia_resiliente` com o provedor saudável, fora do ar e lento.
+
+Cada cenário ajusta o servidor simulado e roda as mesmas entradas por dois
+caminhos: "antes" chama o LLM direto (como o script fazia), "depois" passa
+pelo `CaminhoResiliente` (extração local, prazo, disjuntor e fallback).
+Um terço das entradas tem nome e telefone em formato claro (a extração
+local resolve), um terço é ambíguo (vai para o LLM, mas tem fallback local)
+e um terço só o LLM entende. Reporta latências, requisições que
+falharam e qual caminho atendeu cada uma.
+
+Uso:
+    uv run python benchmarks/resiliencia.py
+    uv run python benchmarks/resiliencia.py --execucoes 50 --prazo 0.3
+"""
+
+import argparse
+import logging
+
+from agentes.benchmark import imprimir_tabela, medir, salvar_resultados
+from agentes.cache import parse_cacheado
+from agentes.cliente import configurar_cliente
+from agentes.resiliencia import CaminhoResiliente, Disjuntor
+from agentes.servidor_simulado import ServidorSimulado
+from blocos import carregar
+
+CENARIOS = {
+    "saudavel": {"latencia_segundos": 0.05, "taxa_erro_servidor": 0.0},
+    "fora-do-ar": {"latencia_segundos": 0.05, "taxa_erro_servidor": 1.0},
+    "lento": {"latencia_segundos": 2.0, "taxa_erro_servidor": 0.0},
+}
+
+
+def entrada(i: int, cenario: str) -> str:
+    telefone = f"(11) 9{i:04d}-9999"
+    if i % 3 == 0:
+        return f"Meu nome é Alberto Souza ({cenario}) e meu telefone é {telefone}"
+    if i % 3 == 1:
+        # Dois telefones: a extração local não sabe qual escolher
+        return f"Meu nome é Alberto Souza ({cenario}), fones {telefone} e 3333-4444"
+    return f"oi, aqui é o beto ({cenario}), me liga no {telefone}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--execucoes", type=int, default=30)
+    parser.add_argument("--prazo", type=float, default=0.5)
+    parser.add_argument("--saida", default="resultados_resiliencia.json")
+    argumentos = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    script = carregar("6-recuperacao.py")
+    resultados, caminhos = [], {}
+
+    with ServidorSimulado() as servidor:
+        configurar_cliente(base_url=servidor.base_url, api_key="simulado")
+        for cenario, config in CENARIOS.items():
+            servidor.config = servidor.config.model_copy(update=config)
+            falhas = {"antes": 0, "depois": 0}
+            extracao = CaminhoResiliente(
+                chamar_llm=lambda prompt: parse_cacheado(
+                    **script._parametros_extracao(prompt)
+                ),
+                extrair_local=script._extrair_local,
+                disjuntor=Disjuntor(cenario),
+                prazo_segundos=argumentos.prazo,
+            )
+
+            def antes(i: int, cenario=cenario, falhas=falhas):
+                try:
+                    parse_cacheado(
+                        **script._parametros_extracao(entrada(i, f"{cenario} antes"))
+                    )
+                except Exception:
+                    falhas["antes"] += 1
+
+            def depois(i: int, cenario=cenario, falhas=falhas, extracao=extracao):
+                try:
+                    extracao.executar(entrada(i, f"{cenario} depois"))
+                except Exception:
+                    falhas["depois"] += 1
+
+            for nome, funcao in (("antes", antes), ("depois", depois)):
+                resultados.append(
+                    medir(
+                        f"resiliencia.{cenario}.{nome}",
+                        funcao,
+                        execucoes=argumentos.execucoes,
+                        aquecimento=0,
+                        execucoes_memoria=0,
+                    )
+                )
+            caminhos[cenario] = {**extracao.metricas(), "falhas": falhas}
+
+    imprimir_tabela(resultados)
+    print()
+    for cenario, metricas in caminhos.items():
+        print(
+            f"{cenario:<12} falhas antes/depois: {metricas['falhas']['antes']}/"
+            f"{metricas['falhas']['depois']}  caminhos: {metricas['por_origem']}  "
+            f"motivos: {metricas['motivos_fallback']}"
+        )
+
+    salvar_resultados(
+        resultados,
+        argumentos.saida,
+        execucoes=argumentos.execucoes,
+        prazo=argumentos.prazo,
+        caminhos=caminhos,
+    )
+    print(f"\nResultados salvos em {argumentos.saida}")
+
+
+if __name__ == "__main__":
+    main()
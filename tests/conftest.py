@@ -0,0 +1,14 @@
+import pytest
+
+from agentes.cliente import ConfiguracaoCliente, configurar_cliente
+from agentes.servidor_simulado import ServidorSimulado
+
+
+@pytest.fixture
+def servidor():
+    """Servidor simulado local, com o cliente compartilhado apontando para ele"""
+    with ServidorSimulado(latencia_segundos=0) as servidor:
+        # Volta à configuração padrão: um teste não herda ajustes de outro
+        padrao = ConfiguracaoCliente(base_url=servidor.base_url, api_key="simulado")
+        configurar_cliente(**padrao.model_dump())
+        yield servidor
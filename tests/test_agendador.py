@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from openai import RateLimitError
+
+from agentes.agendador import AgendadorAsync
+from blocos import carregar
+
+
+def test_agendador_nao_soma_as_retentativas_do_sdk(servidor):
+    servidor.config = servidor.config.model_copy(update={"taxa_rate_limit": 1.0})
+    agendador = AgendadorAsync(max_tentativas=3)
+
+    async def chamar():
+        return await agendador.executar(
+            lambda: agendador.cliente().responses.create(
+                model="gpt-4o-mini", input="oi"
+            )
+        )
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(chamar())
+
+    # Três tentativas do agendador, nenhuma a mais do SDK
+    assert servidor.requisicoes == 3
+    assert agendador.rate_limits == 3
+
+
+def test_acertos_do_cache_e_chamadas_coalescidas_nao_passam_pelo_agendador(
+    servidor,
+):
+    paralelizacao = carregar("workflows-parte-2/3-parallelization.py")
+    entrada = "Reunião de alinhamento do agendador na quinta às 11h"
+
+    async def cenario():
+        # Cinco chamadas idênticas juntas e mais uma depois, já em cache
+        await asyncio.gather(
+            *(paralelizacao.validar_solicitacao_calendario(entrada) for _ in range(5))
+        )
+        await paralelizacao.validar_solicitacao_calendario(entrada)
+
+    asyncio.run(cenario())
+
+    assert servidor.requisicoes == 1
+    assert paralelizacao.obter_agendador().concluidas == 1
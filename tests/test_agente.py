@@ -0,0 +1,82 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from agentes.agente import executar_agente, executar_agente_async
+from agentes.ferramentas import RegistroFerramentas
+
+registro = RegistroFerramentas()
+
+
+@registro.ferramenta
+def somar(a: int, b: int) -> int:
+    """Soma dois números"""
+    return a + b
+
+
+class _Respostas:
+    """`client.responses` que sempre pede a ferramenta, a menos que seja proibido"""
+
+    def __init__(self):
+        self.pedidos: list[dict] = []
+
+    def create(self, **parametros):
+        self.pedidos.append(parametros)
+        numero = len(self.pedidos)
+        if parametros.get("tool_choice") == "none":
+            saida, texto = [], "resposta final"
+        else:
+            chamada = SimpleNamespace(
+                type="function_call",
+                name="somar",
+                arguments=json.dumps({"a": numero, "b": 1}),
+                call_id=f"call_{numero}",
+            )
+            saida, texto = [chamada], ""
+        return SimpleNamespace(
+            id=f"resp_{numero}", output=saida, output_text=texto, usage=None
+        )
+
+
+class _RespostasAsync(_Respostas):
+    async def create(self, **parametros):
+        return super().create(**parametros)
+
+
+def _verificar_limite(respostas: _Respostas, resultado) -> None:
+    # Duas rodadas de ferramentas; os resultados da segunda vão com
+    # tool_choice="none", sem repetir a chamada anterior
+    assert len(respostas.pedidos) == 3
+    ultimo = respostas.pedidos[-1]
+    assert ultimo["tool_choice"] == "none"
+    assert ultimo["previous_response_id"] == "resp_2"
+    assert [saida["call_id"] for saida in ultimo["input"]] == ["call_2"]
+    assert resultado.texto == "resposta final"
+    assert resultado.estatisticas.atingiu_limite
+    assert resultado.estatisticas.rodadas_ferramentas == 2
+    assert resultado.estatisticas.chamadas_modelo == 3
+
+
+def test_limite_de_rodadas_envia_os_resultados_pendentes():
+    respostas = _Respostas()
+    cliente = SimpleNamespace(responses=respostas)
+    resultado = executar_agente("2+2?", registro, max_rodadas=2, client=cliente)
+    _verificar_limite(respostas, resultado)
+
+
+def test_limite_de_rodadas_assincrono():
+    respostas = _RespostasAsync()
+    cliente = SimpleNamespace(responses=respostas)
+    resultado = asyncio.run(
+        executar_agente_async("2+2?", registro, max_rodadas=2, client=cliente)
+    )
+    _verificar_limite(respostas, resultado)
+
+
+def test_rodada_de_ferramenta_no_servidor_simulado(servidor):
+    resultado = executar_agente("Quanto é 2+3?", registro)
+
+    assert servidor.requisicoes == 2
+    assert resultado.texto
+    assert resultado.estatisticas.rodadas_ferramentas == 1
+    assert not resultado.estatisticas.atingiu_limite
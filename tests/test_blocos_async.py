@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from agentes.cliente import obter_cliente
+from blocos import carregar
+
+
+@pytest.fixture
+def sem_cliente_sincrono(servidor, monkeypatch):
+    """Falha se um caminho assíncrono usar o cliente síncrono (numa thread)"""
+
+    def proibido(**parametros):
+        raise AssertionError("caminho assíncrono usou o cliente síncrono")
+
+    cliente = obter_cliente()
+    for metodo in ("create", "parse"):
+        monkeypatch.setattr(cliente.responses, metodo, proibido)
+    return servidor
+
+
+def test_blocos_async_usam_o_cliente_async(sem_cliente_sincrono):
+    inteligencia = carregar("1-inteligencia.py")
+    validacao = carregar("4-validacao.py")
+    recuperacao = carregar("6-recuperacao.py")
+
+    async def cenario():
+        return await asyncio.gather(
+            inteligencia.basic_intelligence_async("O que é IA?"),
+            validacao.inteligencia_estruturada_async("Revisar o contrato amanhã"),
+            recuperacao.inteligencia_resiliente_async("Falar com o contato"),
+        )
+
+    texto, tarefa, contato = asyncio.run(cenario())
+
+    assert texto.startswith("simulado")
+    assert tarefa.tarefa == "exemplo"
+    assert contato
+    assert sem_cliente_sincrono.requisicoes == 3
+
+
+def test_workflows_de_calendario_async(sem_cliente_sincrono):
+    encadeamento = carregar("workflows-parte-2/1-prompt-chaining.py")
+    roteamento = carregar("workflows-parte-2/2-routing.py")
+
+    async def cenario():
+        return (
+            await encadeamento.processar_solicitacao_calendario_async(
+                "Reunião de planejamento async amanhã às 15h"
+            ),
+            await encadeamento.processar_solicitacao_calendario_async(
+                "Reunião de revisão async amanhã às 16h", especulativo=True
+            ),
+            await roteamento.processar_solicitacao_calendario_async(
+                "Agende uma reunião async com a equipe na terça"
+            ),
+        )
+
+    cadeia, especulativa, roteada = asyncio.run(cenario())
+
+    assert cadeia is not None and especulativa is not None
+    assert roteada is not None and roteada.sucesso
+
+
+def test_sync_e_async_enviam_o_mesmo_prompt_e_dividem_o_cache(servidor):
+    validacao = carregar("4-validacao.py")
+    entrada = "Pagar a conta de luz, prioridade alta, cache compartilhado"
+
+    sincrono = validacao.inteligencia_estruturada(entrada)
+    assincrono = asyncio.run(validacao.inteligencia_estruturada_async(entrada))
+
+    assert assincrono == sincrono
+    assert servidor.requisicoes == 1
+
+
+def test_memoria_alterna_entre_sync_e_async_na_mesma_sessao(servidor):
+    memoria = carregar("2-memoria.py")
+
+    memoria.perguntar_com_memoria("sessao-mista", "Conte uma piada")
+    asyncio.run(memoria.perguntar_com_memoria_async("sessao-mista", "Explique-a"))
+
+    turnos = memoria.obter_memoria().backend.turnos("sessao-mista")
+    assert [turno.papel for turno in turnos] == ["user", "assistant"] * 2
+
+
+def test_roteamento_async_por_regra_nao_chama_o_llm(sem_cliente_sincrono):
+    controle = carregar("5-controle.py")
+
+    _, classificacao = asyncio.run(
+        controle.roteamento_por_intencao_async("Agende uma reunião amanhã às 9h")
+    )
+
+    assert classificacao.intencao == "solicitacao"
+    assert sem_cliente_sincrono.requisicoes == 0
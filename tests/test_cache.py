@@ -0,0 +1,101 @@
+import time
+
+from openai import OpenAI
+from pydantic import BaseModel
+
+from agentes.cache import CacheRespostas, chave_cache, parse_cacheado
+from agentes.servidor_simulado import ServidorSimulado
+
+
+class Resumo(BaseModel):
+    texto: str
+
+
+def _modelo_com_campo_extra():
+    class Resumo(BaseModel):
+        texto: str
+        idioma: str
+
+    return Resumo
+
+
+def test_chave_depende_dos_parametros_e_do_esquema():
+    chave = chave_cache(model="m", input="oi", text_format=Resumo)
+
+    assert chave == chave_cache(text_format=Resumo, input="oi", model="m")
+    assert chave != chave_cache(model="m", input="olá", text_format=Resumo)
+    assert chave != chave_cache(
+        model="m", input="oi", text_format=Resumo, temperature=0
+    )
+    # Mesmo nome de classe, outro esquema: outra chave
+    outro = _modelo_com_campo_extra()
+    assert chave != chave_cache(model="m", input="oi", text_format=outro)
+
+
+def test_mesma_chamada_em_outro_base_url_nao_reaproveita_a_resposta(servidor):
+    cache = CacheRespostas()
+    parametros = dict(model="gpt-4o-mini", input="resuma: base_url na chave")
+
+    parse_cacheado(Resumo, cache=cache, **parametros)
+    parse_cacheado(Resumo, cache=cache, **parametros)
+    assert servidor.requisicoes == 1
+
+    with ServidorSimulado(latencia_segundos=0) as outro:
+        cliente = OpenAI(base_url=outro.base_url, api_key="simulado")
+        parse_cacheado(Resumo, client=cliente, cache=cache, **parametros)
+        assert outro.requisicoes == 1
+    assert cache.estatisticas()["acertos"] == 1
+
+
+def test_item_expirado_sai_da_memoria(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: agora[0])
+    cache = CacheRespostas(ttl_segundos=10)
+    cache.gravar("k", "v")
+
+    agora[0] += 10
+    assert cache.obter("k") == "v"
+    agora[0] += 1
+    assert cache.obter("k") is None
+    assert cache.estatisticas()["expirados"] == 1
+    assert cache.estatisticas()["itens_memoria"] == 0
+
+
+def test_memoria_descarta_o_menos_usado_acima_do_limite():
+    cache = CacheRespostas(max_itens=2)
+    cache.gravar("a", "1")
+    cache.gravar("b", "2")
+    cache.obter("a")  # "a" passa a ser o mais recente
+    cache.gravar("c", "3")  # sai "b"
+
+    assert cache.obter("b") is None
+    assert cache.obter("a") == "1"
+    assert cache.obter("c") == "3"
+    assert cache.removidos == 1
+
+
+def test_nivel_em_disco_sobrevive_a_outra_instancia(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "cache.db")
+    agora = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: agora[0])
+    primeiro = CacheRespostas(
+        ttl_segundos=60, caminho_disco=caminho, max_itens_disco=2
+    )
+    for chave in ("a", "b", "c"):
+        agora[0] += 1
+        primeiro.gravar(chave, chave.upper())
+
+    # Outro processo: memória vazia, disco com os dois mais recentes
+    segundo = CacheRespostas(ttl_segundos=60, caminho_disco=caminho)
+    assert segundo.obter("a") is None
+    assert segundo.obter("b") == "B"
+    assert segundo.estatisticas()["acertos_disco"] == 1
+    # O acerto em disco sobe para a memória
+    assert segundo.obter("b") == "B"
+    assert segundo.estatisticas()["acertos_disco"] == 1
+
+    agora[0] += 61
+    terceiro = CacheRespostas(ttl_segundos=60, caminho_disco=caminho)
+    assert terceiro.obter("c") is None
+    assert terceiro.expirados == 1
+    assert CacheRespostas(ttl_segundos=None, caminho_disco=caminho).obter("c") is None
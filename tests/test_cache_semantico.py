@@ -0,0 +1,52 @@
+from agentes.cache_semantico import CacheSemantico
+
+
+def test_perguntas_que_mudam_numa_palavra_nao_colidem():
+    cache = CacheSemantico()
+    cache.gravar("Posso devolver um produto novo?", "novo")
+    cache.gravar("Vocês aceitam pagamento com cartão?", "cartão")
+
+    assert cache.obter("Posso devolver um produto usado?") is None
+    assert cache.obter("Vocês aceitam pagamento com boleto?") is None
+    assert cache.obter("posso devolver um produto novo") == "novo"
+
+
+PERGUNTA = "Qual é a política de devoluções?"
+
+
+def test_acerto_por_similaridade_exige_os_registros_da_busca():
+    cache = CacheSemantico(limiar=0.5)
+    cache.gravar(PERGUNTA, "resposta", dependencias={1: "a"})
+
+    pergunta = "Como funciona a política de devoluções?"
+    assert cache.obter(pergunta, lambda _: "a", registros=[1, 3]) is None
+    assert cache.obter(pergunta, lambda _: "a", registros=[1]) == "resposta"
+
+
+def test_registro_alterado_invalida_a_entrada():
+    cache = CacheSemantico()
+    cache.gravar(PERGUNTA, "resposta", dependencias={1: "a"})
+
+    assert cache.obter(PERGUNTA, lambda _: "a") == "resposta"
+    assert cache.obter(PERGUNTA, lambda _: "b") is None
+    assert cache.estatisticas()["itens"] == 0
+
+
+def test_matriz_continua_certa_com_remocoes_e_reuso_de_linhas():
+    palavras = "azul verde trem casa livro porta janela carro mesa rio".split()
+    perguntas = [
+        f"quero saber sobre {palavras[i % 10]} {palavras[i // 10]} e {i} hoje"
+        for i in range(50)
+    ]
+    cache = CacheSemantico(max_itens=20)
+    for i, pergunta in enumerate(perguntas):
+        cache.gravar(pergunta, i)
+
+    assert cache.estatisticas()["itens"] == 20
+    for i, pergunta in enumerate(perguntas):
+        # Com um erro de digitação: só acerta pela matriz, não pela chave exata
+        obtido = cache.obter(pergunta + "s")
+        if i < 30:
+            assert obtido != i
+        else:
+            assert obtido == i
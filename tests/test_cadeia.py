@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from agentes.cadeia import (
+    CadeiaInterrompida,
+    Etapa,
+    executar_cadeia,
+    executar_cadeia_async,
+)
+from blocos import carregar
+
+
+def _porta_que_falha(entrada, resultados):
+    time.sleep(0.1)
+    raise CadeiaInterrompida("porta")
+
+
+def test_cadeia_sincrona_volta_quando_a_porta_falha():
+    etapas = [
+        Etapa(nome="porta", funcao=_porta_que_falha),
+        Etapa(nome="lenta", funcao=lambda entrada, resultados: time.sleep(1.0)),
+        Etapa(nome="fim", funcao=lambda e, r: None, depende_de=["porta", "lenta"]),
+    ]
+    inicio = time.perf_counter()
+    resultado = executar_cadeia(etapas, None)
+    decorrido = time.perf_counter() - inicio
+
+    assert resultado.interrompida_em == "porta"
+    assert resultado.canceladas == ["fim", "lenta"]
+    assert decorrido < 0.5
+    assert abs(resultado.tempo_total - decorrido) < 0.05
+
+
+def test_etapa_especulativa_assincrona_e_cancelada():
+    estado = {}
+
+    async def porta(entrada, resultados):
+        await asyncio.sleep(0.05)
+        raise CadeiaInterrompida("porta")
+
+    async def especulativa(entrada, resultados):
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            estado["especulativa"] = "cancelada"
+            raise
+
+    etapas = [
+        Etapa(nome="porta", funcao=porta),
+        Etapa(nome="especulativa", funcao=especulativa),
+    ]
+    resultado = asyncio.run(executar_cadeia_async(etapas, None))
+
+    assert resultado.interrompida_em == "porta"
+    assert estado["especulativa"] == "cancelada"
+
+
+def test_cadeia_especulativa_do_calendario(servidor):
+    script = carregar("workflows-parte-2/1-prompt-chaining.py")
+
+    confirmacao = script.processar_solicitacao_calendario(
+        "Reunião de teste da cadeia amanhã às 10h", especulativo=True
+    )
+    assert confirmacao is not None
+
+    servidor.config = servidor.config.model_copy(
+        update={
+            "respostas_estruturadas": {
+                "ExtracaoEvento": {
+                    "descricao": "e-mail",
+                    "eh_evento_calendario": False,
+                    "pontuacao_confianca": 0.95,
+                }
+            }
+        }
+    )
+    assert (
+        script.processar_solicitacao_calendario(
+            "Mande um e-mail para o Daniel", especulativo=True
+        )
+        is None
+    )
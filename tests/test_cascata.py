@@ -0,0 +1,52 @@
+import logging
+
+from pydantic import BaseModel
+
+from agentes.cascata import Cascata, PoliticaCascata
+
+
+class Classificacao(BaseModel):
+    rotulo: str
+    pontuacao_confianca: float
+
+
+class SemConfianca(BaseModel):
+    rotulo: str
+
+
+def _cascata() -> Cascata:
+    return Cascata(padrao=PoliticaCascata(modelos=["barato", "forte"], limiar=0.7))
+
+
+def test_confianca_baixa_escala_para_o_proximo_modelo():
+    cascata = _cascata()
+    confiancas = {"barato": 0.4, "forte": 0.95}
+    chamados = []
+
+    def chamar(modelo):
+        chamados.append(modelo)
+        return Classificacao(rotulo=modelo, pontuacao_confianca=confiancas[modelo])
+
+    assert cascata.executar("etapa", chamar).rotulo == "forte"
+    assert chamados == ["barato", "forte"]
+
+    confiancas["barato"] = 0.9
+    assert cascata.executar("etapa", chamar).rotulo == "barato"
+    relatorio = cascata.relatorio()["etapa"]
+    assert relatorio["taxa_escalonamento"] == 0.5
+    assert relatorio["atendidas_por_modelo"] == {"forte": 1, "barato": 1}
+
+
+def test_resultado_sem_campo_de_confianca_escala_com_aviso(caplog):
+    cascata = _cascata()
+    chamados = []
+
+    def chamar(modelo):
+        chamados.append(modelo)
+        return SemConfianca(rotulo=modelo)
+
+    with caplog.at_level(logging.WARNING, logger="agentes.cascata"):
+        assert cascata.executar("etapa", chamar).rotulo == "forte"
+
+    assert chamados == ["barato", "forte"]
+    assert "pontuacao_confianca" in caplog.text
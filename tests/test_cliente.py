@@ -0,0 +1,12 @@
+from agentes.cliente import configurar_cliente, obter_cliente
+
+
+def test_reconfigurar_nao_fecha_o_cliente_em_uso(servidor):
+    antigo = obter_cliente()
+    configurar_cliente(timeout_segundos=30.0)
+
+    # Uma thread que ainda segura o cliente antigo continua funcionando
+    assert antigo.responses.create(model="gpt-4o-mini", input="oi").output_text
+    novo = obter_cliente()
+    assert novo is not antigo
+    assert novo.timeout.read == 30.0
@@ -0,0 +1,62 @@
+import pytest
+
+from agentes.cotacoes import ProvedorCotacoes, SimboloInvalido
+
+
+def test_cache_descarta_o_menos_usado_acima_do_limite():
+    provedor = ProvedorCotacoes(max_itens_cache=2)
+    buscas = []
+
+    def buscar(chave):
+        return provedor.obter(chave, lambda: buscas.append(chave) or chave)
+
+    buscar("A")
+    buscar("B")
+    buscar("A")  # "A" passa a ser o mais recente
+    buscar("C")  # sai "B"
+
+    assert list(provedor._cache) == ["A", "C"]
+    buscar("A")
+    buscar("B")
+    assert buscas == ["A", "B", "C", "B"]
+    assert provedor.acertos == 2
+
+
+def test_item_expirado_sai_do_cache():
+    provedor = ProvedorCotacoes(ttl_segundos=0)
+    provedor.obter("A", lambda: 1)
+    assert provedor.obter("A", lambda: 2) == 2
+    assert provedor.acertos == 0
+    assert len(provedor._cache) == 1
+
+
+def test_historicos_busca_cada_simbolo_uma_vez_no_servidor_local(servidor):
+    provedor = ProvedorCotacoes(base_url=servidor.url_raiz)
+
+    historicos = provedor.historicos(["aapl", "MSFT", "AAPL"], periodo="1mo")
+
+    assert list(historicos) == ["AAPL", "MSFT"]
+    assert historicos["MSFT"].nome == "MSFT"
+    assert historicos["MSFT"].preco == 100.0
+    assert historicos["MSFT"].fechamentos == [98.0, 99.0, 100.0]
+    assert historicos["MSFT"].variacao_percentual == 2.04
+    # Uma requisição por símbolo distinto; a segunda rodada sai do cache
+    assert provedor.requisicoes == 2
+    assert provedor.historico("msft", periodo="1mo") == historicos["MSFT"]
+    assert provedor.requisicoes == 2
+    assert provedor.acertos == 1
+
+
+def test_simbolo_inexistente_levanta_erro_e_nao_fica_em_cache(servidor):
+    servidor.config = servidor.config.model_copy(
+        update={"simbolos_inexistentes": ["XYZW"]}
+    )
+    provedor = ProvedorCotacoes(base_url=servidor.url_raiz)
+
+    with pytest.raises(SimboloInvalido, match="XYZW"):
+        provedor.historicos(["AAPL", "xyzw"])
+    with pytest.raises(SimboloInvalido):
+        provedor.historico("XYZW")
+
+    assert provedor.requisicoes == 3
+    assert ("chart", "XYZW", "1mo") not in provedor._cache
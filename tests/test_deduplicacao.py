@@ -0,0 +1,101 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pydantic import BaseModel
+
+from agentes.cache import parse_deduplicado
+from agentes.deduplicacao import Deduplicador
+
+
+class Resposta(BaseModel):
+    texto: str
+
+
+def _chamada_lenta(estado: dict, segundos: float = 1.0):
+    async def chamada():
+        try:
+            await asyncio.sleep(segundos)
+        except asyncio.CancelledError:
+            estado["fim"] = "cancelada"
+            raise
+        estado["fim"] = "completou"
+        return "ok"
+
+    return chamada
+
+
+def test_cancelar_o_unico_que_espera_cancela_a_chamada():
+    estado = {}
+
+    async def cenario():
+        deduplicador = Deduplicador()
+        espera = asyncio.ensure_future(
+            deduplicador.executar_async("k", _chamada_lenta(estado))
+        )
+        await asyncio.sleep(0.1)
+        espera.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await espera
+        await asyncio.sleep(0)
+        assert deduplicador.estatisticas()["em_andamento"] == 0
+
+    asyncio.run(cenario())
+    assert estado["fim"] == "cancelada"
+
+
+def test_cancelar_um_dos_que_esperam_nao_cancela_os_outros():
+    estado = {}
+
+    async def cenario():
+        deduplicador = Deduplicador()
+        chamada = _chamada_lenta(estado, 0.2)
+        primeiro = asyncio.ensure_future(deduplicador.executar_async("k", chamada))
+        segundo = asyncio.ensure_future(deduplicador.executar_async("k", chamada))
+        await asyncio.sleep(0.05)
+        primeiro.cancel()
+        assert await segundo == "ok"
+        assert deduplicador.execucoes == 1
+
+    asyncio.run(cenario())
+    assert estado["fim"] == "completou"
+
+
+def test_depois_do_cancelamento_a_chave_comeca_outra_chamada():
+    estado = {}
+
+    async def cenario():
+        deduplicador = Deduplicador()
+        espera = asyncio.ensure_future(
+            deduplicador.executar_async("k", _chamada_lenta(estado))
+        )
+        await asyncio.sleep(0.05)
+        espera.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await espera
+        resultado = await deduplicador.executar_async(
+            "k", _chamada_lenta(estado, 0.01)
+        )
+        assert resultado == "ok"
+        assert deduplicador.execucoes == 2
+
+    asyncio.run(cenario())
+
+
+def test_chamadas_simultaneas_fazem_uma_requisicao(servidor):
+    servidor.config = servidor.config.model_copy(update={"latencia_segundos": 0.2})
+    deduplicador = Deduplicador()
+
+    def chamar(_):
+        return parse_deduplicado(
+            Resposta,
+            deduplicador=deduplicador,
+            model="gpt-4o-mini",
+            input="Quais formas de pagamento são aceitas?",
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        respostas = list(executor.map(chamar, range(8)))
+
+    assert servidor.requisicoes == 1
+    assert all(resposta is respostas[0] for resposta in respostas)
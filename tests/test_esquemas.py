@@ -0,0 +1,87 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from agentes.esquemas import esquema_estrito, formato_estrito, parse_com_esquema
+from agentes.ferramentas import RegistroFerramentas
+
+
+class Participante(BaseModel):
+    nome: str
+    email: Optional[str] = None
+
+
+class Evento(BaseModel):
+    """Evento de teste"""
+
+    titulo: str
+    tipo: Literal["reuniao", "almoco"]
+    organizador: Participante = Field(description="Quem marcou")
+    participantes: list[Participante]
+    sala: Optional[str] = None
+
+
+def test_formato_estrito():
+    formato = formato_estrito(Evento)
+    assert (formato["type"], formato["strict"], formato["name"]) == (
+        "json_schema",
+        True,
+        "Evento",
+    )
+    esquema = formato["schema"]
+    assert esquema["additionalProperties"] is False
+    assert esquema["required"] == [
+        "titulo",
+        "tipo",
+        "organizador",
+        "participantes",
+        "sala",
+    ]
+    assert "default" not in esquema["properties"]["sala"]
+    # `$ref` com descrição é expandido e também fica strict
+    organizador = esquema["properties"]["organizador"]
+    assert "$ref" not in organizador
+    assert organizador["description"] == "Quem marcou"
+    assert organizador["additionalProperties"] is False
+    assert organizador["required"] == ["nome", "email"]
+    participante = esquema["$defs"]["Participante"]
+    assert participante["additionalProperties"] is False
+    assert participante["required"] == ["nome", "email"]
+
+
+class Tarefa(BaseModel):
+    titulo: str
+    depende_de: "Tarefa" = Field(description="Tarefa anterior")
+    subtarefas: list["Tarefa"]
+
+
+def test_modelo_recursivo_nao_expande_sem_fim():
+    esquema = esquema_estrito(Tarefa)
+
+    depende_de = esquema["properties"]["depende_de"]
+    assert depende_de["description"] == "Tarefa anterior"
+    # Dentro da expansão, a mesma referência volta a ser um `$ref` puro
+    assert depende_de["properties"]["depende_de"] == {"$ref": "#/$defs/Tarefa"}
+    assert esquema["$defs"]["Tarefa"]["additionalProperties"] is False
+
+
+def test_ferramentas_usam_o_mesmo_esquema_strict():
+    registro = RegistroFerramentas()
+
+    @registro.ferramenta
+    def agendar(evento: Evento) -> str:
+        """Agenda um evento"""
+        return evento.titulo
+
+    parametros = registro.definicoes()[0]["parameters"]
+    assert parametros["required"] == ["evento"]
+    assert parametros["additionalProperties"] is False
+    evento = parametros["$defs"]["Evento"]
+    assert evento["required"] == formato_estrito(Evento)["schema"]["required"]
+    assert evento["properties"]["organizador"]["additionalProperties"] is False
+
+
+def test_parse_com_esquema_no_servidor_simulado(servidor):
+    evento = parse_com_esquema(Evento, model="gpt-4o-mini", input="Almoço amanhã")
+    assert isinstance(evento, Evento)
+    assert servidor.requisicoes == 1
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from agentes import ferramentas
+from agentes.ferramentas import RegistroFerramentas
+
+registro = RegistroFerramentas()
+liberar = threading.Event()
+
+
+@registro.ferramenta
+def dobrar(valor: int) -> int:
+    """Dobra um número"""
+    return valor * 2
+
+
+@registro.ferramenta
+def quebrar(valor: int) -> int:
+    """Sempre falha"""
+    raise RuntimeError("serviço indisponível")
+
+
+@registro.ferramenta
+def travar(valor: int) -> int:
+    """Fica presa até o teste liberar"""
+    liberar.wait(10)
+    return valor
+
+
+@registro.ferramenta
+async def dobrar_async(valor: int) -> int:
+    """Dobra um número sem bloquear o loop"""
+    return valor * 2
+
+
+def _chamada(nome: str, **argumentos) -> SimpleNamespace:
+    return SimpleNamespace(
+        name=nome, arguments=json.dumps(argumentos), call_id=f"call_{nome}"
+    )
+
+
+CHAMADAS_COM_FALHAS = [
+    _chamada("dobrar", valor=2),
+    _chamada("quebrar", valor=1),
+    _chamada("dobrar", valor="não é número"),
+    _chamada("inexistente"),
+    _chamada("dobrar_async", valor=5),
+]
+
+
+def _verificar_falhas(saidas: list[dict]) -> None:
+    # Cada falha vira um erro para o modelo; as chamadas vizinhas não se perdem
+    assert [saida["call_id"] for saida in saidas] == [
+        chamada.call_id for chamada in CHAMADAS_COM_FALHAS
+    ]
+    assert saidas[0]["output"] == "4"
+    assert "RuntimeError: serviço indisponível" in saidas[1]["output"]
+    assert "ValidationError" in saidas[2]["output"]
+    assert "Função desconhecida" in saidas[3]["output"]
+    assert saidas[4]["output"] == "10"
+
+
+def test_falha_de_uma_ferramenta_nao_derruba_as_outras():
+    _verificar_falhas(registro.executar(CHAMADAS_COM_FALHAS))
+
+
+def test_falha_de_uma_ferramenta_nao_derruba_as_outras_async():
+    _verificar_falhas(asyncio.run(registro.executar_async(CHAMADAS_COM_FALHAS)))
+
+
+@pytest.fixture
+def ferramenta_travada():
+    liberar.clear()
+    yield
+    liberar.set()
+
+
+@pytest.mark.parametrize("assincrono", [False, True])
+def test_ferramenta_travada_aposenta_o_pool(ferramenta_travada, assincrono):
+    antigo = ferramentas._obter_executor()
+    chamadas = [_chamada("travar", valor=1), _chamada("dobrar", valor=3)]
+
+    if assincrono:
+        saidas = asyncio.run(registro.executar_async(chamadas, timeout_segundos=0.2))
+    else:
+        saidas = registro.executar(chamadas, timeout_segundos=0.2)
+
+    assert "excedeu o tempo limite" in saidas[0]["output"]
+    assert saidas[1]["output"] == "6"
+    # A thread travada segue no pool antigo; as próximas chamadas usam outro
+    assert ferramentas._obter_executor() is not antigo
+    assert registro.executar([_chamada("dobrar", valor=4)])[0]["output"] == "8"
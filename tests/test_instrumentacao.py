@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+import pytest
+from openai import InternalServerError, Stream
+
+from agentes.cliente import configurar_cliente, obter_cliente, obter_cliente_async
+from agentes.instrumentacao import (
+    AgregadorMemoria,
+    SaidaJSONL,
+    SaidaOpenTelemetry,
+    adicionar_saida,
+    coletar_chamadas,
+    estimar_custo,
+    etapa_atual,
+    na_etapa,
+    remover_saida,
+)
+from agentes.streaming import transmitir, transmitir_async
+
+
+class _Span:
+    def __init__(self, spans, nome, atributos):
+        self.nome = nome
+        self.atributos = atributos
+        self.fim = None
+        spans.append(self)
+
+    def end(self, end_time):
+        self.fim = end_time
+
+
+class _Tracer:
+    def __init__(self):
+        self.spans: list[_Span] = []
+
+    def start_span(self, nome, start_time, attributes):
+        return _Span(self.spans, nome, attributes)
+
+
+def _criar(entrada: str):
+    return obter_cliente().responses.create(model="gpt-4o-mini", input=entrada)
+
+
+def test_estimar_custo_usa_o_prefixo_mais_longo_do_modelo():
+    custo = estimar_custo("gpt-4o-mini-2024-07-18", 1_000_000, 400_000, 100_000)
+    assert custo == pytest.approx(0.6 * 0.15 + 0.4 * 0.075 + 0.1 * 0.60)
+    assert estimar_custo("modelo-desconhecido", 10, 0, 10) is None
+
+
+def test_etapa_vale_para_threads_e_tarefas_criadas_no_bloco(servidor):
+    async def cenario():
+        with na_etapa("extracao"), coletar_chamadas() as chamadas:
+            await asyncio.to_thread(_criar, "na thread")
+            cliente = obter_cliente_async()
+            await asyncio.gather(
+                *(
+                    cliente.responses.create(model="gpt-4o-mini", input=f"tarefa {i}")
+                    for i in range(2)
+                )
+            )
+        await asyncio.to_thread(_criar, "fora do bloco")
+        return chamadas
+
+    chamadas = asyncio.run(cenario())
+
+    assert etapa_atual() is None
+    assert len(chamadas) == 3
+    assert {chamada.etapa for chamada in chamadas} == {"extracao"}
+    for chamada in chamadas:
+        assert chamada.tokens_entrada > 0 and chamada.tokens_saida > 0
+        assert chamada.custo_estimado > 0
+        assert 0 < chamada.tempo_primeiro_byte <= chamada.duracao_segundos
+    assert chamadas[0].local.startswith("test_instrumentacao.py:")
+
+
+def test_saidas_recebem_cada_chamada_com_erros_e_etapas(servidor, tmp_path):
+    configurar_cliente(max_tentativas=0)
+    agregador = AgregadorMemoria()
+    jsonl = SaidaJSONL(str(tmp_path / "chamadas.jsonl"))
+    tracer = _Tracer()
+    saidas = [agregador, jsonl, SaidaOpenTelemetry(tracer)]
+    for saida in saidas:
+        adicionar_saida(saida)
+    try:
+        with na_etapa("resumo"):
+            _criar("ok")
+        servidor.config = servidor.config.model_copy(
+            update={"taxa_erro_servidor": 1.0}
+        )
+        with na_etapa("falha"), pytest.raises(InternalServerError):
+            _criar("erro")
+    finally:
+        for saida in saidas:
+            remover_saida(saida)
+    servidor.config = servidor.config.model_copy(update={"taxa_erro_servidor": 0.0})
+    _criar("sem saídas")
+
+    resumo = agregador.resumo()
+    assert list(resumo) == ["resumo/gpt-4o-mini", "falha/gpt-4o-mini"]
+    assert resumo["resumo/gpt-4o-mini"]["chamadas"] == 1
+    assert resumo["resumo/gpt-4o-mini"]["erros"] == 0
+    assert resumo["falha/gpt-4o-mini"]["erros"] == 1
+
+    with open(tmp_path / "chamadas.jsonl", encoding="utf-8") as f:
+        linhas = [json.loads(linha) for linha in f]
+    assert [linha["erro"] for linha in linhas] == [None, "InternalServerError"]
+
+    assert [span.nome for span in tracer.spans] == ["responses.create gpt-4o-mini"] * 2
+    assert tracer.spans[0].atributos["agentes.etapa"] == "resumo"
+    assert tracer.spans[1].atributos["error.type"] == "InternalServerError"
+    assert all(span.fim is not None for span in tracer.spans)
+
+
+def test_sem_saidas_nem_coleta_a_chamada_nao_e_medida(servidor):
+    fluxo = obter_cliente().responses.create(
+        model="gpt-4o-mini", input="direto", stream=True
+    )
+    assert isinstance(fluxo, Stream)
+    fluxo.close()
+
+
+def test_transmissao_e_medida_quando_termina_ou_para_no_meio(servidor):
+    with coletar_chamadas() as chamadas:
+        transmissao = transmitir("inteira")
+        list(transmissao)
+        for _ in transmitir("interrompida"):
+            break
+
+    inteira, interrompida = chamadas
+    assert inteira.streaming and inteira.erro is None
+    # O uso vem no evento final da transmissão
+    assert inteira.tokens_saida > 0
+    assert inteira.tempo_primeiro_byte <= inteira.duracao_segundos
+    assert interrompida.streaming and interrompida.erro is None
+    assert interrompida.tokens_saida == 0
+
+
+def test_transmissao_async_e_medida(servidor):
+    async def consumir():
+        with na_etapa("rascunho"), coletar_chamadas() as chamadas:
+            async for _ in transmitir_async("oi"):
+                pass
+        return chamadas
+
+    (chamada,) = asyncio.run(consumir())
+
+    assert (chamada.etapa, chamada.streaming, chamada.erro) == ("rascunho", True, None)
+    assert chamada.tokens_saida > 0
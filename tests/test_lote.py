@@ -0,0 +1,108 @@
+import json
+import threading
+
+import httpx
+
+from agentes.lote import ids_concluidos, processar_lote
+from blocos import carregar
+
+
+def _entrada(tmp_path, quantidade: int):
+    caminho = tmp_path / "entrada.jsonl"
+    with open(caminho, "w", encoding="utf-8") as f:
+        for i in range(quantidade):
+            texto = f"Tarefa {tmp_path.name} {i}, prioridade alta"
+            f.write(json.dumps({"id": str(i), "texto": texto}) + "\n")
+    return caminho
+
+
+def _linhas(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f]
+
+
+def test_lote_contra_o_servidor_simulado(servidor, tmp_path):
+    script = carregar("4-validacao.py")
+    entrada, saida = _entrada(tmp_path, 20), tmp_path / "saida.jsonl"
+
+    resumo = script.inteligencia_estruturada_em_lote(str(entrada), str(saida))
+
+    assert (resumo.processados, resumo.erros) == (20, 0)
+    assert servidor.requisicoes == 20
+    linhas = _linhas(saida)
+    assert sorted(int(linha["id"]) for linha in linhas) == list(range(20))
+    assert all(linha["resultado"]["tarefa"] for linha in linhas)
+
+
+def test_retoma_depois_de_uma_linha_cortada(servidor, tmp_path):
+    script = carregar("4-validacao.py")
+    entrada, saida = _entrada(tmp_path, 5), tmp_path / "saida.jsonl"
+    with open(saida, "w", encoding="utf-8") as f:
+        for i in range(3):
+            f.write(json.dumps({"id": str(i), "resultado": {}}) + "\n")
+        # Execução interrompida no meio da gravação
+        f.write('{"id": "3", "resul')
+
+    assert ids_concluidos(str(saida)) == {"0", "1", "2"}
+    resumo = script.inteligencia_estruturada_em_lote(str(entrada), str(saida))
+
+    assert (resumo.ignorados, resumo.processados) == (3, 2)
+    assert servidor.requisicoes == 2
+    # A linha cortada sai na retomada
+    linhas = _linhas(saida)
+    assert [linha["id"] for linha in linhas[:3]] == ["0", "1", "2"]
+    assert {linha["id"] for linha in linhas[3:]} == {"3", "4"}
+    assert ids_concluidos(str(saida)) == {"0", "1", "2", "3", "4"}
+
+
+def test_retentativas_deixam_uma_linha_por_id(tmp_path):
+    saida = str(tmp_path / "saida.jsonl")
+    registros = [{"id": str(i), "valor": i} for i in range(4)]
+    # Execuções em que cada id ainda falha: "1" nas duas primeiras, "3" em todas
+    falhas = {"1": 2, "3": 3}
+
+    def processar(registro):
+        if falhas.get(registro["id"]):
+            falhas[registro["id"]] -= 1
+            raise ValueError("instável")
+        return registro["valor"] * 2
+
+    for _ in range(3):
+        resumo = processar_lote(registros, processar, saida, max_trabalhadores=2)
+
+    assert (resumo.ignorados, resumo.processados, resumo.erros) == (2, 1, 1)
+    linhas = _linhas(saida)
+    assert sorted(linha["id"] for linha in linhas) == ["0", "1", "2", "3"]
+    por_id = {linha["id"]: linha for linha in linhas}
+    assert por_id["1"]["resultado"] == 2
+    assert por_id["3"]["erro"] == "instável"
+
+
+
+def test_entrada_e_lida_fora_do_event_loop(tmp_path):
+    leitores = []
+
+    def registros():
+        for i in range(3):
+            leitores.append(threading.current_thread())
+            yield {"id": str(i)}
+
+    resumo = processar_lote(
+        registros(), lambda registro: registro["id"], str(tmp_path / "saida.jsonl")
+    )
+
+    assert resumo.processados == 3
+    assert threading.main_thread() not in leitores
+
+def test_job_batch_aceito_pelo_servidor_simulado(servidor, tmp_path):
+    script = carregar("4-validacao.py")
+    entrada, job = _entrada(tmp_path, 3), tmp_path / "job.jsonl"
+
+    assert script.inteligencia_estruturada_job_batch(str(entrada), str(job)) == 3
+
+    for linha in _linhas(job):
+        assert linha["url"] == "/v1/responses"
+        assert linha["body"]["text"]["format"]["type"] == "json_schema"
+        resposta = httpx.post(servidor.url_raiz + linha["url"], json=linha["body"])
+        texto = resposta.json()["output"][0]["content"][0]["text"]
+        script.ResultadoTarefa.model_validate_json(texto)
@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agentes.memoria import MemoriaConversa, MemoriaSQLite
+from agentes.texto import contar_tokens
+
+
+class _Respostas:
+    """`client.responses` que responde em eco ou falha quando pedido"""
+
+    def __init__(self):
+        self.pedidos: list[dict] = []
+        self.falhar = False
+
+    def create(self, **parametros):
+        self.pedidos.append(parametros)
+        if self.falhar:
+            raise RuntimeError("provedor fora do ar")
+        numero = len(self.pedidos)
+        return SimpleNamespace(id=f"resp_{numero}", output_text=f"resposta {numero}")
+
+
+class _RespostasAsync(_Respostas):
+    async def create(self, **parametros):
+        return super().create(**parametros)
+
+
+def _cliente(respostas: _Respostas) -> SimpleNamespace:
+    return SimpleNamespace(responses=respostas)
+
+
+def test_turno_mais_recente_entra_truncado_quando_nao_cabe():
+    memoria = MemoriaConversa(prompt_sistema="Seja breve.", orcamento_tokens=50)
+    memoria.registrar("s", "user", "oi")
+    memoria.registrar("s", "assistant", "olá")
+    memoria.registrar("s", "user", "palavra " * 500)
+
+    mensagens = memoria.mensagens("s")
+
+    assert [m["role"] for m in mensagens] == ["system", "user"]
+    assert mensagens[-1]["content"].startswith("palavra")
+    total = sum(contar_tokens(m["content"]) for m in mensagens)
+    assert total <= 50 + 1
+
+
+def test_falha_na_chamada_nao_deixa_turno_do_usuario():
+    memoria = MemoriaConversa()
+    respostas = _Respostas()
+    memoria.responder("s", "primeira", client=_cliente(respostas))
+
+    respostas.falhar = True
+    with pytest.raises(RuntimeError):
+        memoria.responder("s", "segunda", client=_cliente(respostas))
+    respostas.falhar = False
+    memoria.responder("s", "terceira", client=_cliente(respostas))
+
+    papeis = [(t.papel, t.conteudo) for t in memoria.backend.turnos("s")]
+    assert papeis == [
+        ("user", "primeira"),
+        ("assistant", "resposta 1"),
+        ("user", "terceira"),
+        ("assistant", "resposta 3"),
+    ]
+
+
+def test_falha_na_chamada_async_nao_deixa_turno_do_usuario(tmp_path):
+    memoria = MemoriaConversa(backend=MemoriaSQLite(str(tmp_path / "memoria.db")))
+    respostas = _RespostasAsync()
+    respostas.falhar = True
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(memoria.responder_async("s", "oi", client=_cliente(respostas)))
+
+    assert memoria.backend.turnos("s") == []
+    # A mensagem pendente foi enviada mesmo sem estar registrada
+    assert respostas.pedidos[0]["input"] == [{"role": "user", "content": "oi"}]
+
+
+def test_turnos_antigos_viram_resumo_antes_de_sair_do_armazenamento():
+    resumidos = []
+
+    def resumidor(resumo_anterior, turnos):
+        resumidos.extend(turno.conteudo for turno in turnos)
+        return "resumo"
+
+    memoria = MemoriaConversa(
+        orcamento_tokens=40, resumidor=resumidor, turnos_para_resumir=4
+    )
+    conteudos = [f"mensagem numero {i} " * 3 for i in range(30)]
+    for conteudo in conteudos:
+        memoria.registrar("s", "user", conteudo)
+        memoria.mensagens("s")
+
+    restantes = [turno.conteudo for turno in memoria.backend.turnos("s")]
+    assert resumidos + restantes == conteudos
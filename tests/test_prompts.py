@@ -0,0 +1,87 @@
+import logging
+
+from agentes.cliente import obter_cliente
+from agentes.instrumentacao import ChamadaLLM, coletar_chamadas
+from agentes.prompts import MonitorPrefixos, montar_prompt
+
+INSTRUCOES = "Responda com base nas regras da empresa. " + "Regra fixa. " * 600
+
+
+def test_montar_prompt_deixa_o_usuario_por_ultimo():
+    parametros = montar_prompt(
+        instrucoes="  Seja breve.\n",
+        usuario="Qual o prazo?",
+        contexto=["base de conhecimento", "", "hoje é segunda"],
+    )
+
+    assert parametros == {
+        "instructions": "Seja breve.",
+        "input": [
+            {"role": "developer", "content": "base de conhecimento"},
+            {"role": "developer", "content": "hoje é segunda"},
+            {"role": "user", "content": "Qual o prazo?"},
+        ],
+    }
+    assert montar_prompt("x", "y", contexto="z")["input"][0] == {
+        "role": "developer",
+        "content": "z",
+    }
+
+
+def test_prefixo_estavel_recebe_tokens_em_cache(servidor):
+    cliente = obter_cliente()
+    with coletar_chamadas() as chamadas:
+        for pergunta in ("Qual o prazo?", "E o horário?"):
+            cliente.responses.create(
+                model="gpt-4o-mini",
+                **montar_prompt(INSTRUCOES, pergunta, contexto="base"),
+            )
+        for pergunta in ("Qual o prazo?", "E o horário?"):
+            # Texto do usuário dentro das instruções: cada prefixo é único
+            cliente.responses.create(
+                model="gpt-4o-mini",
+                instructions=f"{INSTRUCOES} Pergunta: {pergunta}",
+                input=[{"role": "user", "content": "responda"}],
+            )
+
+    estavel, interpolado = chamadas[:2], chamadas[2:]
+    assert estavel[0].prefixo == estavel[1].prefixo
+    assert estavel[0].tokens_cache == 0
+    assert estavel[1].tokens_cache > 0
+    assert interpolado[0].prefixo != interpolado[1].prefixo
+    assert [chamada.tokens_cache for chamada in interpolado] == [0, 0]
+
+
+def _chamada(local: str, prefixo: str, entrada: int = 100, cache: int = 0):
+    return ChamadaLLM(
+        operacao="responses.create",
+        modelo="gpt-4o-mini",
+        local=local,
+        prefixo=prefixo,
+        inicio=0.0,
+        tokens_entrada=entrada,
+        tokens_cache=cache,
+    )
+
+
+def test_monitor_avisa_uma_vez_por_local_que_desperdica_o_cache(caplog):
+    monitor = MonitorPrefixos(min_chamadas=3)
+    with caplog.at_level(logging.WARNING, logger="agentes.prompts"):
+        for i in range(6):
+            monitor.registrar(_chamada("variavel.py:10", f"p{i}"))
+            monitor.registrar(_chamada("longo.py:20", "fixo", entrada=2000))
+            monitor.registrar(_chamada("ok.py:30", "fixo", entrada=2000, cache=1024))
+
+    avisos = [registro.getMessage() for registro in caplog.records]
+    assert len(avisos) == 2
+    assert avisos[0].startswith("variavel.py:10: o prefixo do prompt mudou em 3 de 3")
+    assert avisos[1].startswith("longo.py:20: 3 chamadas com prompts longos")
+
+    relatorio = monitor.relatorio()
+    assert relatorio["variavel.py:10"]["prefixos_distintos"] == 6
+    assert relatorio["longo.py:20"] == {
+        "chamadas": 6,
+        "prefixos_distintos": 1,
+        "taxa_cache": 0.0,
+    }
+    assert relatorio["ok.py:30"]["taxa_cache"] == 0.512
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import pytest
+
+from agentes.cache import parse_cacheado, parse_cacheado_async
+from agentes.cliente import configurar_cliente
+from agentes.deduplicacao import obter_deduplicador
+from agentes.extracao_local import extrair_contato
+from agentes.resiliencia import CaminhoResiliente, Disjuntor, DisjuntorAberto
+from blocos import carregar
+
+
+def test_disjuntor_abre_testa_e_fecha():
+    disjuntor = Disjuntor("teste", limite_falhas=2, tempo_recuperacao_segundos=0.05)
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == "fechado"
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == "aberto"
+    assert not disjuntor.permitir()
+
+    time.sleep(0.06)
+    assert disjuntor.estado == "meio-aberto"
+    assert disjuntor.permitir()
+    # Só uma chamada de teste por vez
+    assert not disjuntor.permitir()
+    disjuntor.registrar_sucesso()
+    assert disjuntor.estado == "fechado"
+    assert disjuntor.permitir()
+
+
+def test_falha_na_chamada_de_teste_reabre_o_disjuntor():
+    disjuntor = Disjuntor("teste", limite_falhas=1, tempo_recuperacao_segundos=0.05)
+    disjuntor.registrar_falha()
+    time.sleep(0.06)
+    assert disjuntor.permitir()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == "aberto"
+    assert disjuntor.aberturas == 2
+
+
+def test_chamada_de_teste_sem_resultado_libera_o_disjuntor():
+    disjuntor = Disjuntor("teste", limite_falhas=1, tempo_recuperacao_segundos=0.05)
+    disjuntor.registrar_falha()
+    time.sleep(0.06)
+    assert disjuntor.permitir()
+    disjuntor.liberar()
+    assert disjuntor.permitir()
+
+
+def _caminho(script, disjuntor, prazo_segundos=5.0):
+    return CaminhoResiliente(
+        chamar_llm=lambda prompt: parse_cacheado(
+            **script._parametros_extracao(prompt)
+        ),
+        chamar_llm_async=lambda prompt: parse_cacheado_async(
+            **script._parametros_extracao(prompt)
+        ),
+        extrair_local=script._extrair_local,
+        disjuntor=disjuntor,
+        prazo_segundos=prazo_segundos,
+    )
+
+
+def test_provedor_fora_do_ar_abre_o_disjuntor_e_usa_o_fallback(servidor):
+    # Sem retentativas do SDK: cada requisição contada é uma chamada
+    configurar_cliente(max_tentativas=0)
+    servidor.config = servidor.config.model_copy(update={"taxa_erro_servidor": 1.0})
+    script = carregar("6-recuperacao.py")
+    caminho = _caminho(script, Disjuntor("fora", limite_falhas=2))
+
+    for i in range(4):
+        texto = f"Meu nome é Ana Lima, fones (11) 9{i:04d}-1111 e 3333-4444"
+        assert caminho.executar(texto).origem == "fallback"
+    assert servidor.requisicoes == 2
+    assert caminho.metricas()["motivos_fallback"] == {
+        "InternalServerError": 2,
+        "disjuntor aberto": 2,
+    }
+
+    with pytest.raises(DisjuntorAberto):
+        caminho.executar("oi, aqui é o beto, me liga")
+
+
+def test_prazo_assincrono_cancela_a_chamada(servidor):
+    servidor.config = servidor.config.model_copy(update={"latencia_segundos": 1.0})
+    script = carregar("6-recuperacao.py")
+    caminho = _caminho(script, Disjuntor("lento"), prazo_segundos=0.1)
+
+    async def cenario():
+        inicio = time.perf_counter()
+        resultado = await caminho.executar_async(
+            "Meu nome é Ana Lima, fones (11) 98888-1111 e 3333-4444"
+        )
+        await asyncio.sleep(0)
+        return resultado, time.perf_counter() - inicio
+
+    resultado, decorrido = asyncio.run(cenario())
+    assert (resultado.origem, resultado.motivo) == ("fallback", "prazo esgotado")
+    assert decorrido < 0.5
+    assert obter_deduplicador().estatisticas()["em_andamento"] == 0
+
+
+def test_lugar_fora_da_lista_de_cidades_nao_fica_no_caminho_local():
+    _, confianca = extrair_contato(
+        "Meu nome é Alberto Souza, moro em Osasco, telefone (11) 99999-9999"
+    )
+    assert confianca < 0.9
+    campos, confianca = extrair_contato(
+        "Meu nome é Carlos Eduardo dos Santos e meu telefone é (11) 99999-9999"
+    )
+    assert (campos["cidade"], confianca) == (None, 0.95)
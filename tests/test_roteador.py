@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agentes.roteador import ModeloNgramas
+from blocos import carregar
+
+
+@pytest.mark.parametrize(
+    "texto, rotulo",
+    [
+        ("Agende uma reunião com a equipe amanhã", "solicitacao"),
+        ("Qual o horário de funcionamento?", "pergunta"),
+        ("Estou muito decepcionado com o atendimento", "reclamacao"),
+    ],
+)
+def test_entradas_obvias_sao_resolvidas_por_regra(servidor, texto, rotulo):
+    decisao = carregar("5-controle.py").obter_pre_roteador().classificar(texto)
+    assert (decisao.origem, decisao.rotulo) == ("regra", rotulo)
+    assert servidor.requisicoes == 0
+
+
+@pytest.mark.parametrize(
+    "texto",
+    [
+        "Pode me explicar o que é IA?",
+        "Poderia me dizer qual o horário de funcionamento?",
+        "Como faço uma reclamação?",
+    ],
+)
+def test_intencao_ambigua_vai_para_o_llm(servidor, texto):
+    decisao = carregar("5-controle.py").obter_pre_roteador().classificar(texto)
+    assert decisao.origem == "llm"
+
+
+def test_verbo_de_calendario_sem_evento_vai_para_o_llm(servidor):
+    pre_roteador = carregar("workflows-parte-2/2-routing.py").obter_pre_roteador()
+    decisao = pre_roteador.classificar("Preciso adiar o pagamento da fatura")
+    assert decisao.origem == "llm"
+
+    decisao = pre_roteador.classificar("Preciso adiar a reunião de sexta")
+    assert (decisao.origem, decisao.rotulo) == ("regra", "modificar_evento")
+
+
+def test_modelo_preve_enquanto_outras_threads_aprendem_rotulos_novos():
+    modelo = ModeloNgramas()
+    modelo.aprender("agende uma reunião", "solicitacao")
+
+    def aprender(i):
+        modelo.aprender(f"texto numero {i}", f"rotulo_{i}")
+
+    def prever(_):
+        return modelo.prever("agende uma reunião amanhã")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        aprendizados = executor.map(aprender, range(200))
+        previsoes = list(executor.map(prever, range(200)))
+        list(aprendizados)
+
+    assert all(previsao is not None for previsao in previsoes)
+    assert modelo.exemplos == 201
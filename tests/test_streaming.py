@@ -0,0 +1,62 @@
+import asyncio
+import builtins
+
+from agentes.streaming import transmitir, transmitir_async
+from blocos import carregar
+
+TEXTO = "simulado " * 5
+
+
+def _lento(servidor):
+    servidor.config = servidor.config.model_copy(
+        update={"latencia_segundos": 0.2, "segundos_por_token": 0.05, "tokens_saida": 5}
+    )
+
+
+def test_transmissao_mede_o_primeiro_token_e_monta_o_texto(servidor):
+    _lento(servidor)
+    transmissao = transmitir("oi")
+
+    trechos = list(transmissao)
+
+    assert trechos == ["simulado "] * 5
+    assert transmissao.texto == TEXTO
+    # O primeiro trecho chega depois da latência, antes do fim da geração
+    assert 0.2 <= transmissao.tempo_primeiro_token < transmissao.tempo_total
+    assert transmissao.tempo_total - transmissao.tempo_primeiro_token >= 0.1
+
+
+def test_parar_no_meio_fecha_a_transmissao_com_o_texto_parcial(servidor):
+    transmissao = transmitir("oi")
+
+    for trecho in transmissao:
+        break
+
+    assert transmissao.texto == trecho
+    assert transmissao.tempo_total is not None
+
+
+def test_transmissao_async(servidor):
+    _lento(servidor)
+
+    async def consumir():
+        transmissao = transmitir_async("oi")
+        trechos = [trecho async for trecho in transmissao]
+        return transmissao, trechos
+
+    transmissao, trechos = asyncio.run(consumir())
+
+    assert "".join(trechos) == transmissao.texto == TEXTO
+    assert 0.2 <= transmissao.tempo_primeiro_token < transmissao.tempo_total
+
+
+def test_feedback_refaz_o_rascunho_em_streaming(servidor, monkeypatch, capsys):
+    respostas = iter(["r", "s"])
+    monkeypatch.setattr(builtins, "input", lambda prompt: next(respostas))
+
+    carregar("7-feedback.py").inteligencia_com_feedback_humano("Escreva um poema")
+
+    saida = capsys.readouterr().out
+    assert saida.count("primeiro token em") == 2
+    assert saida.rstrip().endswith("Resposta final aprovada")
+    assert servidor.requisicoes == 2
@@ -1,12 +1,12 @@
-import os
-from openai import OpenAI
+from agentes.cliente import obter_cliente
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+if __name__ == "__main__":
+    client = obter_cliente()
 
-response = client.responses.create(
-    model="gpt-4o-mini",
-    input="""Extraia informações do evento do texto e retorne em JSON.
+    response = client.responses.create(
+        model="gpt-4o-mini",
+        input="""Extraia informações do evento do texto e retorne em JSON.
     Texto: Daniel e Alberto vão transmitir uma live na segunda-feira.
 EXEMPLO DA FORMATAÇÃO
 {
@@ -19,6 +19,6 @@ EXEMPLO DA FORMATAÇÃO
 }
 
     """,
-)
+    )
 
-print(response.output_text)
+    print(response.output_text)
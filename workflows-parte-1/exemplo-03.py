@@ -1,13 +1,11 @@
-import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
-import yfinance as yf
-from openai import OpenAI
+from agentes.cliente import obter_cliente
+from agentes.cotacoes import obter_provedor
+from agentes.esquemas import parse_com_esquema
 from pydantic import BaseModel, Field
 
-# Inicializa o cliente OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 
 # Modelo de dados para saída estruturada
 class StockAnalysis(BaseModel):
@@ -19,34 +17,37 @@ class StockAnalysis(BaseModel):
     key_points: List[str] = Field(description="Pontos principais")
 
 
+def analyze_stocks(tickers):
+    """Analisa várias ações buscando histórico e fundamentos de todas de uma vez."""
+    provedor = obter_provedor()
+    histories = provedor.historicos(tickers, periodo="1mo")
+    # Fundamentos também passam pelo provedor (cache e coalescência por símbolo)
+    with ThreadPoolExecutor(max_workers=len(histories) or 1) as executor:
+        infos = dict(zip(histories, executor.map(provedor.fundamentos, histories)))
+
+    return [
+        _analyze(ticker, histories[ticker], infos[ticker]) for ticker in histories
+    ]
+
+
 def analyze_stock(ticker):
     """Analisa uma ação e retorna dados estruturados."""
-    # Obtém dados da ação com Yahoo Finance
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    history = stock.history(period="1mo")
-
-    # Calcula variação mensal
-    change_percent = 0
-    if not history.empty:
-        change_percent = round(
-            (
-                (history.iloc[-1]["Close"] - history.iloc[0]["Close"])
-                / history.iloc[0]["Close"]
-            )
-            * 100,
-            2,
-        )
+    return analyze_stocks([ticker])[0]
+
+
+def _analyze(ticker, history, info):
+    # Variação mensal calculada a partir dos fechamentos diários
+    change_percent = history.variacao_percentual
 
     # Preço atual
-    price = info.get(
-        "currentPrice", history.iloc[-1]["Close"] if not history.empty else 0
-    )
+    price = info.get("currentPrice", history.preco)
 
     print(f"Analisando {ticker}: {info.get('shortName', ticker)} a ${price}")
 
     # Solicita análise estruturada
-    response = client.responses.parse(
+    analysis = parse_com_esquema(
+        StockAnalysis,
+        client=obter_cliente(),
         model="gpt-4o-mini",
         input=f"""
         Analise a ação {ticker}:
@@ -58,12 +59,8 @@ def analyze_stock(ticker):
         Dividend Yield: {info.get("dividendYield", 0) * 100 if info.get("dividendYield") else 0}%
         """,
         instructions="Forneça uma análise financeira estruturada desta ação.",
-        text_format=StockAnalysis,
     )
 
-    # Extrai e retorna a análise
-    analysis = response.output_parsed
-
     # Imprime um resumo
     print(f"\n{analysis.company_name} ({analysis.ticker}) - {analysis.outlook.upper()}")
     print(f"Preço: ${analysis.current_price} | Variação: {analysis.monthly_change}%")
@@ -74,9 +71,10 @@ def analyze_stock(ticker):
     return analysis
 
 
-# Exemplo de uso
-result = analyze_stock("AAPL")
+if __name__ == "__main__":
+    # Exemplo de uso
+    result = analyze_stock("AAPL")
 
-# Saída em JSON para uso programático
-print("\nJSON:")
-print(result.model_dump_json(indent=2))
+    # Saída em JSON para uso programático
+    print("\nJSON:")
+    print(result.model_dump_json(indent=2))
@@ -1,31 +1,57 @@
 import json
 import os
-from openai import OpenAI
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Optional
+from agentes.base_conhecimento import obter_indice
+from agentes.cache import criar_deduplicado, parse_deduplicado
+from agentes.cache_semantico import CacheSemantico
+from agentes.cliente import obter_cliente
+from agentes.deduplicacao import obter_deduplicador
+from agentes.ferramentas import RegistroFerramentas
+from agentes.prompts import montar_prompt
 from pydantic import BaseModel, Field
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+CAMINHO_KB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kb.json")
+REGISTROS_POR_BUSCA = 3
 
 
-def search_kb(question):
-    """Busca respostas na base de conhecimento"""
-    with open("kb.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+def search_kb(
+    question: Annotated[str, Field(description="A pergunta do usuário")],
+):
+    """Busca informações na base de conhecimento para responder perguntas"""
+    # O índice é carregado uma vez e só reindexa o que mudou no arquivo
+    return {
+        "records": obter_indice(CAMINHO_KB).buscar(question, k=REGISTROS_POR_BUSCA)
+    }
 
 
-tools = [
-    {
-        "type": "function",
-        "name": "search_kb",
-        "description": "Busca informações na base de conhecimento para responder perguntas",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "question": {"type": "string", "description": "A pergunta do usuário"},
-            },
-            "required": ["question"],
-        },
-    }
-]
+_registro: Optional[RegistroFerramentas] = None
+_cache_respostas: Optional[CacheSemantico] = None
+_lock = threading.Lock()
+
+
+def obter_registro() -> RegistroFerramentas:
+    """Registro com a ferramenta `search_kb`, criado no primeiro uso"""
+    global _registro
+    with _lock:
+        if _registro is None:
+            _registro = RegistroFerramentas()
+            _registro.registrar(search_kb)
+        return _registro
+
+
+def obter_cache_respostas() -> CacheSemantico:
+    """Cache semântico das respostas, criado no primeiro uso"""
+    global _cache_respostas
+    with _lock:
+        if _cache_respostas is None:
+            # Perguntas parecidas com uma já respondida reaproveitam a resposta,
+            # enquanto os registros da base usados nela não mudarem. Limiar alto:
+            # "produto usado" e "produto novo" passam de 0,8
+            # (ver benchmarks/cache_semantico.py)
+            _cache_respostas = CacheSemantico(limiar=0.9)
+        return _cache_respostas
 
 
 # Modelo de resposta
@@ -34,18 +60,38 @@ class KBResponse(BaseModel):
     confidence: str = Field(description="Nível de confiança: alto, médio ou baixo")
 
 
+# Estático e sempre no início do prompt, para o provedor reaproveitar o prefixo
+SYSTEM_PROMPT = """
+Você é um assistente virtual de uma loja online brasileira.
+Responda usando apenas as informações da base de conhecimento.
+Se a pergunta não puder ser respondida com a base, informe educadamente.
+"""
+
+
 def answer_question(question):
-    system_prompt = """
-    Você é um assistente virtual de uma loja online brasileira.
-    Responda usando apenas as informações da base de conhecimento.
-    Se a pergunta não puder ser respondida com a base, informe educadamente.
-    """
-
-    # Primeira chamada para verificar se o modelo quer usar a ferramenta
-    response = client.responses.create(
+    # Verifica alterações no kb.json antes de confiar no cache. Um acerto por
+    # similaridade também precisa que a busca local pela pergunta nova só ache
+    # registros usados na resposta guardada
+    indice = obter_indice(CAMINHO_KB)
+    cache_respostas = obter_cache_respostas()
+    registro = obter_registro()
+    cached = cache_respostas.obter(
+        question,
+        assinatura=indice.assinatura,
+        registros=[r["id"] for r in indice.buscar(question, k=REGISTROS_POR_BUSCA)],
+    )
+    if cached is not None:
+        return cached
+
+    client = obter_cliente()
+
+    # Primeira chamada para verificar se o modelo quer usar a ferramenta.
+    # Perguntas idênticas feitas ao mesmo tempo compartilham a mesma chamada
+    response = criar_deduplicado(
+        client=client,
         model="gpt-4o-mini",
-        input=f"{system_prompt}\n\nPergunta: {question}",
-        tools=tools,
+        **montar_prompt(instrucoes=SYSTEM_PROMPT, usuario=question),
+        tools=registro.definicoes(),
     )
 
     # Verifica se há chamadas de função
@@ -54,26 +100,35 @@ def answer_question(question):
     ]
 
     if function_calls:
-        # Obtém dados da base de conhecimento e gera resposta estruturada
-        function_call = function_calls[0]
-        args = json.loads(function_call.arguments)
-        kb_data = search_kb(args.get("question"))
-
-        final_response = client.responses.parse(
+        # Executa todas as buscas pedidas e junta os registros sem repetição
+        records = {}
+        for function_call in function_calls:
+            resultado = registro.chamar(function_call.name, function_call.arguments)
+            for record in resultado["records"]:
+                records[record["id"]] = record
+        # Ordem estável: a mesma busca gera o mesmo contexto (e o mesmo prefixo)
+        kb_data = {"records": [records[id] for id in sorted(records)]}
+
+        # Esquema compilado uma vez e reaproveitado em todas as perguntas
+        answer = parse_deduplicado(
+            KBResponse,
+            client=client,
             model="gpt-4o-mini",
-            input=f"""
-            {system_prompt}
-
-            Pergunta: {question}
-
-            Base de conhecimento:
-            {json.dumps(kb_data, ensure_ascii=False)}
-            """,
-            instructions="Forneça uma resposta estruturada baseada nos dados da base de conhecimento",
-            text_format=KBResponse,
+            **montar_prompt(
+                instrucoes=SYSTEM_PROMPT
+                + "Forneça uma resposta estruturada baseada nos dados da base de conhecimento.",
+                contexto=f"Base de conhecimento:\n{json.dumps(kb_data, ensure_ascii=False)}",
+                usuario=question,
+            ),
         )
-
-        return final_response.output_parsed
+        # Sem registros não há o que invalidar depois; não entra no cache
+        if answer is not None and records:
+            cache_respostas.gravar(
+                question,
+                answer,
+                dependencias={id: indice.assinatura(id) for id in records},
+            )
+        return answer
     else:
         # Resposta direta se nenhuma ferramenta foi chamada
         direct_text = next(
@@ -91,21 +146,36 @@ def answer_question(question):
         return KBResponse(answer=direct_text, confidence="baixo")
 
 
-# Exemplos
-question1 = "Qual é a política de devoluções da loja?"
-response1 = answer_question(question1)
-print(f"\n----- {question1}")
-print(f"Resposta: {response1.answer}")
-print(f"Confiança: {response1.confidence}")
-
-question2 = "Vocês entregam para o Nordeste?"
-response2 = answer_question(question2)
-print(f"\n----- {question2}")
-print(f"Resposta: {response2.answer}")
-print(f"Confiança: {response2.confidence}")
-
-question3 = "Qual a capital da França?"
-response3 = answer_question(question3)
-print(f"\n----- {question3}")
-print(f"Resposta: {response3.answer}")
-print(f"Confiança: {response3.confidence}")
+if __name__ == "__main__":
+    # Exemplos
+    question1 = "Qual é a política de devoluções da loja?"
+    response1 = answer_question(question1)
+    print(f"\n----- {question1}")
+    print(f"Resposta: {response1.answer}")
+    print(f"Confiança: {response1.confidence}")
+
+    question2 = "Vocês entregam para o Nordeste?"
+    response2 = answer_question(question2)
+    print(f"\n----- {question2}")
+    print(f"Resposta: {response2.answer}")
+    print(f"Confiança: {response2.confidence}")
+
+    question3 = "Qual a capital da França?"
+    response3 = answer_question(question3)
+    print(f"\n----- {question3}")
+    print(f"Resposta: {response3.answer}")
+    print(f"Confiança: {response3.confidence}")
+
+    # Muitos usuários com a mesma pergunta frequente ao mesmo tempo
+    question_faq = "Quais formas de pagamento são aceitas?"
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        respostas = list(executor.map(answer_question, [question_faq] * 10))
+    print(f"\n----- {len(respostas)}x {question_faq}")
+    print(f"Deduplicação: {obter_deduplicador().estatisticas()}")
+
+    # Variações da mesma pergunta saem do cache semântico, sem chamar o modelo
+    question4 = "qual a politica de devolucao?"
+    response4 = answer_question(question4)
+    print(f"\n----- {question4}")
+    print(f"Resposta: {response4.answer}")
+    print(f"Cache semântico: {obter_cache_respostas().estatisticas()}")
@@ -1,19 +1,22 @@
+import asyncio
 from typing import Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
-from openai import OpenAI
-import os
+from agentes.cache import parse_cacheado, parse_cacheado_async
+from agentes.cadeia import (
+    CadeiaInterrompida,
+    Etapa,
+    ResultadoCadeia,
+    executar_cadeia_async,
+)
+from agentes.cascata import obter_cascata
+from agentes.instrumentacao import AgregadorMemoria, adicionar_saida, na_etapa
+from agentes.lote import ResumoLote, ler_jsonl, processar_lote
+from agentes.prompts import MonitorPrefixos, montar_prompt
 import logging
 
-# Configuração do logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 modelo = "gpt-4o-mini"
 
 
@@ -49,117 +52,312 @@ class ConfirmacaoEvento(BaseModel):
     )
 
 
-def extrair_informacao_evento(entrada_usuario: str) -> ExtracaoEvento:
-    """Primeira chamada LLM para determinar se a entrada é um evento de calendário"""
-    logger.info("Iniciando análise de extração de evento")
-    logger.debug(f"Texto de entrada: {entrada_usuario}")
-
+def _contexto_data() -> str:
     hoje = datetime.now()
-    contexto_data = f"Hoje é {hoje.strftime('%A, %d de %B de %Y')}."
+    return f"Hoje é {hoje.strftime('%A, %d de %B de %Y')}."
+
+
+# Os parâmetros de cada etapa ficam em um lugar só, para os caminhos
+# síncrono e assíncrono enviarem exatamente o mesmo prompt
+def _parametros_extracao(entrada_usuario: str, model: str = modelo) -> dict:
+    return dict(
+        model=model,
+        **montar_prompt(
+            instrucoes="Analise se o texto descreve um evento de calendário e extraia informações sobre o possível evento.",
+            contexto=_contexto_data(),
+            usuario=entrada_usuario,
+        ),
+        text_format=ExtracaoEvento,
+    )
+
 
-    response = client.responses.parse(
+def _parametros_detalhes(descricao: str) -> dict:
+    return dict(
         model=modelo,
-        input=f"{contexto_data} Analise se o texto descreve um evento de calendário.",
-        instructions=f"Extraia informações sobre um possível evento deste texto: '{entrada_usuario}'",
-        text_format=ExtracaoEvento,
+        **montar_prompt(
+            instrucoes="Extraia detalhes estruturados do texto do evento. Quando as datas fizerem referência a 'próxima terça-feira' ou datas relativas similares, use a data atual como referência.",
+            contexto=_contexto_data(),
+            usuario=descricao,
+        ),
+        text_format=DetalhesEvento,
     )
 
-    resultado = response.output_parsed
+
+def _parametros_confirmacao(detalhes_evento: DetalhesEvento) -> dict:
+    return dict(
+        model=modelo,
+        **montar_prompt(
+            instrucoes="Gere uma mensagem de confirmação natural para o evento. Assine a mensagem com seu nome: Skynet",
+            usuario=detalhes_evento.model_dump_json(),
+        ),
+        text_format=ConfirmacaoEvento,
+    )
+
+
+def _registrar_extracao(resultado: ExtracaoEvento) -> ExtracaoEvento:
     logger.info(
         f"Extração concluída - É evento de calendário: {resultado.eh_evento_calendario}, Confiança: {resultado.pontuacao_confianca:.2f}"
     )
     return resultado
 
 
+def _registrar_detalhes(resultado: DetalhesEvento) -> DetalhesEvento:
+    logger.info(
+        f"Detalhes do evento analisados - Nome: {resultado.nome}, Data: {resultado.data}, Duração: {resultado.duracao_minutos}min"
+    )
+    logger.debug(f"Participantes: {', '.join(resultado.participantes)}")
+    return resultado
+
+
+def extrair_informacao_evento(entrada_usuario: str) -> ExtracaoEvento:
+    """Primeira chamada LLM para determinar se a entrada é um evento de calendário"""
+    logger.info("Iniciando análise de extração de evento")
+    logger.debug(f"Texto de entrada: {entrada_usuario}")
+    # Modelo barato primeiro; o mais forte só quando a confiança vem baixa
+    resultado = obter_cascata().executar(
+        "extracao",
+        lambda model: parse_cacheado(**_parametros_extracao(entrada_usuario, model)),
+    )
+    return _registrar_extracao(resultado)
+
+
+async def extrair_informacao_evento_async(entrada_usuario: str) -> ExtracaoEvento:
+    logger.info("Iniciando análise de extração de evento")
+    logger.debug(f"Texto de entrada: {entrada_usuario}")
+    resultado = await obter_cascata().executar_async(
+        "extracao",
+        lambda model: parse_cacheado_async(
+            **_parametros_extracao(entrada_usuario, model)
+        ),
+    )
+    return _registrar_extracao(resultado)
+
+
 def analisar_detalhes_evento(descricao: str) -> DetalhesEvento:
     """Segunda chamada LLM para extrair detalhes específicos do evento"""
     logger.info("Iniciando análise de detalhes do evento")
+    return _registrar_detalhes(parse_cacheado(**_parametros_detalhes(descricao)))
 
-    hoje = datetime.now()
-    contexto_data = f"Hoje é {hoje.strftime('%A, %d de %B de %Y')}."
 
-    response = client.responses.parse(
-        model=modelo,
-        input=f"{contexto_data} Extraia informações detalhadas do evento. Quando as datas fizerem referência a 'próxima terça-feira' ou datas relativas similares, use a data atual como referência.",
-        instructions=f"Extraia detalhes estruturados deste texto de evento: '{descricao}'",
-        text_format=DetalhesEvento,
-    )
-
-    resultado = response.output_parsed
-    logger.info(
-        f"Detalhes do evento analisados - Nome: {resultado.nome}, Data: {resultado.data}, Duração: {resultado.duracao_minutos}min"
+async def analisar_detalhes_evento_async(descricao: str) -> DetalhesEvento:
+    logger.info("Iniciando análise de detalhes do evento")
+    return _registrar_detalhes(
+        await parse_cacheado_async(**_parametros_detalhes(descricao))
     )
-    logger.debug(f"Participantes: {', '.join(resultado.participantes)}")
-    return resultado
 
 
 def gerar_confirmacao(detalhes_evento: DetalhesEvento) -> ConfirmacaoEvento:
     """Terceira chamada LLM para gerar mensagem de confirmação"""
     logger.info("Gerando mensagem de confirmação")
+    resultado = parse_cacheado(**_parametros_confirmacao(detalhes_evento))
+    logger.info("Mensagem de confirmação gerada com sucesso")
+    return resultado
 
-    response = client.responses.parse(
-        model=modelo,
-        input="Gere uma mensagem de confirmação natural para o evento. Assine a mensagem com seu nome: Skynet",
-        instructions=f"Crie uma confirmação para este evento: {detalhes_evento.model_dump()}",
-        text_format=ConfirmacaoEvento,
-    )
 
-    resultado = response.output_parsed
+async def gerar_confirmacao_async(detalhes_evento: DetalhesEvento) -> ConfirmacaoEvento:
+    logger.info("Gerando mensagem de confirmação")
+    resultado = await parse_cacheado_async(**_parametros_confirmacao(detalhes_evento))
     logger.info("Mensagem de confirmação gerada com sucesso")
     return resultado
 
 
+def verificar_porta(extracao: ExtracaoEvento) -> bool:
+    """Verificação de porta: é um evento de calendário com confiança suficiente?"""
+    if not extracao.eh_evento_calendario or extracao.pontuacao_confianca < 0.7:
+        logger.warning(
+            f"Verificação de porta falhou - eh_evento_calendario: {extracao.eh_evento_calendario}, confiança: {extracao.pontuacao_confianca:.2f}"
+        )
+        return False
+    return True
+
+
 def processar_solicitacao_calendario(
     entrada_usuario: str,
+    especulativo: bool = False,
 ) -> Optional[ConfirmacaoEvento]:
     """Função principal implementando a cadeia de prompts com verificação de porta"""
+    if especulativo:
+        return processar_solicitacao_calendario_especulativo(entrada_usuario)
+
     logger.info("Processando solicitação de calendário")
     logger.debug(f"Entrada bruta: {entrada_usuario}")
 
     # Primeira chamada LLM: Extrair informações básicas
-    extracao_inicial = extrair_informacao_evento(entrada_usuario)
+    with na_etapa("extracao"):
+        extracao_inicial = extrair_informacao_evento(entrada_usuario)
 
     # Verificação de porta: Verificar se é um evento de calendário com confiança suficiente
-    if (
-        not extracao_inicial.eh_evento_calendario
-        or extracao_inicial.pontuacao_confianca < 0.7
-    ):
-        logger.warning(
-            f"Verificação de porta falhou - eh_evento_calendario: {extracao_inicial.eh_evento_calendario}, confiança: {extracao_inicial.pontuacao_confianca:.2f}"
-        )
+    if not verificar_porta(extracao_inicial):
         return None
 
     logger.info("Verificação de porta passou, prosseguindo com processamento do evento")
 
     # Segunda chamada LLM: Obter informações detalhadas do evento
-    detalhes_evento = analisar_detalhes_evento(extracao_inicial.descricao)
+    with na_etapa("detalhes"):
+        detalhes_evento = analisar_detalhes_evento(extracao_inicial.descricao)
 
     # Terceira chamada LLM: Gerar confirmação
-    confirmacao = gerar_confirmacao(detalhes_evento)
+    with na_etapa("confirmacao"):
+        confirmacao = gerar_confirmacao(detalhes_evento)
 
     logger.info("Processamento da solicitação de calendário concluído com sucesso")
     return confirmacao
 
 
-# Exemplos de uso
-entrada_usuario = "Vamos fazer uma transmissão ao vivo na próxima segunda-feira às 20h com Daniel e Alberto para apresentar o lançamento do novo curso, deve durar umas 2 horas"
+async def processar_solicitacao_calendario_async(
+    entrada_usuario: str,
+    especulativo: bool = False,
+) -> Optional[ConfirmacaoEvento]:
+    """Versão assíncrona de `processar_solicitacao_calendario`"""
+    if especulativo:
+        return await processar_solicitacao_calendario_especulativo_async(
+            entrada_usuario
+        )
 
-resultado = processar_solicitacao_calendario(entrada_usuario)
-if resultado:
-    print(f"Confirmação: {resultado.mensagem_confirmacao}")
-    if resultado.link_calendario:
-        print(f"Link do Calendário: {resultado.link_calendario}")
-else:
-    print("Isto não parece ser uma solicitação de evento de calendário.")
+    logger.info("Processando solicitação de calendário")
+    logger.debug(f"Entrada bruta: {entrada_usuario}")
+
+    with na_etapa("extracao"):
+        extracao_inicial = await extrair_informacao_evento_async(entrada_usuario)
+
+    if not verificar_porta(extracao_inicial):
+        return None
+
+    logger.info("Verificação de porta passou, prosseguindo com processamento do evento")
+
+    with na_etapa("detalhes"):
+        detalhes_evento = await analisar_detalhes_evento_async(
+            extracao_inicial.descricao
+        )
 
-print("\n" + "=" * 50 + "\n")
+    with na_etapa("confirmacao"):
+        confirmacao = await gerar_confirmacao_async(detalhes_evento)
+
+    logger.info("Processamento da solicitação de calendário concluído com sucesso")
+    return confirmacao
 
-entrada_usuario = "Você pode enviar um e-mail para Daniel e Alberto para discutir o roteiro do projeto?"
 
-resultado = processar_solicitacao_calendario(entrada_usuario)
-if resultado:
-    print(f"Confirmação: {resultado.mensagem_confirmacao}")
-    if resultado.link_calendario:
-        print(f"Link do Calendário: {resultado.link_calendario}")
-else:
-    print("Isto não parece ser uma solicitação de evento de calendário.")
+def processar_solicitacao_calendario_especulativo(
+    entrada_usuario: str,
+) -> Optional[ConfirmacaoEvento]:
+    """Cadeia especulativa: a análise de detalhes roda sobre a entrada bruta junto com a porta"""
+    # Roda a cadeia de corrotinas: se a porta falhar, a chamada especulativa é
+    # abortada (numa thread ela terminaria em segundo plano, e seria paga)
+    return asyncio.run(
+        processar_solicitacao_calendario_especulativo_async(entrada_usuario)
+    )
+
+
+async def processar_solicitacao_calendario_especulativo_async(
+    entrada_usuario: str,
+) -> Optional[ConfirmacaoEvento]:
+    """Cadeia especulativa com corrotinas: a etapa especulativa é cancelada de fato"""
+    logger.info("Processando solicitação de calendário (modo especulativo)")
+
+    async def etapa_porta(entrada: str, resultados: dict) -> ExtracaoEvento:
+        extracao = await extrair_informacao_evento_async(entrada)
+        if not verificar_porta(extracao):
+            raise CadeiaInterrompida("Não é um evento de calendário")
+        return extracao
+
+    async def etapa_detalhes(entrada: str, resultados: dict) -> DetalhesEvento:
+        return await analisar_detalhes_evento_async(entrada)
+
+    async def etapa_confirmacao(entrada: str, resultados: dict) -> ConfirmacaoEvento:
+        return await gerar_confirmacao_async(resultados["detalhes"])
+
+    etapas = [
+        Etapa(nome="extracao", funcao=etapa_porta),
+        Etapa(nome="detalhes", funcao=etapa_detalhes),
+        Etapa(
+            nome="confirmacao",
+            funcao=etapa_confirmacao,
+            depende_de=["extracao", "detalhes"],
+        ),
+    ]
+    return _confirmacao_da_cadeia(await executar_cadeia_async(etapas, entrada_usuario))
+
+
+def _confirmacao_da_cadeia(resultado: ResultadoCadeia) -> Optional[ConfirmacaoEvento]:
+    latencias = {nome: round(t, 2) for nome, t in resultado.latencias.items()}
+    logger.info(
+        f"Latência por etapa: {latencias} - "
+        f"caminho crítico {' -> '.join(resultado.caminho_critico)}: {resultado.latencia_caminho_critico:.2f}s"
+    )
+    if resultado.interrompida_em:
+        logger.info(f"Etapas canceladas: {resultado.canceladas}")
+        return None
+
+    logger.info("Processamento da solicitação de calendário concluído com sucesso")
+    return resultado.resultados["confirmacao"]
+
+
+def extrair_informacao_evento_em_lote(
+    caminho_entrada: str, caminho_saida: str, max_trabalhadores: int = 16
+) -> ResumoLote:
+    """Cada linha do JSONL de entrada: {"id": ..., "texto": ...}; retoma de onde parou"""
+
+    # Corrotina: os trabalhadores dividem um event loop em vez de um pool de threads
+    async def processar(registro: dict) -> ExtracaoEvento:
+        return await extrair_informacao_evento_async(registro["texto"])
+
+    return processar_lote(
+        ler_jsonl(caminho_entrada),
+        processar,
+        caminho_saida,
+        max_trabalhadores=max_trabalhadores,
+    )
+
+
+if __name__ == "__main__":
+    # Configuração do logging: só ao rodar o script, não ao importá-lo
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    # Exemplos de uso
+    # Soma tempo, tokens e custo de cada etapa da cadeia
+    telemetria = adicionar_saida(AgregadorMemoria())
+    # Avisa se alguma chamada monta o prompt de um jeito que impede o cache de prefixo
+    adicionar_saida(MonitorPrefixos())
+
+    entrada_usuario = "Vamos fazer uma transmissão ao vivo na próxima segunda-feira às 20h com Daniel e Alberto para apresentar o lançamento do novo curso, deve durar umas 2 horas"
+
+    resultado = processar_solicitacao_calendario(entrada_usuario)
+    if resultado:
+        print(f"Confirmação: {resultado.mensagem_confirmacao}")
+        if resultado.link_calendario:
+            print(f"Link do Calendário: {resultado.link_calendario}")
+    else:
+        print("Isto não parece ser uma solicitação de evento de calendário.")
+
+    print("\n" + "=" * 50 + "\n")
+
+    entrada_usuario = "Você pode enviar um e-mail para Daniel e Alberto para discutir o roteiro do projeto?"
+
+    # Modo especulativo: a análise de detalhes começa junto com a verificação de porta
+    resultado = processar_solicitacao_calendario(entrada_usuario, especulativo=True)
+    if resultado:
+        print(f"Confirmação: {resultado.mensagem_confirmacao}")
+        if resultado.link_calendario:
+            print(f"Link do Calendário: {resultado.link_calendario}")
+    else:
+        print("Isto não parece ser uma solicitação de evento de calendário.")
+
+    print("\nCusto e latência por etapa:")
+    for etapa, total in telemetria.resumo().items():
+        print(
+            f"  {etapa}: {total['chamadas']:.0f} chamadas, {total['tempo_segundos']:.2f}s, "
+            f"{total['tokens_entrada']:.0f}+{total['tokens_saida']:.0f} tokens, "
+            f"{total['taxa_cache']:.0%} em cache, US$ {total['custo_estimado']:.6f}"
+        )
+
+    print("\nCascata de modelos:")
+    for etapa, relatorio in obter_cascata().relatorio().items():
+        print(
+            f"  {etapa}: {relatorio['taxa_escalonamento']:.0%} escaladas, "
+            f"atendidas por {relatorio['atendidas_por_modelo']}, "
+            f"economia de custo {relatorio['economia_custo']:.0%}"
+        )
@@ -1,18 +1,14 @@
 from typing import Optional, Literal
 from pydantic import BaseModel, Field
-from openai import OpenAI
-import os
+from agentes.cache import parse_cacheado, parse_cacheado_async
+from agentes.cascata import obter_cascata
+from agentes.prompts import montar_prompt
+from agentes.roteador import DecisaoRoteamento, ModeloNgramas, PreRoteador, Regra
 import logging
+import threading
 
-# Configuração do logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 modelo = "gpt-4o-mini"
 
 # --------------------------------------------------------------
@@ -74,36 +70,151 @@ class RespostaCalendario(BaseModel):
 # --------------------------------------------------------------
 
 
-def rotear_solicitacao_calendario(entrada_usuario: str) -> TipoSolicitacaoCalendario:
+# Os parâmetros de cada chamada ficam em um lugar só, para os caminhos
+# síncrono e assíncrono enviarem exatamente o mesmo prompt
+def _parametros_classificacao(entrada_usuario: str, model: str = modelo) -> dict:
+    return dict(
+        model=model,
+        **montar_prompt(
+            instrucoes="Determine se esta é uma solicitação para criar um novo evento de calendário ou modificar um existente.",
+            usuario=entrada_usuario,
+        ),
+        text_format=TipoSolicitacaoCalendario,
+    )
+
+
+def classificar_solicitacao_llm(entrada_usuario: str) -> TipoSolicitacaoCalendario:
     """Chamada LLM de roteamento para determinar o tipo de solicitação de calendário"""
+    # Modelo barato primeiro; o mais forte só quando a confiança vem baixa
+    return obter_cascata().executar(
+        "roteamento",
+        lambda model: parse_cacheado(
+            **_parametros_classificacao(entrada_usuario, model)
+        ),
+    )
+
+
+async def classificar_solicitacao_llm_async(
+    entrada_usuario: str,
+) -> TipoSolicitacaoCalendario:
+    return await obter_cascata().executar_async(
+        "roteamento",
+        lambda model: parse_cacheado_async(
+            **_parametros_classificacao(entrada_usuario, model)
+        ),
+    )
+
+
+# Os verbos sozinhos não bastam ("adiar o pagamento da fatura" não é evento)
+_EVENTO = (
+    r"\b(reuniao|evento|call|chamada|encontro|compromisso|consulta|almoco"
+    r"|apresentacao|transmissao)\b"
+)
+_MODIFICAR = (
+    r"\b(mover|mova|remarcar|remarque|reagendar|reagende|adiar|adie|antecipar"
+    r"|antecipe|alterar|altere|mudar|mude)\b"
+)
+_CRIAR = r"\b(agendar|agende|marcar|marque|criar|crie)\b"
+
+
+def _criar_pre_roteador() -> PreRoteador:
+    # Caminho rápido local: regras e modelo de n-gramas antes de gastar uma chamada LLM
+    return PreRoteador(
+        regras=[
+            Regra(
+                rotulo="modificar_evento",
+                padroes=[rf"{_MODIFICAR}.*{_EVENTO}", rf"{_EVENTO}.*{_MODIFICAR}"],
+                confianca=0.9,
+            ),
+            Regra(
+                rotulo="novo_evento",
+                padroes=[rf"{_CRIAR}.*{_EVENTO}", r"\bvamos (agendar|marcar)\b"],
+                confianca=0.9,
+            ),
+        ],
+        classificar_llm=classificar_solicitacao_llm,
+        classificar_llm_async=classificar_solicitacao_llm_async,
+        campo_rotulo="tipo_solicitacao",
+        campo_confianca="pontuacao_confianca",
+        limiar=0.8,
+        modelo=ModeloNgramas(),
+    )
+
+
+_pre_roteador: Optional[PreRoteador] = None
+_lock_pre_roteador = threading.Lock()
+
+
+def obter_pre_roteador() -> PreRoteador:
+    """Pré-roteador compartilhado, criado no primeiro uso"""
+    global _pre_roteador
+    with _lock_pre_roteador:
+        if _pre_roteador is None:
+            _pre_roteador = _criar_pre_roteador()
+        return _pre_roteador
+
+
+def rotear_solicitacao_calendario(entrada_usuario: str) -> TipoSolicitacaoCalendario:
+    """Roteia a solicitação localmente quando possível, escalando para o LLM se necessário"""
     logger.info("Roteando solicitação de calendário")
+    return _resultado_roteamento(
+        entrada_usuario, obter_pre_roteador().classificar(entrada_usuario)
+    )
 
-    response = client.responses.parse(
-        model=modelo,
-        input="Determine se esta é uma solicitação para criar um novo evento de calendário ou modificar um existente.",
-        instructions=f"Analise esta solicitação: '{entrada_usuario}'",
-        text_format=TipoSolicitacaoCalendario,
+
+async def rotear_solicitacao_calendario_async(
+    entrada_usuario: str,
+) -> TipoSolicitacaoCalendario:
+    logger.info("Roteando solicitação de calendário")
+    return _resultado_roteamento(
+        entrada_usuario, await obter_pre_roteador().classificar_async(entrada_usuario)
     )
-    resultado = response.output_parsed
+
+
+def _resultado_roteamento(
+    entrada_usuario: str, decisao: DecisaoRoteamento
+) -> TipoSolicitacaoCalendario:
+    if decisao.resposta_llm is not None:
+        resultado = decisao.resposta_llm
+    else:
+        resultado = TipoSolicitacaoCalendario(
+            tipo_solicitacao=decisao.rotulo,
+            pontuacao_confianca=decisao.confianca,
+            descricao=entrada_usuario,
+        )
     logger.info(
-        f"Solicitação roteada como: {resultado.tipo_solicitacao} com confiança: {resultado.pontuacao_confianca}"
+        f"Solicitação roteada ({decisao.origem}) como: {resultado.tipo_solicitacao} com confiança: {resultado.pontuacao_confianca}"
     )
     return resultado
 
 
+def _parametros_novo_evento(descricao: str) -> dict:
+    return dict(
+        model=modelo,
+        **montar_prompt(
+            instrucoes="Extraia informações estruturadas da descrição para criar um novo evento de calendário.",
+            usuario=descricao,
+        ),
+        text_format=DetalhesNovoEvento,
+    )
+
+
 def processar_novo_evento(descricao: str) -> RespostaCalendario:
     """Processar uma solicitação de novo evento"""
     logger.info("Processando solicitação de novo evento")
 
     # Obter detalhes do evento
-    response = client.responses.parse(
-        model=modelo,
-        input="Extraia detalhes para criar um novo evento de calendário.",
-        instructions=f"Extraia informações estruturadas desta descrição: '{descricao}'",
-        text_format=DetalhesNovoEvento,
-    )
-    detalhes = response.output_parsed
+    detalhes = parse_cacheado(**_parametros_novo_evento(descricao))
+    return _resposta_novo_evento(detalhes)
+
 
+async def processar_novo_evento_async(descricao: str) -> RespostaCalendario:
+    logger.info("Processando solicitação de novo evento")
+    detalhes = await parse_cacheado_async(**_parametros_novo_evento(descricao))
+    return _resposta_novo_evento(detalhes)
+
+
+def _resposta_novo_evento(detalhes: DetalhesNovoEvento) -> RespostaCalendario:
     logger.info(f"Novo evento: {detalhes.model_dump_json(indent=2)}")
 
     # Gerar resposta
@@ -114,19 +225,35 @@ def processar_novo_evento(descricao: str) -> RespostaCalendario:
     )
 
 
+def _parametros_modificar_evento(descricao: str) -> dict:
+    return dict(
+        model=modelo,
+        **montar_prompt(
+            instrucoes="Extraia informações de modificação da descrição para alterar um evento de calendário existente.",
+            usuario=descricao,
+        ),
+        text_format=DetalhesModificarEvento,
+    )
+
+
 def processar_modificar_evento(descricao: str) -> RespostaCalendario:
     """Processar uma solicitação de modificação de evento"""
     logger.info("Processando solicitação de modificação de evento")
 
     # Obter detalhes de modificação
-    response = client.responses.parse(
-        model=modelo,
-        input="Extraia detalhes para modificar um evento de calendário existente.",
-        instructions=f"Extraia informações de modificação desta descrição: '{descricao}'",
-        text_format=DetalhesModificarEvento,
-    )
-    detalhes = response.output_parsed
+    detalhes = parse_cacheado(**_parametros_modificar_evento(descricao))
+    return _resposta_modificar_evento(detalhes)
 
+
+async def processar_modificar_evento_async(descricao: str) -> RespostaCalendario:
+    logger.info("Processando solicitação de modificação de evento")
+    detalhes = await parse_cacheado_async(**_parametros_modificar_evento(descricao))
+    return _resposta_modificar_evento(detalhes)
+
+
+def _resposta_modificar_evento(
+    detalhes: DetalhesModificarEvento,
+) -> RespostaCalendario:
     logger.info(f"Evento modificado: {detalhes.model_dump_json(indent=2)}")
 
     # Gerar resposta
@@ -147,10 +274,7 @@ def processar_solicitacao_calendario(
     resultado_roteamento = rotear_solicitacao_calendario(entrada_usuario)
 
     # Verificar limite de confiança
-    if resultado_roteamento.pontuacao_confianca < 0.7:
-        logger.warning(
-            f"Pontuação de confiança baixa: {resultado_roteamento.pontuacao_confianca}"
-        )
+    if not _confianca_suficiente(resultado_roteamento):
         return None
 
     # Rotear para o manipulador apropriado
@@ -163,39 +287,77 @@ def processar_solicitacao_calendario(
         return None
 
 
-# --------------------------------------------------------------
-# Passo 3: Testar com novo evento
-# --------------------------------------------------------------
+async def processar_solicitacao_calendario_async(
+    entrada_usuario: str,
+) -> Optional[RespostaCalendario]:
+    """Versão assíncrona de `processar_solicitacao_calendario`"""
+    logger.info("Processando solicitação de calendário")
+
+    resultado_roteamento = await rotear_solicitacao_calendario_async(entrada_usuario)
+    if not _confianca_suficiente(resultado_roteamento):
+        return None
+
+    if resultado_roteamento.tipo_solicitacao == "novo_evento":
+        return await processar_novo_evento_async(resultado_roteamento.descricao)
+    elif resultado_roteamento.tipo_solicitacao == "modificar_evento":
+        return await processar_modificar_evento_async(resultado_roteamento.descricao)
+    else:
+        logger.warning("Tipo de solicitação não suportada")
+        return None
 
-entrada_novo_evento = "Vamos agendar uma reunião de equipe na próxima terça-feira às 14h com Daniel e Alberto"
-resultado = processar_solicitacao_calendario(entrada_novo_evento)
-if resultado:
-    print(f"Resposta: {resultado.mensagem}")
-else:
-    print("Solicitação não reconhecida como operação de calendário")
 
-print("\n" + "=" * 50 + "\n")
+def _confianca_suficiente(resultado_roteamento: TipoSolicitacaoCalendario) -> bool:
+    if resultado_roteamento.pontuacao_confianca < 0.7:
+        logger.warning(
+            f"Pontuação de confiança baixa: {resultado_roteamento.pontuacao_confianca}"
+        )
+        return False
+    return True
 
-# --------------------------------------------------------------
-# Passo 4: Testar com modificação de evento
-# --------------------------------------------------------------
 
-entrada_modificar_evento = (
-    "Você pode mover a reunião de equipe com Daniel e Alberto para quarta-feira às 15h?"
-)
-resultado = processar_solicitacao_calendario(entrada_modificar_evento)
-if resultado:
-    print(f"Resposta: {resultado.mensagem}")
-else:
-    print("Solicitação não reconhecida como operação de calendário")
+if __name__ == "__main__":
+    # Configuração do logging: só ao rodar o script, não ao importá-lo
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
 
-print("\n" + "=" * 50 + "\n")
+    # --------------------------------------------------------------
+    # Passo 3: Testar com novo evento
+    # --------------------------------------------------------------
 
-# --------------------------------------------------------------
-# Passo 5: Testar com solicitação inválida
-# --------------------------------------------------------------
+    entrada_novo_evento = "Vamos agendar uma reunião de equipe na próxima terça-feira às 14h com Daniel e Alberto"
+    resultado = processar_solicitacao_calendario(entrada_novo_evento)
+    if resultado:
+        print(f"Resposta: {resultado.mensagem}")
+    else:
+        print("Solicitação não reconhecida como operação de calendário")
+
+    print("\n" + "=" * 50 + "\n")
+
+    # --------------------------------------------------------------
+    # Passo 4: Testar com modificação de evento
+    # --------------------------------------------------------------
+
+    entrada_modificar_evento = (
+        "Você pode mover a reunião de equipe com Daniel e Alberto para quarta-feira às 15h?"
+    )
+    resultado = processar_solicitacao_calendario(entrada_modificar_evento)
+    if resultado:
+        print(f"Resposta: {resultado.mensagem}")
+    else:
+        print("Solicitação não reconhecida como operação de calendário")
+
+    print("\n" + "=" * 50 + "\n")
+
+    # --------------------------------------------------------------
+    # Passo 5: Testar com solicitação inválida
+    # --------------------------------------------------------------
+
+    entrada_invalida = "Como está o clima hoje?"
+    resultado = processar_solicitacao_calendario(entrada_invalida)
+    if not resultado:
+        print("Solicitação não reconhecida como operação de calendário")
 
-entrada_invalida = "Como está o clima hoje?"
-resultado = processar_solicitacao_calendario(entrada_invalida)
-if not resultado:
-    print("Solicitação não reconhecida como operação de calendário")
+    print(f"\nMétricas do pré-roteador: {obter_pre_roteador().metricas()}")